@@ -1,10 +1,25 @@
+import time
+STARTUP_TIME = time.perf_counter()
 import tkinter as tk
 from tkinter import ttk
 import os
+import json
 import subprocess
-from plot_csv import plot_encoders, replot_encoder_data
-from EncoderDataCollector import EncoderDataCollector
+import sys
+import threading
 from tkinter import messagebox
+from plot_worker import STAGE_PROGRESS, PlotWorkerPool, PlotCancelled
+from gui_jobs import JobManager
+
+# Only tkinter and the plot worker client are imported before the window shows. The
+# collection modules (numpy, pyserial, matplotlib's Tk backend for the live view) load on
+# a thread once the window is up, see load_backend, and plots are drawn by a separate,
+# pre-warmed plot_worker.py process. python benchmark_startup.py times all of it.
+#
+# Collections and plots run as background jobs (gui_jobs.py) listed at the bottom of the
+# window: the Tk callbacks only submit them, a root.after loop reports their progress,
+# and any job can be cancelled from the list. Plots run on a small pool of worker
+# processes, so several replots can run at once.
 
 # Instruction text
 instructions = [
@@ -13,15 +28,16 @@ instructions = [
     "   Use this convention:",
     "                      'Serial-Number_direction_Voltage'",
         "                      Example: 616-00021_CCW_3.8V",
-    "2. Click 'Collect Data' to begin logging encoder data.",
+    "2. Click 'Collect Data' to log every station with a name.",
     "3. Wait for the data collection to complete.",
     "           This should take a few minutes",
+    "           Watch the live view below, 'Stop Collection' ends early",
     "           The plots will appear when done",
     "           Close the plots, they will auto save",
     "  When done Click 'Quit Program' to close the application safely.",
     "","For plotting of data: ",
     "Unless replotting, no need for these steps, data collection collects plots.",
-    "1. Select a log file from the dropdown menu.",
+    "1. Select a log file from the dropdown menu (type in the box to filter).",
     "2. Click 'Plot data' to visualize the encoder readings.",
     "3. The plots will populate when done. ",
     "           You can close the plots, they will autosave",
@@ -38,21 +54,271 @@ LOG_DIR = "encoder_logs"
 if not os.path.exists(LOG_DIR):
     os.makedirs(LOG_DIR)
 
-# Function to get file names from encoder_logs directory
-def get_log_files():
-    return sorted([f for f in os.listdir(LOG_DIR) if os.path.isfile(os.path.join(LOG_DIR, f))])
+# Set by benchmark_startup.py: print the startup timings as JSON and quit once everything is loaded
+STARTUP_REPORT = os.environ.get("ENCODER_GUI_STARTUP_REPORT") == "1"
+# Modules that must not be loaded when the window first shows
+HEAVY_MODULES = ('numpy', 'pandas', 'matplotlib', 'scipy', 'PIL', 'serial')
+
+backend = {'loaded': False, 'ready': False, 'error': None}
+startup = {'window_shown_s': None, 'backend_ready_s': None, 'plot_worker_ready_s': None, 'heavy_modules_at_show': None}
+plot_workers = PlotWorkerPool()
+jobs = JobManager()
+JOB_POLL_MS = 200
+
+
+def load_backend():
+    # Runs on a worker thread, these imports take most of the startup time on the shop-floor PCs
+    global Station, collect_stations, MAX_STATIONS, SERIAL_PORT, SAMPLING_DURATION, SampleRingBuffer, LiveView, load_telemetry, search_log_names, sync_catalog
+    try:
+        from EncoderDataCollector import SERIAL_PORT, SAMPLING_DURATION
+        from multi_station import Station, collect_stations, MAX_STATIONS
+        from live_ring_buffer import SampleRingBuffer
+        from live_view import LiveView
+        from acquisition_telemetry import load_telemetry
+        from run_catalog import search_log_names, sync_catalog
+    except Exception as e:
+        backend['error'] = e
+    finally:
+        backend['loaded'] = True
+
+
+def on_window_shown(event):
+    # First <Map> of the main window: start loading everything the window doesn't need to appear
+    if event.widget is not root or startup['window_shown_s'] is not None:
+        return
+    startup['window_shown_s'] = time.perf_counter() - STARTUP_TIME
+    startup['heavy_modules_at_show'] = [name for name in HEAVY_MODULES if name in sys.modules]
+    plot_workers.start()
+    threading.Thread(target=load_backend, name="backend-import", daemon=True).start()
+    root.after(50, poll_startup)
+
+
+def poll_startup():
+    if plot_workers.ready and startup['plot_worker_ready_s'] is None:
+        startup['plot_worker_ready_s'] = time.perf_counter() - STARTUP_TIME
+    if backend['loaded'] and not backend['ready']:
+        if backend['error'] is None:
+            finish_startup()
+        else:
+            health_label.configure(text=f"Could not load the collection modules: {backend['error']}")
+
+    if backend['loaded'] and startup['plot_worker_ready_s'] is not None:
+        if STARTUP_REPORT:
+            startup['backend_error'] = None if backend['error'] is None else str(backend['error'])
+            print("STARTUP " + json.dumps(startup))
+            on_quit_button_click()
+        return
+    root.after(50, poll_startup)
+
+
+def finish_startup():
+    # Back on the Tk thread with the collection modules imported: build what needs them
+    global live_ring, live_view
+    backend['ready'] = True
+    startup['backend_ready_s'] = time.perf_counter() - STARTUP_TIME
+    build_station_rows()
+    live_ring = SampleRingBuffer()
+    live_view = LiveView(root, live_ring)
+    live_view.widget.place(x=30, y=520, width=840, height=280)
+    health_label.configure(text="No run yet")
+    refresh_dropdown()
+    sync_catalog_in_background()
+    for button in (collect_data_button, plot_data_button):
+        button.configure(state=tk.NORMAL)
+    root.after(JOB_POLL_MS, poll_jobs)
+
+
+def poll_jobs():
+    # Job threads never touch Tk: their progress is read here and the job list redrawn
+    for job in jobs.poll():
+        if job.kind == 'plot' and job.state == 'failed':
+            print(f"{job.title} failed: {job.error}")
+            messagebox.showerror("Plot Data", f"{job.title} failed: {job.error}")
+    show_jobs()
+    root.after(JOB_POLL_MS, poll_jobs)
+
+
+def show_jobs():
+    shown = set(job_list.get_children())
+    for job in jobs.jobs:
+        progress = "" if job.progress is None else f"{job.progress:.0%}"
+        values = (job.title, job.state, progress, job.detail)
+        iid = str(job.id)
+        if iid in shown:
+            job_list.item(iid, values=values)
+            shown.discard(iid)
+        else:
+            job_list.insert("", 0, iid=iid, values=values)
+    for iid in shown:
+        job_list.delete(iid) # pruned by the job manager
+
+
+def submit_plot(action, title, interactive=True, **request):
+    # Plots run in the plot worker processes, the job thread waits for its plot to finish
+    # (for interactive plots: until its windows are closed)
+    def work(job):
+        try:
+            plot_workers.run(dict(request, action=action, interactive=interactive), cancel_event=job.cancel_event,
+                             on_progress=lambda stage: job.report(progress=STAGE_PROGRESS.get(stage), detail=stage))
+        except PlotCancelled:
+            raise RuntimeError("cancelled")
+
+    def done(job):
+        if backend['ready']:
+            refresh_dropdown() # plotting adds the analysis to the run catalog
+
+    return jobs.submit('plot', title, work, on_done=done)
+
+
+def request_plot(filepath, base_name, timestamp, interactive=True):
+    return submit_plot('plot', f"Plot {os.path.basename(filepath)}", interactive=interactive,
+                       filepath=filepath, base_name=base_name, timestamp=timestamp)
+
+
+def request_replot(filename):
+    return submit_plot('replot', f"Replot {filename}", filename=filename)
+
+
+# Function to get file names from the run catalog of encoder_logs (CSV logs only, the .rec columnar copies are loaded automatically)
+# query filters them, e.g. '616-00021 CCW 3.8V' or 'serial:616-00021 healthy:no' (see run_catalog.search_runs)
+def get_log_files(query=""):
+    try:
+        return search_log_names(LOG_DIR, query)
+    except Exception as e:
+        print(f"Run catalog query failed: {e}")
+        return []
+
+
+def refresh_dropdown():
+    dropdown.configure(values=get_log_files(search_var.get()))
+
+
+def sync_catalog_in_background():
+    # Picks up logs copied in or deleted behind the tool's back, the dropdown is filled from the catalog meanwhile
+    def sync():
+        try:
+            sync_catalog(LOG_DIR)
+        except Exception as e:
+            print(f"Run catalog sync failed: {e}")
+
+    def poll_sync():
+        # Tk calls stay on the Tk thread
+        if thread.is_alive():
+            root.after(100, poll_sync)
+        else:
+            refresh_dropdown()
+
+    thread = threading.Thread(target=sync, name="catalog-sync", daemon=True)
+    thread.start()
+    root.after(100, poll_sync)
+
+# Live view state: decoded angles go from the collection thread into live_ring, LiveView redraws from it
+# (both are created in finish_startup)
+live_ring = None
+live_view = None
+HEALTH_LINES = 4    # lines of health text that fit above the stations
 
 # Callback functions for buttons
 def on_collect_data_button_click():
     input_text = entry_box.get(
 
     )
-    if not input_text or input_text == 'None':
+    if jobs.active('collect'):
+        messagebox.showinfo("Collect Data", "A data collection is already running.")
+        return
+
+    # The name box above goes with the first station row, the other rows have their own names
+    names = [input_text] + [name_entry.get() for name_entry in station_names[1:]]
+    stations = []
+    for name, port_entry, status_label in zip(names, station_ports, station_status):
+        status_label.configure(text="", fg="white")
+        name, port = name.strip(), port_entry.get().strip()
+        if name and name != 'None' and port:
+            station = Station(name, port, live_buffer=live_ring if not stations else None) # live view follows the first station
+            station.status_label = status_label
+            stations.append(station)
+    if not stations:
         # Create a pop up that prints "No name for data collection has been given. Input name to plot."
         messagebox.showinfo("Collect Data", "No name for data collection has been given. Input name to plot.")
         return
-    print(f"Collect Data clicked with input: {input_text}")
-    EncoderDataCollector(input_text)
+    print(f"Collect Data clicked with input: {', '.join(f'{s.port}={s.base_name}' for s in stations)}")
+
+    # Collect as a background job so the window (and the live view) keeps updating. Cancelling
+    # it stops the stations like the Stop button: their logs are flushed and still plotted.
+    live_ring.clear()
+
+    def collect(job):
+        return collect_stations(stations, SAMPLING_DURATION, stop_event=job.cancel_event)
+
+    def watch(job):
+        for station in stations:
+            station.status_label.configure(text=station.status())
+        job.report(job.elapsed() / SAMPLING_DURATION, f"{job.elapsed():.0f} of {SAMPLING_DURATION} s")
+
+    title = f"Collect {', '.join(station.base_name for station in stations)}"
+    jobs.submit('collect', title, collect, on_done=lambda job: collection_done(job, stations), watch=watch)
+    live_view.start()
+
+
+def collection_done(job, stations):
+    live_view.stop()
+    for station in stations:
+        station.status_label.configure(text=station.status())
+    if job.state == 'failed':
+        show_health([], f"Collection failed: {job.error}")
+        messagebox.showerror("Collect Data", f"Data collection failed: {job.error}")
+        return
+
+    reports = []
+    for station in stations:
+        telemetry = load_telemetry(station.result[0]) if station.result is not None else None
+        station.status_label.configure(fg="#22aa22" if telemetry is not None and telemetry['healthy'] else "#cc2222")
+        reports.append((station, telemetry))
+    show_health(reports)
+
+    # Each log is plotted by its own job. With several stations the plots are only saved,
+    # showing them all at once would bury the window.
+    refresh_dropdown()
+    results = [station.result for station in stations if station.result is not None]
+    for result in results:
+        request_plot(*result, interactive=len(results) == 1)
+
+
+def show_health(reports, message=None):
+    # Green light if every station lost nothing, red with the reasons otherwise
+    good = [telemetry is not None and telemetry['healthy'] for _, telemetry in reports]
+    lines = [message] if message else []
+    if len(reports) > 1:
+        lines.append(f"{sum(good)}/{len(reports)} stations healthy")
+    for station, telemetry in reports:
+        prefix = f"{station.port}: " if len(reports) > 1 else ""
+        if telemetry is None:
+            lines.append(prefix + (f"failed: {station.error}" if station.error is not None else "no telemetry was saved"))
+            continue
+        if len(reports) == 1:
+            totals = telemetry['totals']
+            lines.append(f"{totals['messages']} messages at {totals['mean_rate']:.0f} msg/s, "
+                         f"{totals['bytes_discarded']} B discarded, max backlog {totals['max_backlog_bytes']} B")
+        lines.extend(prefix + problem for problem in telemetry['problems'])
+    if len(lines) > HEALTH_LINES:
+        lines = lines[:HEALTH_LINES - 1] + [f"... and {len(lines) - HEALTH_LINES + 1} more, see the .telemetry.json files"]
+    health_light.itemconfigure(health_dot, fill="#22aa22" if good and all(good) else "#cc2222")
+    health_label.configure(text="\n".join(lines))
+
+
+def on_stop_button_click():
+    for job in jobs.active('collect'):
+        print("Stop Collection clicked")
+        job.cancel()
+
+
+def on_cancel_job_button_click():
+    # The selected job, or the newest one still running
+    selected = {int(iid) for iid in job_list.selection()}
+    targets = [job for job in jobs.active() if job.id in selected] or jobs.active()[-1:]
+    for job in targets:
+        print(f"Cancel Job clicked for: {job.title}")
+        job.cancel()
 
 
 
@@ -64,12 +330,22 @@ def on_plot_data_button_click():
         messagebox.showinfo("Plot Data", "Select data to plot. No data has been selected.")
         return
     print(f"Plot data clicked for: {selected}")
-    replot_encoder_data(selected)
+    request_replot(selected)
 
 def on_quit_button_click():
     print("Quit Program clicked")
+    jobs.shutdown() # stops a running collection
+    plot_workers.close()
     root.destroy()
 
+def on_search_changed(*args):
+    if not backend['ready']:
+        return # the dropdown is filled once the run catalog is loaded
+    refresh_dropdown()
+    matches = dropdown.cget('values')
+    if dropdown_var.get() not in matches:
+        dropdown_var.set("")
+
 def on_dropdown_select(event):
     selected = dropdown_var.get()
     print(f"Selected log file: {selected}")
@@ -77,8 +353,9 @@ def on_dropdown_select(event):
 # Create the main application window
 root = tk.Tk()
 root.title("I2 Encoder Inspection Tool")
-root.geometry("900x550")
+root.geometry("900x920")
 root.configure(bg="#1e1e1e")  # Dark background
+root.bind("<Map>", on_window_shown)
 
 # Style for dark-themed ttk widgets
 style = ttk.Style()
@@ -88,16 +365,21 @@ style.configure("TCombobox",
                 background="#2e2e2e",
                 foreground="white")
 
+# Search box, filters the dropdown through the run catalog as you type
+search_var = tk.StringVar()
+search_box = tk.Entry(root, textvariable=search_var, width=14, bg="#2e2e2e", fg="white", insertbackground="white")
+search_box.place(x=30, y=80)
+search_var.trace_add("write", on_search_changed)
+
 # Dropdown menu
 dropdown_var = tk.StringVar()
-log_files = get_log_files()
-dropdown = ttk.Combobox(root, textvariable=dropdown_var, values=log_files, state="readonly", width=40)
+dropdown = ttk.Combobox(root, textvariable=dropdown_var, values=[], state="readonly", width=27)
 dropdown.bind("<<ComboboxSelected>>", on_dropdown_select)
-dropdown.place(x=30, y=80)
+dropdown.place(x=135, y=80)
 
 # "Plot data" button
 plot_data_button = tk.Button(root, text="Plot data", command=on_plot_data_button_click,
-                    bg="#333333", fg="white", activebackground="#444444")
+                    bg="#333333", fg="white", activebackground="#444444", state=tk.DISABLED)
 plot_data_button.place(x=350, y=78)
 
 # Entry box to the left of "Collect Data"
@@ -106,15 +388,64 @@ entry_box.place(x=30, y=30)
 
 # "Collect Data" button
 collect_data_button = tk.Button(root, text="Collect Data", command=on_collect_data_button_click,
-                    bg="#333333", fg="white", activebackground="#444444")
+                    bg="#333333", fg="white", activebackground="#444444", state=tk.DISABLED)
 collect_data_button.place(x=350, y=28)
 
+# "Stop Collection" button, ends a running collection early (what was captured still gets plotted)
+stop_button = tk.Button(root, text="Stop Collection", command=on_stop_button_click,
+                    bg="#333333", fg="white", activebackground="#aa0000")
+stop_button.place(x=250, y=130)
+
 # "Quit Program" button
 quit_button = tk.Button(root, text="Quit Program", command=on_quit_button_click,
                     bg="#333333", fg="white", activebackground="#aa0000")
 quit_button.place(x=140, y=130)
 
 
+# Health light of the last collection, filled in from its telemetry sidecar
+health_light = tk.Canvas(root, width=20, height=20, bg="#1e1e1e", highlightthickness=0)
+health_dot = health_light.create_oval(2, 2, 18, 18, fill="#555555", outline="")
+health_light.place(x=30, y=180)
+health_label = tk.Label(root, text="Loading...", bg="#1e1e1e", fg="white", anchor="nw", justify="left", wraplength=380)
+health_label.place(x=60, y=180)
+
+
+# Stations: the first row's name is the box above, every row with a port and a name is collected
+tk.Label(root, text="Port        Station name (extra stations)", bg="#1e1e1e", fg="white").place(x=30, y=280)
+station_ports, station_names, station_status = [], [entry_box], []
+
+def build_station_rows():
+    # Called from finish_startup, the row count and default port come from the collection modules
+    for i in range(MAX_STATIONS):
+        y = 305 + i*26
+        port_entry = tk.Entry(root, width=8, bg="#2e2e2e", fg="white", insertbackground="white")
+        port_entry.place(x=30, y=y)
+        if i == 0:
+            port_entry.insert(0, SERIAL_PORT)
+            tk.Label(root, text="(name from the box above)", bg="#1e1e1e", fg="gray").place(x=100, y=y)
+        else:
+            name_entry = tk.Entry(root, width=24, bg="#2e2e2e", fg="white", insertbackground="white")
+            name_entry.place(x=100, y=y)
+            station_names.append(name_entry)
+        status_label = tk.Label(root, text="", bg="#1e1e1e", fg="white", anchor="w", width=22)
+        status_label.place(x=280, y=y)
+        station_ports.append(port_entry)
+        station_status.append(status_label)
+
+
+# Job list: running and recent collections and plots, "Cancel Job" stops the selected one
+tk.Label(root, text="Jobs", bg="#1e1e1e", fg="white").place(x=30, y=808)
+style.configure("Treeview", background="#2e2e2e", fieldbackground="#2e2e2e", foreground="white")
+job_list = ttk.Treeview(root, columns=("job", "state", "progress", "detail"), show="headings", height=3)
+for column, heading, width in (("job", "Job", 330), ("state", "State", 80), ("progress", "Progress", 70), ("detail", "Detail", 260)):
+    job_list.heading(column, text=heading)
+    job_list.column(column, width=width, stretch=column == "detail")
+job_list.place(x=30, y=830, width=740, height=80)
+cancel_job_button = tk.Button(root, text="Cancel Job", command=on_cancel_job_button_click,
+                    bg="#333333", fg="white", activebackground="#aa0000")
+cancel_job_button.place(x=790, y=830)
+
+
 # Place instructions on the right side
 for i, line in enumerate(instructions):
     label = tk.Label(root, text=line, bg="#1e1e1e", fg="white", anchor="w", justify="left")
@@ -2,13 +2,17 @@ import serial
 import csv
 import time
 import os
-from plot_csv import plot_encoders
+import threading
+from frame_decoder import COARSE_MAX_COUNTS, FINE_MAX_COUNTS, HEADER_BYTE, CSV_HEADER
+from acquisition_pipeline import AcquisitionPipeline
+from columnar_log import ColumnarLogWriter, columnar_path_for
+from acquisition_telemetry import telemetry_path_for
+from run_catalog import record_run
+from raw_capture import capture_raw, decode_raw_capture, raw_path_for
 
 #DC Voltage For Fast ~ 9.23V
 #DC Voltage For Slow ~ 3.8V
-#Firmware Version: r56d06d41-log-i2aX
-COARSE_MAX_COUNTS=5198400   #max counts for coarse motor encoder
-FINE_MAX_COUNTS=327680      #max counts for fine work encoder
+#Firmware version, COARSE_MAX_COUNTS and FINE_MAX_COUNTS live in frame_decoder.py with the rest of the protocol constants
 
 
 
@@ -52,13 +56,52 @@ def command_conversion(hex_str):
 
 
 
-def EncoderDataCollector(base_name):
-
-
+def _wait_for_start(start_barrier):
+    if start_barrier is not None:
+        try:
+            start_barrier.wait()
+        except threading.BrokenBarrierError:
+            pass # another station failed to start, collect anyway
+
+
+
+SAMPLING_DURATION = 600      # Default sample duration in seconds (10 min data collection), multi-hour soaks use soak_mode.py
+SERIAL_PORT = 'COM3'         # Change to your actual serial port
+BAUDRATE = 460800            # Given Baudrate from John's Firmware
+
+
+def EncoderDataCollector(base_name, sampling_duration=SAMPLING_DURATION, live_buffer=None, stop_event=None, plot=True,
+                         port=SERIAL_PORT, baudrate=BAUDRATE, ser=None, timestamp=None, start_barrier=None, on_start=None,
+                         raw=False):
+    """
+    Collects encoder data from the serial port into encoder_logs/ and plots it.
+
+    Args:
+        base_name: run name, 'Serial-Number_direction_Voltage'.
+        sampling_duration: seconds to collect for.
+        live_buffer: optional live_ring_buffer.SampleRingBuffer fed with decoded angles (GUI live view).
+        stop_event: optional threading.Event, setting it ends the collection early.
+        plot: call plot_encoders when done. The GUI passes False when collecting on a worker
+              thread and plots on the Tk thread instead.
+        port: serial port, e.g. a serial_simulator.PtyFeeder port when testing without hardware.
+        baudrate: serial baud rate.
+        ser: already opened serial port to read instead of opening `port` (closed when done).
+        timestamp: log timestamp, defaults to now. Stations collected together share one.
+        start_barrier: optional threading.Barrier waited on right before collecting, so
+                       several stations start together (see multi_station.collect_stations).
+        on_start: optional function called with the AcquisitionPipeline before it starts,
+                  lets the caller watch its counters.
+        raw: capture the raw serial bytes to '<log name>.raw' and decode them after the run
+             (raw_capture.py) instead of decoding while collecting. Nothing is decoded during
+             the run, so live_buffer and on_start are not used, and the telemetry sidecar
+             is written from the decode totals. The decode runs in this process, python
+             raw_capture.py re-decodes in parallel.
+
+    Returns:
+        Tuple (filepath, base_name, timestamp) of the log that was written. The run's health
+        counters are saved next to it, see acquisition_telemetry.load_telemetry.
+    """
 
-    HEADER_BYTE = 0x5A          # 'Z'
-    MESSAGE_LENGTH = 31         # 1-byte header + 24-byte payload # will need to increase from 25 to 31 to incorporate index
-    SAMPLING_DURATION = 600      # Sample Duration in seconds (set to 10 min data collection for now
 
 
     # Create logs subfolder if it doesn't exist
@@ -66,116 +109,73 @@ def EncoderDataCollector(base_name):
     os.makedirs(log_folder, exist_ok=True)
 
     # Generate timestamp and full filename
-    timestamp = time.strftime("%Y%m%d_%H%M%S")  # e.g., 20250415_154501
+    if timestamp is None:
+        timestamp = time.strftime("%Y%m%d_%H%M%S")  # e.g., 20250415_154501
     filename = f"{base_name}_{timestamp}.csv"
     filepath = os.path.join(log_folder, filename)
 
 
 
-    ser = serial.Serial(
-        port='COM3',            # Change to your actual serial port
-        baudrate=460800,        # Given Baudrate from John's Firmware
-        timeout=1
-    )
-
-    buffer = bytearray()
-    message_count = 0
+    if ser is None:
+        ser = serial.Serial(
+            port=port,
+            baudrate=baudrate,
+            timeout=1
+        )
 
-    # Start timing
-    start_time = time.time()
-    end_time = start_time + SAMPLING_DURATION
+    if raw:
+        raw_path = raw_path_for(filepath)
+        try:
+            print(f"Capturing raw serial bytes for {sampling_duration} seconds to: {raw_path}")
+            _wait_for_start(start_barrier)
+            capture_raw(ser, raw_path, sampling_duration, stop_event=stop_event, base_name=base_name,
+                        timestamp=timestamp, port=port, baudrate=baudrate)
+        finally:
+            ser.close()
+        decode_raw_capture(raw_path, workers=1, overwrite=True)
+        try:
+            record_run(filepath)
+        except Exception as e:
+            print(f"Could not add the run to the catalog: {e}")
+        if plot:
+            from plot_csv import plot_encoders
+            plot_encoders(filepath,base_name,timestamp)
+        return filepath, base_name, timestamp
 
     with open(filepath, mode='w', newline='', encoding='utf-8') as file:
         writer = csv.writer(file)
-        writer.writerow([
-            'Message #',
-            #'Elapsed Time (ms)',
-            'Coarse Encoder Counts (6B)', # Motor Encoder Counts
-            'Coarse Degree',
-            'Fine Encoder Counts (6B)', # Work/Glass Encoder Counts
-            'Fine Degree',
-            'Index Angle',
-            'Coarse Encoder Commands (4B)', # Motor Commands -> called encoder commands for convention only
-            'Fine Encoder Commands (4B)', # Work/Glass Encoder Counts
-            #'Inner Encoder Counts (4B)' # Not Being used as of this implementation
-        ])
-
-        print(f"Listening for messages starting with 'Z' (0x{HEADER_BYTE:02X}) for {SAMPLING_DURATION} seconds...")
+        writer.writerow(CSV_HEADER)
+
+        print(f"Listening for messages starting with 'Z' (0x{HEADER_BYTE:02X}) for {sampling_duration} seconds...")
+
+        # Typed columnar copy of the log for fast reloading in plot_encoders
+        columnar = ColumnarLogWriter(columnar_path_for(filepath), base_name, timestamp)
+
+        # Reader thread drains the port, this thread frames, decodes and writes in batches
+        pipeline = AcquisitionPipeline(ser, writer, columnar=columnar, live_buffer=live_buffer,
+                                       label=port if start_barrier is not None else None)
+        if on_start is not None:
+            on_start(pipeline)
 
         try:
             print(f"Logging to: {filepath}")
-            while time.time() < end_time:
-                if ser.in_waiting:
-                    buffer += ser.read(ser.in_waiting)
-                    while True:
-                        try:
-                            start = buffer.index(HEADER_BYTE)
-                        except ValueError:
-                            break
-
-                        if len(buffer) - start >= MESSAGE_LENGTH:
-                            message = buffer[start:start + MESSAGE_LENGTH]
-                            payload_bytes = message[1:]  # Strip header
-
-                            # Submessage slices
-                            c_encoder_com = payload_bytes[0:4]
-                            c_encoder_cts = payload_bytes[4:10]
-                            f_encoder_cts = payload_bytes[10:16]
-                            f_encoder_com = payload_bytes[16:20]
-                            i_encoder_cts = payload_bytes[20:24] #unused might also include commands, will check during implementation
-                            fine_index = payload_bytes[24:] #Gives back absolute angle of work encoder
-
-                            #Flips the bytes that john sends to give expected vals
-                            true_c_encoder_com = c_encoder_com[::-1]
-                            true_c_encoder_cts = c_encoder_cts[::-1]
-                            true_f_encoder_cts = f_encoder_cts[::-1]
-                            true_f_encoder_com = f_encoder_com[::-1]
-                            true_i_encoder_cts = i_encoder_cts[::-1]
-                            true_fine_index = fine_index[::-1]
-
-                            # Decode submessages (hex)
-                            true_c_encoder_com_str = true_c_encoder_com.decode(errors='replace')
-                            true_c_encoder_cts_str = true_c_encoder_cts.decode(errors='replace')
-                            true_f_encoder_cts_str = true_f_encoder_cts.decode(errors='replace')
-                            true_f_encoder_com_str = true_f_encoder_com.decode(errors='replace')
-                            true_i_encoder_cts_str = true_i_encoder_cts.decode(errors='replace')
-                            true_fine_index_str = true_fine_index.decode(errors='replace')
-
-                            c_degrees = coarse_hex_to_angle(true_c_encoder_cts_str)
-                            f_degrees = -fine_hex_to_angle(true_f_encoder_cts_str) # -sign is to swap sign convention of work encoder angle
-                            absolute_index = -fine_hex_to_angle(true_fine_index_str) # The actual angle read from the index point
-
-                            c_cmd_val = command_conversion(true_c_encoder_com_str)
-                            f_cmd_val = command_conversion(true_f_encoder_com_str)
-
-
-                            elapsed_time_ms = int((time.time() - start_time) * 1000)
-                            message_count += 1
-
-                            print(f"[{message_count}] [{elapsed_time_ms} ms] Coarse Encoder Commands: {true_c_encoder_com_str} | Coarse Encoder Counts(Degrees): {c_degrees} | Fine Encoder Counts(Degrees): {f_degrees} | Fine Encoder Commands: {true_f_encoder_com_str} | Inner Encoder Counts: {true_i_encoder_cts_str} |Absolute Index Angle {absolute_index}")
-
-                            writer.writerow([
-                                message_count, #changed data collection for 1st column to message count instead of elapsed_time_ms
-                                #elapsed_time_ms,
-                                true_c_encoder_cts_str, #ASCII read for debug
-                                #c_encoder_cts_int, #byte to int for debug
-                                c_degrees, #not coming out correct Should give -180 to 180
-                                true_f_encoder_cts_str,
-                                f_degrees,
-                                absolute_index,
-                                c_cmd_val, #Coarse Encoder Commands Value
-                                f_cmd_val #Fine Encoder Commands Value
-                                #true_i_encoder_cts_str
-                            ])
-
-                            buffer = buffer[start + MESSAGE_LENGTH:]
-                        else:
-                            break
+            _wait_for_start(start_barrier)
+            pipeline.run(sampling_duration, stop_event=stop_event)
 
         finally:
-            print(f"Done logging {message_count} messages.")
-
-            plot_encoders(filepath,base_name,timestamp)
+            pipeline.print_summary()
+            file.flush()
+            columnar.close()
+            pipeline.telemetry.write(telemetry_path_for(filepath), pipeline, log=filename, base_name=base_name,
+                                     timestamp=timestamp, port=port, baudrate=baudrate)
+            try:
+                record_run(filepath)
+            except Exception as e:
+                print(f"Could not add the run to the catalog: {e}")
+
+            if plot:
+                from plot_csv import plot_encoders # pandas/matplotlib, only loaded when plotting here
+                plot_encoders(filepath,base_name,timestamp)
             # to see if bit swap works
             #print(c_encoder_cts)
 
@@ -184,3 +184,5 @@ def EncoderDataCollector(base_name):
             #print(c_encoder_cts_int)
 
             ser.close()
+
+    return filepath, base_name, timestamp
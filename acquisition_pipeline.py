@@ -0,0 +1,213 @@
+import queue
+import threading
+import time
+import numpy as np
+from frame_decoder import decode_frames, decoded_to_rows
+from serial_framer import SerialFramer
+from acquisition_telemetry import AcquisitionTelemetry
+
+QUEUE_MAX_CHUNKS = 1024             # bounded hand-off between the reader thread and the decoder/writer
+MAX_SPILL_BYTES = 16 * 1024 * 1024  # bytes the reader holds on to while the queue is full before dropping
+STATUS_INTERVAL = 1.0               # seconds between console summary lines
+BATCH_INTERVAL = 0.01               # decode/write at most this often, so every numpy batch holds several frames
+READ_INTERVAL = 0.002               # reader pause when less than READ_MIN_BYTES are waiting
+READ_MIN_BYTES = 256
+
+
+class SerialReader(threading.Thread):
+    """
+    Reader thread that only drains the serial port into a bounded queue.
+
+    Nothing else happens on this thread so a slow terminal or disk can't back up the
+    UART. If the queue is full the bytes are held in a local spill buffer and handed
+    over on the next read; past MAX_SPILL_BYTES the oldest spilled bytes are dropped.
+    A None is queued once the reader stops.
+    """
+
+    def __init__(self, ser, max_chunks=QUEUE_MAX_CHUNKS):
+        super().__init__(name="serial-reader", daemon=True)
+        self.ser = ser
+        self.chunks = queue.Queue(maxsize=max_chunks)
+        self.stop_event = threading.Event()
+        self.error = None
+
+        self.bytes_read = 0
+        self.overflow_count = 0     # reads that found the queue full
+        self.dropped_bytes = 0      # bytes thrown away because the spill buffer was full too
+        self.queue_high_water = 0   # deepest the queue got, in chunks
+        self.backlog_high_water = 0 # largest ser.in_waiting seen, in bytes
+        self._backlog_max = 0       # largest ser.in_waiting since the last take_backlog_max()
+
+    def run(self):
+        spill = bytearray()
+        try:
+            while not self.stop_event.is_set():
+                # Blocks for up to ser.timeout when the line is idle
+                waiting = self.ser.in_waiting
+                if waiting < READ_MIN_BYTES:
+                    # Let a few frames pile up rather than waking for every byte or two
+                    time.sleep(READ_INTERVAL)
+                    waiting = self.ser.in_waiting
+                if waiting > self._backlog_max:
+                    self._backlog_max = waiting
+                data = self.ser.read(waiting or 1)
+                if not data:
+                    continue
+                self.bytes_read += len(data)
+
+                if spill:
+                    spill += data
+                    data = bytes(spill)
+                try:
+                    self.chunks.put_nowait(data)
+                    spill.clear()
+                except queue.Full:
+                    self.overflow_count += 1
+                    if not spill:
+                        spill += data
+                    if len(spill) > MAX_SPILL_BYTES:
+                        excess = len(spill) - MAX_SPILL_BYTES
+                        del spill[:excess]
+                        self.dropped_bytes += excess
+                self.queue_high_water = max(self.queue_high_water, self.chunks.qsize())
+        except Exception as e:
+            self.error = e
+        finally:
+            try:
+                if spill:
+                    self.chunks.put(bytes(spill), timeout=1.0)
+                self.chunks.put(None, timeout=1.0)
+            except queue.Full:
+                pass # consumer also stops once this thread is dead and the queue is empty
+
+    def take_backlog_max(self):
+        """Returns the largest port backlog since the last call and starts a new window."""
+        # Unlocked: a read landing between these lines only loses one backlog reading
+        backlog, self._backlog_max = self._backlog_max, 0
+        self.backlog_high_water = max(self.backlog_high_water, backlog)
+        return backlog
+
+    def stats(self):
+        """Returns the reader counters as a dict."""
+        return {
+            'bytes_read': self.bytes_read,
+            'overflow_count': self.overflow_count,
+            'dropped_bytes': self.dropped_bytes,
+            'queue_high_water': self.queue_high_water,
+            'queue_capacity': self.chunks.maxsize,
+            'backlog_high_water': max(self.backlog_high_water, self._backlog_max),
+        }
+
+
+class AcquisitionPipeline:
+    """
+    Producer/consumer acquisition: SerialReader thread -> framer -> batch decoder -> CSV.
+
+    run() is the decoder/writer stage. It drains every chunk waiting in the queue, frames
+    and decodes them in one batch and writes the rows with writerows (and to the
+    optional columnar_log.ColumnarLogWriter). Decoded angles also go to the optional
+    live ring buffer. Every STATUS_INTERVAL seconds the counters are sampled into
+    `telemetry` (acquisition_telemetry.AcquisitionTelemetry) and printed as one line.
+    telemetry_samples caps how many of those per-second samples are kept (soak runs).
+    """
+
+    def __init__(self, ser, writer, columnar=None, live_buffer=None, status_interval=STATUS_INTERVAL, label=None,
+                 telemetry_samples=None):
+        self.reader = SerialReader(ser)
+        self.framer = SerialFramer()
+        self.writer = writer
+        self.columnar = columnar
+        self.live_buffer = live_buffer      # live_ring_buffer.SampleRingBuffer feeding the GUI live view
+        self.status_interval = status_interval
+        self.prefix = f"[{label}] " if label else ""   # tells the console lines of concurrent stations apart
+        self.message_count = 0
+        self.invalid_frames = 0     # frames that were framed but failed to decode
+        self.telemetry = AcquisitionTelemetry(max_samples=telemetry_samples)
+        self.start_time = None
+
+    def run(self, duration, stop_event=None):
+        """
+        Collects for `duration` seconds, then stops the reader and drains what it already read.
+
+        Setting stop_event (threading.Event) ends the run early the same way.
+        """
+        self.start_time = time.time()
+        end_time = self.start_time + duration
+        next_status = self.start_time + self.status_interval
+        chunks = self.reader.chunks
+
+        self.telemetry.start(time.perf_counter(), self)
+        self.reader.start()
+        try:
+            finished = False
+            while not finished:
+                now = time.time()
+                if now >= end_time or (stop_event is not None and stop_event.is_set()):
+                    self.reader.stop_event.set()
+                if now >= next_status:
+                    sample = self.telemetry.sample(time.perf_counter(), self)
+                    print(self.prefix + self.telemetry.status_line(sample, self))
+                    next_status = now + self.status_interval
+
+                try:
+                    chunk = chunks.get(timeout=0.1)
+                except queue.Empty:
+                    if not self.reader.is_alive():
+                        break
+                    continue
+                batch_start = time.perf_counter()
+
+                # Take everything that is already waiting so it is decoded and written as one batch
+                batch = []
+                while chunk is not None:
+                    batch.append(chunk)
+                    try:
+                        chunk = chunks.get_nowait()
+                    except queue.Empty:
+                        break
+                finished = chunk is None
+
+                for data in batch:
+                    self.framer.feed(data)
+                self._write_frames(self.framer.read_frames())
+
+                # The per-batch numpy overhead dwarfs the per-frame cost, decoding every chunk
+                # as it arrives (a frame or two) would burn most of a core per station
+                remaining = BATCH_INTERVAL - (time.perf_counter() - batch_start)
+                if remaining > 0 and not finished:
+                    time.sleep(remaining)
+        finally:
+            self.reader.stop_event.set()
+            self.reader.join()
+            self.telemetry.sample(time.perf_counter(), self) # the partial last interval
+
+        if self.reader.error is not None:
+            raise self.reader.error
+
+    def _write_frames(self, frames):
+        if not frames:
+            return
+        decoded = decode_frames(frames)
+        rows = decoded_to_rows(decoded, self.message_count + 1)
+        self.invalid_frames += len(decoded['valid']) - len(rows)
+        if rows and self.message_count == 0:
+            self.telemetry.first_frame(self)
+        self.writer.writerows(rows)
+        if self.columnar is not None:
+            self.columnar.write(decoded, self.message_count + 1)
+        if self.live_buffer is not None:
+            valid = decoded['valid']
+            self.live_buffer.push(message=np.arange(self.message_count + 1, self.message_count + 1 + len(rows)),
+                                  c_degrees=decoded['c_degrees'][valid],
+                                  f_degrees=decoded['f_degrees'][valid])
+        self.message_count += len(rows)
+
+    def print_summary(self):
+        """Prints the end-of-run message, framing and queue counters."""
+        framing = self.framer.stats()
+        reading = self.reader.stats()
+        print(f"{self.prefix}Done logging {self.message_count} messages.")
+        print(f"{self.prefix}Framing: {framing['bytes_fed']} bytes read, {framing['bytes_skipped']} bytes skipped over {framing['resync_count']} resyncs, {framing['pending_bytes']} bytes left unframed.")
+        print(f"{self.prefix}Reader queue: high-water {reading['queue_high_water']}/{reading['queue_capacity']} chunks, {reading['overflow_count']} overflows, {reading['dropped_bytes']} bytes dropped.")
+        health = self.telemetry.summary(self)
+        print(self.prefix + ("Health: OK" if health['healthy'] else "Health: PROBLEMS - " + "; ".join(health['problems'])))
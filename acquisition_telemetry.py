@@ -0,0 +1,177 @@
+import json
+import os
+import numpy as np
+from frame_decoder import MESSAGE_LENGTH
+
+# Health counters of one capture, sampled once a second by AcquisitionPipeline.
+#
+# Every sample only diffs the cumulative counters the reader, framer and pipeline already
+# keep, so telemetry costs nothing per frame. At the end of a run the samples and totals
+# are written as a JSON sidecar next to the log (<log name>.telemetry.json).
+#
+# The frames carry no sequence number (the 'Message #' column is numbered by the host), so
+# lost frames are inferred: every resync after the first good frame means at least one
+# frame was cut short or corrupted, plus frames that failed to decode and bytes dropped by
+# the reader. "Rate gaps" are seconds in which far fewer messages arrived than in a typical
+# second of the run.
+
+TELEMETRY_SUFFIX = ".telemetry.json"
+RATE_GAP_FRACTION = 0.9         # a full second with fewer messages than this x the median rate is a gap
+MAX_LOST_FRAMES = 0             # estimated lost frames a run may have and still count as healthy
+
+# Per-second columns of the sidecar
+SAMPLE_FIELDS = ('time_s', 'frames', 'invalid_frames', 'bytes_read', 'bytes_discarded', 'resyncs',
+                 'max_backlog_bytes', 'queue_depth')
+
+
+def telemetry_path_for(log_path):
+    """Returns the path of the telemetry sidecar that goes with a log."""
+    return os.path.splitext(log_path)[0] + TELEMETRY_SUFFIX
+
+
+def load_telemetry(log_path):
+    """Returns the telemetry of a log, or None if it has no (readable) sidecar."""
+    path = telemetry_path_for(log_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable telemetry {path}: {e}")
+        return None
+
+
+class AcquisitionTelemetry:
+    """Per-second samples of an AcquisitionPipeline's counters."""
+
+    def __init__(self, max_samples=None):
+        self.samples = {name: [] for name in SAMPLE_FIELDS}
+        self.max_samples = max_samples  # per-second samples kept (the latest), None keeps all
+        self.samples_dropped = 0
+        self.start_time = None
+        self.end_time = None
+        self.sync_bytes = None      # bytes skipped before the first good frame (normal start-up, not a loss)
+        self.sync_resyncs = None
+        self._last = None
+
+    def _counters(self, pipeline):
+        framer = pipeline.framer
+        return {
+            'frames': pipeline.message_count,
+            'invalid_frames': pipeline.invalid_frames,
+            'bytes_read': pipeline.reader.bytes_read,
+            'bytes_discarded': framer.bytes_skipped,
+            'resyncs': framer.resync_count,
+        }
+
+    def start(self, now, pipeline):
+        """Takes the reference counters at the start of the run."""
+        self.start_time = now
+        self._last = self._counters(pipeline)
+
+    def first_frame(self, pipeline):
+        """Called when the first frame decodes, whatever was skipped before it was the initial sync."""
+        if self.sync_bytes is None:
+            self.sync_bytes = pipeline.framer.bytes_skipped
+            self.sync_resyncs = pipeline.framer.resync_count
+
+    def sample(self, now, pipeline):
+        """
+        Records the counters since the previous sample.
+
+        Returns:
+            Dict of this sample's values (SAMPLE_FIELDS).
+        """
+        counters = self._counters(pipeline)
+        sample = {name: counters[name] - self._last[name] for name in counters}
+        sample['time_s'] = round(now - self.start_time, 3)
+        sample['max_backlog_bytes'] = pipeline.reader.take_backlog_max()
+        sample['queue_depth'] = pipeline.reader.chunks.qsize()
+        for name in SAMPLE_FIELDS:
+            self.samples[name].append(sample[name])
+        if self.max_samples is not None and len(self.samples['time_s']) > self.max_samples * 1.1:
+            # Long (soak) runs: forget the oldest seconds in one go, not one per sample
+            excess = len(self.samples['time_s']) - self.max_samples
+            for values in self.samples.values():
+                del values[:excess]
+            self.samples_dropped += excess
+        self._last = counters
+        self.end_time = now
+        return sample
+
+    def status_line(self, sample, pipeline):
+        """One console line for a sample."""
+        interval = sample['time_s'] - (self.samples['time_s'][-2] if len(self.samples['time_s']) > 1 else 0.0)
+        rate = sample['frames'] / interval if interval > 0 else 0.0
+        return (f"[{sample['time_s']:6.1f} s] {pipeline.message_count} messages ({rate:.0f} msg/s) | "
+                f"{sample['bytes_read']} B read | {sample['bytes_discarded']} B discarded, {sample['resyncs']} resyncs | "
+                f"backlog max {sample['max_backlog_bytes']} B | queue {sample['queue_depth']}/{pipeline.reader.chunks.maxsize}")
+
+    def rate_gaps(self):
+        """Times (s) of the full seconds whose message count fell under RATE_GAP_FRACTION x the median."""
+        frames = np.array(self.samples['frames'], dtype=float)
+        times = np.array(self.samples['time_s'], dtype=float)
+        if len(frames) < 3:
+            return []
+        # First and last samples cover partial seconds (start-up, stop), leave them out
+        inner = frames[1:-1]
+        typical = np.median(inner)
+        if typical <= 0:
+            return []
+        return times[1:-1][inner < RATE_GAP_FRACTION * typical].tolist()
+
+    def summary(self, pipeline):
+        """Run totals and the health verdict."""
+        framing = pipeline.framer.stats()
+        reading = pipeline.reader.stats()
+        synced = self.sync_bytes is not None
+        sync_bytes = self.sync_bytes if synced else framing['bytes_skipped']
+        lost_bytes = framing['bytes_skipped'] - sync_bytes
+        lost_resyncs = framing['resync_count'] - self.sync_resyncs if synced else 0
+        duration = (self.end_time - self.start_time) if self.end_time is not None else 0.0
+        gaps = self.rate_gaps()
+
+        totals = {
+            'duration_s': round(duration, 3),
+            'messages': pipeline.message_count,
+            'mean_rate': pipeline.message_count / duration if duration > 0 else 0.0,
+            'invalid_frames': pipeline.invalid_frames,
+            'bytes_read': reading['bytes_read'],
+            'bytes_discarded': framing['bytes_skipped'],
+            'sync_bytes': sync_bytes,
+            'resyncs': framing['resync_count'],
+            'reader_dropped_bytes': reading['dropped_bytes'],
+            'reader_overflows': reading['overflow_count'],
+            'max_backlog_bytes': reading['backlog_high_water'],
+            'queue_high_water': reading['queue_high_water'],
+            'estimated_lost_frames': (lost_resyncs + -(-reading['dropped_bytes'] // MESSAGE_LENGTH)
+                                      + pipeline.invalid_frames),
+            'rate_gaps': len(gaps),
+        }
+        if self.samples_dropped:
+            totals['per_second_samples_dropped'] = self.samples_dropped # rate gaps only cover the kept seconds
+
+        problems = []
+        if pipeline.message_count == 0:
+            problems.append("no messages were received")
+        if totals['estimated_lost_frames'] > MAX_LOST_FRAMES:
+            problems.append(f"about {totals['estimated_lost_frames']} frames lost "
+                            f"({lost_resyncs} resyncs after {lost_bytes} B discarded, {reading['dropped_bytes']} B dropped, "
+                            f"{pipeline.invalid_frames} invalid frames)")
+        if gaps:
+            problems.append(f"message rate dropped in {len(gaps)} second(s), first at {gaps[0]:.0f} s")
+        if reading['queue_high_water'] >= reading['queue_capacity']:
+            problems.append("reader queue filled up")
+        return {'totals': totals, 'healthy': not problems, 'problems': problems, 'rate_gap_times_s': gaps}
+
+    def write(self, path, pipeline, **info):
+        """Writes the sidecar JSON (info: extra top-level fields such as the log name)."""
+        report = dict(info)
+        report.update(self.summary(pipeline))
+        report['per_second'] = self.samples
+        temp_path = path + ".tmp"
+        with open(temp_path, mode='w', encoding='utf-8') as file:
+            json.dump(report, file, indent=1)
+        os.replace(temp_path, path)
+        return report
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+# Persistent cache of the derived arrays and stats that plot_encoders computes, so
+# reopening a run only costs the render time.
+#
+# Entries live in <log folder>/.analysis_cache/<log name>.<key>.npz (<log name>.<kind>.<key>.npz
+# for other derived results, e.g. kind='profile' for velocity_profile). The key covers the
+# log's identity (size, mtime and a hash of its first/last bytes, for the CSV and its .rec
+# copy) and the analysis parameters (window length, polyorder, COARSE/FINE_MAX_COUNTS, ...),
+# so changing any of them misses and replaces the old entry. The folder is capped at
+# MAX_CACHE_BYTES, least recently used entries are evicted first (a hit refreshes mtime).
+
+CACHE_DIR_NAME = ".analysis_cache"
+CACHE_VERSION = 2      # bumped when the same log and params give different results (2: exact CSV float parsing)
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+HASH_SAMPLE_BYTES = 1 << 16
+
+
+def _file_fingerprint(path):
+    """Size, mtime and a hash of the first and last HASH_SAMPLE_BYTES of a file."""
+    stat = os.stat(path)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, mode='rb') as file:
+        digest.update(file.read(HASH_SAMPLE_BYTES))
+        if stat.st_size > HASH_SAMPLE_BYTES:
+            file.seek(max(HASH_SAMPLE_BYTES, stat.st_size - HASH_SAMPLE_BYTES))
+            digest.update(file.read())
+    return [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+
+
+def cache_key(filepath, params):
+    """Key for a log analysed with the given parameters."""
+    from columnar_log import columnar_path_for
+
+    identity = {'version': CACHE_VERSION, 'params': params, 'log': _file_fingerprint(filepath)}
+    columnar_path = columnar_path_for(filepath)
+    if os.path.exists(columnar_path) and columnar_path != filepath:
+        identity['columnar'] = _file_fingerprint(columnar_path)
+    return hashlib.blake2b(json.dumps(identity, sort_keys=True).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _cache_dir(filepath):
+    return os.path.join(os.path.dirname(filepath) or ".", CACHE_DIR_NAME)
+
+
+def _entry_prefix(filepath, kind=None):
+    prefix = os.path.splitext(os.path.basename(filepath))[0] + "."
+    return prefix + kind + "." if kind else prefix
+
+
+def _pack(analysis):
+    """Flattens an analysis dict (arrays, 'series' pairs, json-able rest) into npz members."""
+    arrays = {}
+    meta = {}
+    for name, value in analysis.items():
+        if name == 'series':
+            for series_name, (x, y) in value.items():
+                arrays[f"series:{series_name}:x"] = x
+                arrays[f"series:{series_name}:y"] = y
+        elif isinstance(value, np.ndarray):
+            arrays[f"array:{name}"] = value
+        else:
+            meta[name] = value
+    arrays['meta'] = np.array(json.dumps(meta, default=float))
+    return arrays
+
+
+def _unpack(npz):
+    analysis = json.loads(str(npz['meta']))
+    for member in npz.files:
+        kind, _, name = member.partition(":")
+        if kind == 'array':
+            analysis[name] = npz[member]
+        elif kind == 'series':
+            series_name, axis = name.rsplit(":", 1)
+            pair = analysis.setdefault('series', {}).setdefault(series_name, [None, None])
+            pair[0 if axis == 'x' else 1] = npz[member]
+    if 'series' in analysis:
+        analysis['series'] = {name: tuple(pair) for name, pair in analysis['series'].items()}
+    return analysis
+
+
+def load_cached_analysis(filepath, params, kind=None):
+    """Returns the cached analysis of a log, or None on a miss."""
+    path = os.path.join(_cache_dir(filepath), _entry_prefix(filepath, kind) + cache_key(filepath, params) + ".npz")
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as npz:
+            analysis = _unpack(npz)
+    except Exception as e:
+        print(f"Ignoring unreadable analysis cache entry {path}: {e}")
+        return None
+    os.utime(path) # mark as recently used
+    return analysis
+
+
+def store_analysis(filepath, params, analysis, max_bytes=MAX_CACHE_BYTES, kind=None):
+    """Saves an analysis, drops older entries of the same log and kind, then evicts LRU entries over max_bytes."""
+    cache_dir = _cache_dir(filepath)
+    os.makedirs(cache_dir, exist_ok=True)
+    prefix = _entry_prefix(filepath, kind)
+    name = prefix + cache_key(filepath, params) + ".npz"
+
+    # Entries made with other parameters or an older version of the log are stale now
+    for entry in os.listdir(cache_dir):
+        if entry.startswith(prefix) and entry != name and entry[len(prefix):].count(".") == 1:
+            os.remove(os.path.join(cache_dir, entry))
+
+    # Write to a temp file first so a crash never leaves a half-written entry behind
+    temp_path = os.path.join(cache_dir, name + ".tmp")
+    with open(temp_path, mode='wb') as file:
+        np.savez(file, **_pack(analysis))
+    os.replace(temp_path, os.path.join(cache_dir, name))
+    evict(cache_dir, max_bytes)
+
+
+def evict(cache_dir, max_bytes=MAX_CACHE_BYTES):
+    """Deletes least recently used entries until the cache folder fits in max_bytes."""
+    entries = []
+    for entry in os.listdir(cache_dir):
+        if entry.endswith(".npz"):
+            stat = os.stat(os.path.join(cache_dir, entry))
+            entries.append((stat.st_mtime, stat.st_size, entry))
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.remove(os.path.join(cache_dir, entry))
+        total -= size
+
+
+def cached_analysis(filepath, params, compute, kind=None, profiler=None):
+    """
+    Returns the analysis of a log from the cache, computing and storing it on a miss.
+
+    Args:
+        filepath: log path.
+        params: json-able dict of everything the analysis depends on besides the log itself.
+        compute: function returning the analysis dict.
+        kind: name of the kind of result when it isn't the plot_encoders analysis.
+        profiler: optional stage_profiler.StageProfiler, times the cache lookup and store.
+    """
+    if profiler is None:
+        from stage_profiler import StageProfiler
+        profiler = StageProfiler(enabled=False)
+    with profiler.stage('cache_lookup'):
+        analysis = load_cached_analysis(filepath, params, kind)
+    if analysis is not None:
+        print(f"Using cached {kind or 'analysis'} for {os.path.basename(filepath)}")
+        return analysis
+    analysis = compute()
+    try:
+        with profiler.stage('cache_store'):
+            store_analysis(filepath, params, analysis, kind=kind)
+    except OSError as e:
+        print(f"Could not cache analysis of {os.path.basename(filepath)}: {e}")
+    return analysis
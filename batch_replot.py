@@ -0,0 +1,105 @@
+import argparse
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Headless batch reprocessing of the encoder_logs archive.
+#
+#   python batch_replot.py [--log-dir encoder_logs] [--workers N] [--force] [--profile]
+#
+# Every CSV log whose saved plots are missing or older than the log (or its .rec copy)
+# is replotted in a process pool. Workers use the non-interactive Agg backend, so
+# there are no windows and no plt.show. A failing log is reported and the rest of the
+# batch carries on. --profile saves a stage profile (stage_profiler.py) with every log's plots.
+
+LOG_DIR = "encoder_logs"
+
+
+def _init_worker():
+    # Must happen before pyplot is imported in the worker
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def _replot(filepath, profile=None):
+    """Worker: replots one log, returns the elapsed seconds."""
+    from plot_csv import plot_encoders, remove_extension
+
+    start = time.perf_counter()
+    name = remove_extension(os.path.basename(filepath))
+    plot_encoders(filepath, 'not_a_name', 'not_a_time', replotting_flag=1, filename=name, interactive=False, profile=profile)
+    return time.perf_counter() - start
+
+
+def _input_mtime(filepath):
+    from columnar_log import columnar_path_for
+
+    mtime = os.path.getmtime(filepath)
+    columnar_path = columnar_path_for(filepath)
+    if os.path.exists(columnar_path):
+        mtime = max(mtime, os.path.getmtime(columnar_path))
+    return mtime
+
+
+def is_up_to_date(filepath):
+    """True if all saved plots of a log exist and are newer than the log."""
+    from plot_csv import plot_output_paths, remove_extension
+
+    outputs = plot_output_paths(remove_extension(os.path.basename(filepath)))
+    if not all(os.path.exists(path) for path in outputs):
+        return False
+    return min(os.path.getmtime(path) for path in outputs) >= _input_mtime(filepath)
+
+
+def find_stale_logs(log_dir=LOG_DIR, force=False):
+    """CSV logs in log_dir that need replotting (all of them with force=True)."""
+    logs = [os.path.join(log_dir, f) for f in sorted(os.listdir(log_dir)) if f.lower().endswith(".csv")]
+    if force:
+        return logs
+    return [path for path in logs if not is_up_to_date(path)]
+
+
+def batch_replot(log_dir=LOG_DIR, workers=None, force=False, profile=None):
+    """
+    Replots every stale log in log_dir in a process pool.
+
+    profile: save stage profiles, None follows the ENCODER_PROFILE environment variable.
+
+    Returns:
+        Dict of filepath -> error message for the logs that failed (empty if all succeeded).
+    """
+    _init_worker() # the checks below import plot_csv (and pyplot) in this process too
+    pending = find_stale_logs(log_dir, force)
+    print(f"{len(pending)} log(s) to replot in '{log_dir}'.")
+    if not pending:
+        return {}
+
+    failures = {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(_replot, path, profile): path for path in pending}
+        for done, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                elapsed = future.result()
+                print(f"[{done}/{len(pending)}] {os.path.basename(path)} done in {elapsed:.1f} s")
+            except Exception as e:
+                failures[path] = "".join(traceback.format_exception_only(type(e), e)).strip()
+                print(f"[{done}/{len(pending)}] {os.path.basename(path)} FAILED: {failures[path]}")
+
+    print(f"Replotted {len(pending) - len(failures)}/{len(pending)} log(s) in {time.perf_counter() - start:.1f} s.")
+    for path, error in failures.items():
+        print(f"  failed: {path}: {error}")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regenerate saved plots for every encoder log that changed.")
+    parser.add_argument("--log-dir", default=LOG_DIR, help="folder with the CSV logs (default: encoder_logs)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="replot everything, even up to date logs")
+    parser.add_argument("--profile", action="store_true", default=None, help="save a stage profile with each log's plots")
+    args = parser.parse_args()
+    sys.exit(1 if batch_replot(args.log_dir, args.workers, args.force, args.profile) else 0)
@@ -0,0 +1,318 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+from frame_decoder import MESSAGE_LENGTH, decode_frames, decoded_to_rows
+from serial_framer import SerialFramer
+from acquisition_pipeline import AcquisitionPipeline
+from columnar_log import ColumnarLogWriter
+from serial_simulator import (BITS_PER_BYTE, SimulatedSerial, PtyFeeder, encode_frames, inject_noise,
+                              motion_profile, profile_from_log)
+
+# Acquisition throughput benchmark, runs on any Linux box without the controller.
+#
+#   python benchmark_acquisition.py [--seconds 3] [--bauds 460800 921600 ...] [--noise]
+#                                   [--replay encoder_logs/<log>.csv] [--pty] [--stations 8]
+#                                   [--baseline bench.json] [--save-baseline bench.json]
+#
+# Reports:
+#   - decode: frames/sec of SerialFramer and of decode_frames + decoded_to_rows on their own
+#   - end to end, per baud rate: AcquisitionPipeline fed by serial_simulator at line rate,
+#     latency from a frame's last byte arriving to its row being written (p50/p99/max),
+#     and the drop rate (frames the offline reference decodes that never reached the log,
+#     plus bytes the simulated UART buffer overran)
+#   - stations (--stations N): N ports collected at once like multi_station does, the CPU
+#     it costs (in cores) and the drops
+#
+# Exits 1 when a run at or below --required-baud (the firmware's 460800 by default) drops
+# frames, when decoding is slower than DECODE_HEADROOM x the fastest line rate tested, or
+# when a metric regressed past --tolerance against --baseline. Drops at the faster rates
+# are headroom figures and only fail when they got worse than the baseline. The full run
+# takes tens of seconds, so this stays a script; tests/test_benchmark_acquisition.py runs
+# the firmware rate checks on a short stream.
+
+BAUDRATES = (460800, 921600, 2000000, 4000000)
+REQUIRED_BAUDRATE = 460800      # rate the controller firmware runs at, must be drop free
+DECODE_FRAMES = 200_000
+DECODE_HEADROOM = 2.0           # decoder must keep up with this multiple of the line frame rate
+NOISE = {'partial_frame_prob': 0.001, 'stray_header_prob': 0.001, 'garbage_prob': 0.001}
+LATENCY_SLACK_S = 0.005         # absolute slack on latency regressions, timer jitter on a busy box
+DROP_RATE_SLACK = 0.001         # absolute slack on drop rate regressions at the faster rates
+CPU_SLACK_CORES = 0.05          # absolute slack on station CPU regressions
+
+
+class TimedWriter:
+    """csv writer wrapper that records when each batch of rows was written."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.times = []
+        self.counts = []
+
+    def writerows(self, rows):
+        self.writer.writerows(rows)
+        self.times.append(time.perf_counter())
+        self.counts.append(len(rows))
+
+    def row_times(self):
+        """perf_counter write time of every row, in row order."""
+        return np.repeat(np.array(self.times), np.array(self.counts, dtype=np.int64))
+
+
+def line_frame_rate(baudrate):
+    """Frames per second a fully used line carries."""
+    return baudrate / BITS_PER_BYTE / MESSAGE_LENGTH
+
+
+def reference_decode(stream, step=MESSAGE_LENGTH):
+    """
+    Frames the whole stream offline the same way the pipeline does.
+
+    Returns:
+        Array of the stream offset of the last byte of every valid frame, in log order.
+    """
+    framer = SerialFramer()
+    offsets = []
+    for start in range(0, len(stream), step):
+        framer.feed(stream[start:start + step])
+        frames = framer.read_frames()
+        if not frames:
+            continue
+        # Everything up to the end of the newest frame has been consumed, the frames of
+        # this feed lie back to back before that point
+        consumed = framer.bytes_fed - framer.pending_bytes
+        count = len(frames) // MESSAGE_LENGTH
+        ends = consumed - 1 - MESSAGE_LENGTH * np.arange(count - 1, -1, -1)
+        offsets.append(ends[decode_frames(frames)['valid']])
+    return np.concatenate(offsets) if offsets else np.empty(0, dtype=np.int64)
+
+
+def make_stream(frame_count, noise, replay=None, seed=0):
+    if replay:
+        columns = profile_from_log(replay, max_rows=frame_count)
+        repeats = -(-frame_count // len(columns['c_counts']))
+        columns = {name: np.tile(values, repeats)[:frame_count] for name, values in columns.items()}
+    else:
+        columns = motion_profile(frame_count, seed=seed)
+    frames = encode_frames(columns)
+    return inject_noise(frames, seed=seed, **(NOISE if noise else {}))
+
+
+def bench_decode(frame_count=DECODE_FRAMES, chunk_bytes=4096):
+    """Frames/sec of the framer and the batch decoder, without the serial port."""
+    stream = encode_frames(motion_profile(frame_count)).tobytes()
+
+    framer = SerialFramer()
+    start = time.perf_counter()
+    frame_batches = []
+    for offset in range(0, len(stream), chunk_bytes):
+        framer.feed(stream[offset:offset + chunk_bytes])
+        frame_batches.append(framer.read_frames())
+    framing_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    message = 1
+    for frames in frame_batches:
+        if frames:
+            rows = decoded_to_rows(decode_frames(frames), message)
+            message += len(rows)
+    decoding_s = time.perf_counter() - start
+
+    return {
+        'frames': frame_count,
+        'framer_fps': frame_count / framing_s,
+        'decode_fps': frame_count / decoding_s,
+        'total_fps': frame_count / (framing_s + decoding_s),
+    }
+
+
+def bench_end_to_end(baudrate, seconds, noise=False, replay=None, use_pty=False):
+    """Runs AcquisitionPipeline against a simulated port for about `seconds` of line time."""
+    frame_count = max(1, int(seconds * line_frame_rate(baudrate)))
+    stream = make_stream(frame_count, noise, replay)
+    reference_ends = reference_decode(stream)
+    line_seconds = len(stream) * BITS_PER_BYTE / baudrate
+
+    feeder = None
+    if use_pty:
+        import serial
+        feeder = PtyFeeder(stream, baudrate)
+        ser = serial.Serial(port=feeder.port, baudrate=baudrate, timeout=0.1)
+    else:
+        ser = SimulatedSerial(stream, baudrate=baudrate, timeout=0.1)
+
+    with tempfile.TemporaryDirectory() as folder:
+        with open(os.path.join(folder, "bench.csv"), mode='w', newline='', encoding='utf-8') as file, \
+                ColumnarLogWriter(os.path.join(folder, "bench.rec"), "bench", "bench") as columnar:
+            writer = TimedWriter(csv.writer(file))
+            pipeline = AcquisitionPipeline(ser, writer, columnar=columnar, status_interval=float('inf'))
+            if feeder is not None:
+                feeder.start()
+            start = time.perf_counter()
+            pipeline.run(line_seconds + 0.5)
+            elapsed = time.perf_counter() - start
+    if feeder is not None:
+        feeder.close()
+    ser.close()
+
+    written = pipeline.message_count
+    expected = len(reference_ends)
+    dropped = max(0, expected - written)
+    result = {
+        'baudrate': baudrate,
+        'line_fps': line_frame_rate(baudrate),
+        'expected_frames': expected,
+        'written_frames': written,
+        'dropped_frames': dropped,
+        'drop_rate': dropped / expected if expected else 0.0,
+        'reader_dropped_bytes': pipeline.reader.dropped_bytes,
+        'overrun_bytes': getattr(ser, 'overrun_bytes', 0),
+        'elapsed_s': elapsed,
+    }
+
+    # Latency needs the simulated arrival times, a pty only delivers the bytes
+    if not use_pty and written:
+        count = min(written, expected)
+        latency = writer.row_times()[:count] - ser.arrival_time(reference_ends[:count])
+        result.update({
+            'latency_p50_ms': float(np.percentile(latency, 50) * 1e3),
+            'latency_p99_ms': float(np.percentile(latency, 99) * 1e3),
+            'latency_max_ms': float(latency.max() * 1e3),
+        })
+    return result
+
+
+def bench_stations(count, baudrate, seconds):
+    """Collects from `count` simulated ports at once, each with its own pipeline and collection thread."""
+    frame_count = max(1, int(seconds * line_frame_rate(baudrate)))
+    streams = [encode_frames(motion_profile(frame_count, seed=i)).tobytes() for i in range(count)]
+    ports = [SimulatedSerial(stream, baudrate=baudrate, timeout=0.1) for stream in streams]
+    line_seconds = len(streams[0]) * BITS_PER_BYTE / baudrate
+
+    with tempfile.TemporaryDirectory() as folder:
+        files = [open(os.path.join(folder, f"station{i}.csv"), mode='w', newline='', encoding='utf-8') for i in range(count)]
+        pipelines = [AcquisitionPipeline(ser, csv.writer(file), status_interval=float('inf'))
+                     for ser, file in zip(ports, files)]
+        threads = [threading.Thread(target=pipeline.run, args=(line_seconds + 0.5,)) for pipeline in pipelines]
+        start_cpu = time.process_time()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - start_cpu
+        for file in files:
+            file.close()
+
+    written = sum(pipeline.message_count for pipeline in pipelines)
+    return {
+        'stations': count,
+        'baudrate': baudrate,
+        'expected_frames': frame_count * count,
+        'written_frames': written,
+        'dropped_frames': frame_count * count - written,
+        'overrun_bytes': sum(ser.overrun_bytes for ser in ports),
+        'cpu_cores': cpu / elapsed,
+        'elapsed_s': elapsed,
+    }
+
+
+def check_regressions(report, baseline=None, tolerance=0.3, required_baud=REQUIRED_BAUDRATE):
+    """Returns a list of failure messages (empty if the run is fine)."""
+    failures = []
+    fastest_line = max(run['line_fps'] for run in report['end_to_end'])
+    if report['decode']['total_fps'] < DECODE_HEADROOM * fastest_line:
+        failures.append(f"decode {report['decode']['total_fps']:.0f} fps is under {DECODE_HEADROOM:g}x the "
+                        f"{fastest_line:.0f} fps line rate")
+    for run in report['end_to_end']:
+        if run['baudrate'] > required_baud:
+            continue
+        if run['dropped_frames'] or run['overrun_bytes'] or run['reader_dropped_bytes']:
+            failures.append(f"{run['baudrate']} baud: dropped {run['dropped_frames']} frames, "
+                            f"{run['overrun_bytes']} bytes overran, {run['reader_dropped_bytes']} bytes dropped by the reader")
+    stations = report.get('stations')
+    if stations and stations['baudrate'] <= required_baud and (stations['dropped_frames'] or stations['overrun_bytes']):
+        failures.append(f"{stations['stations']} stations: dropped {stations['dropped_frames']} frames, "
+                        f"{stations['overrun_bytes']} bytes overran")
+
+    if baseline is None:
+        return failures
+    if report['decode']['total_fps'] < baseline['decode']['total_fps'] * (1 - tolerance):
+        failures.append(f"decode {report['decode']['total_fps']:.0f} fps regressed from {baseline['decode']['total_fps']:.0f} fps")
+    previous = {run['baudrate']: run for run in baseline['end_to_end']}
+    for run in report['end_to_end']:
+        old = previous.get(run['baudrate'])
+        if old is None:
+            continue
+        if run['drop_rate'] > old['drop_rate'] + DROP_RATE_SLACK:
+            failures.append(f"{run['baudrate']} baud: drop rate {run['drop_rate']:.4%} regressed from {old['drop_rate']:.4%}")
+        if 'latency_p99_ms' not in run or 'latency_p99_ms' not in old:
+            continue
+        limit = old['latency_p99_ms'] * (1 + tolerance) + LATENCY_SLACK_S * 1e3
+        if run['latency_p99_ms'] > limit:
+            failures.append(f"{run['baudrate']} baud: p99 latency {run['latency_p99_ms']:.2f} ms regressed from {old['latency_p99_ms']:.2f} ms")
+    old = baseline.get('stations')
+    if stations and old and old['stations'] == stations['stations'] and old['baudrate'] == stations['baudrate']:
+        if stations['cpu_cores'] > old['cpu_cores'] * (1 + tolerance) + CPU_SLACK_CORES:
+            failures.append(f"{stations['stations']} stations: CPU {stations['cpu_cores']:.2f} cores regressed from {old['cpu_cores']:.2f}")
+    return failures
+
+
+def print_report(report):
+    decode = report['decode']
+    print(f"Decode ({decode['frames']} frames): framer {decode['framer_fps']:,.0f} fps, "
+          f"decoder {decode['decode_fps']:,.0f} fps, combined {decode['total_fps']:,.0f} fps")
+    for run in report['end_to_end']:
+        latency = ""
+        if 'latency_p50_ms' in run:
+            latency = (f", latency p50 {run['latency_p50_ms']:.2f} ms / p99 {run['latency_p99_ms']:.2f} ms"
+                       f" / max {run['latency_max_ms']:.2f} ms")
+        print(f"{run['baudrate']:>8} baud ({run['line_fps']:,.0f} fps line rate): {run['written_frames']}/{run['expected_frames']} "
+              f"frames written, drop rate {run['drop_rate']:.4%}, {run['overrun_bytes']} bytes overran{latency}")
+    stations = report.get('stations')
+    if stations:
+        print(f"{stations['stations']} stations at {stations['baudrate']} baud: {stations['written_frames']}/{stations['expected_frames']} "
+              f"frames written, {stations['overrun_bytes']} bytes overran, CPU {stations['cpu_cores']:.2f} cores")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the acquisition pipeline against the serial simulator.")
+    parser.add_argument("--seconds", type=float, default=3.0, help="line time per baud rate (default: 3)")
+    parser.add_argument("--bauds", type=int, nargs="+", default=list(BAUDRATES), help="baud rates to run end to end")
+    parser.add_argument("--noise", action="store_true", help="mix partial frames, stray headers and garbage into the stream")
+    parser.add_argument("--replay", default=None, help="replay this log instead of a synthetic motion profile")
+    parser.add_argument("--pty", action="store_true", help="feed the pipeline through a pseudo-terminal and pyserial")
+    parser.add_argument("--stations", type=int, default=0, help="also collect this many ports at once (at the first baud rate)")
+    parser.add_argument("--required-baud", type=int, default=REQUIRED_BAUDRATE,
+                        help="runs up to this baud rate must not drop anything (default: 460800)")
+    parser.add_argument("--baseline", default=None, help="JSON report of an earlier run to compare against")
+    parser.add_argument("--save-baseline", default=None, help="write this run's JSON report here")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed relative regression (default: 0.3)")
+    args = parser.parse_args()
+
+    report = {'decode': bench_decode(), 'end_to_end': []}
+    for baudrate in args.bauds:
+        report['end_to_end'].append(bench_end_to_end(baudrate, args.seconds, args.noise, args.replay, args.pty))
+    if args.stations:
+        report['stations'] = bench_stations(args.stations, args.bauds[0], args.seconds)
+    print_report(report)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+    failures = check_regressions(report, baseline, args.tolerance, args.required_baud)
+
+    if args.save_baseline:
+        with open(args.save_baseline, mode='w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    sys.exit(1 if failures else 0)
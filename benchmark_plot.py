@@ -0,0 +1,177 @@
+import argparse
+import csv
+import json
+import os
+import shutil
+import sys
+import tempfile
+import numpy as np
+from frame_decoder import CSV_HEADER, decode_frames, decoded_to_rows
+from columnar_log import ColumnarLogWriter, columnar_path_for
+from serial_simulator import encode_frames, motion_profile
+
+# Stage-level benchmark of the plot_encoders pipeline over synthetic logs of growing size.
+#
+#   python benchmark_plot.py [--rows 10000 100000 1000000 10000000] [--repeat 3] [--csv]
+#                            [--data-dir DIR] [--baseline plot.json] [--save-baseline plot.json]
+#
+# Every size gets a log made the way the collector makes one (serial_simulator motion
+# profile -> frames -> decode_frames -> .rec, kept in --data-dir between runs) and is
+# plotted headless with profiling on (stage_profiler.py), the analysis cache cleared
+# before every repeat so each one is a cold replot. The fastest repeat counts. Logs
+# over plot_csv.CHUNKED_ANALYSIS_ROWS take the chunked path, so their stages differ.
+# --csv writes full CSV logs without the .rec copy instead, to time CSV parsing.
+#
+# Reports every stage's seconds per size, its peak memory at the largest size and its
+# scaling exponent (log-log slope of seconds vs rows between the smallest and the largest
+# size it ran at: ~1 linear, ~0 for the decimated figure stages).
+# Exits 1 when a stage scales worse than MAX_SCALING_EXPONENT, or when a stage time
+# regressed past --tolerance against --baseline. The full sizes take minutes, so this
+# stays a script; tests/test_benchmark_plot.py runs the same checks on small logs.
+
+ROW_COUNTS = (10_000, 100_000, 1_000_000, 10_000_000)
+GENERATE_BLOCK_ROWS = 1_000_000     # frames encoded and decoded at a time when making a log
+MAX_SCALING_EXPONENT = 1.3          # worse than this is superlinear, e.g. an accidental O(n^2) or O(n log n) blow-up
+SCALING_MIN_SECONDS = 0.05          # stages faster than this at the largest size are too noisy to fit
+TIME_SLACK_S = 0.05                 # absolute slack on top of --tolerance
+
+
+def make_log(data_dir, rows, csv_only=False):
+    """Synthetic log of `rows` samples in data_dir (reused if it is there), returns its CSV path."""
+    kind = "CSV" if csv_only else "REC"
+    path = os.path.join(data_dir, f"BENCH-{rows}-{kind}_CW_3.8V_20250101_000000.csv")
+    if os.path.exists(path):
+        return path
+
+    columns = motion_profile(rows)
+    temp_path = path + ".tmp"
+    # With a .rec the CSV only gets its header row, plot_csv reads the .rec when there is one
+    with open(temp_path, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADER)
+        columnar = None if csv_only else ColumnarLogWriter(columnar_path_for(path), "BENCH", "20250101_000000")
+        for start in range(0, rows, GENERATE_BLOCK_ROWS):
+            block = {name: values[start:start + GENERATE_BLOCK_ROWS] for name, values in columns.items()}
+            decoded = decode_frames(encode_frames(block))
+            if csv_only:
+                writer.writerows(decoded_to_rows(decoded, start + 1))
+            else:
+                columnar.write(decoded, start + 1)
+        if columnar is not None:
+            columnar.close()
+    os.replace(temp_path, path)
+    return path
+
+
+def bench_size(path, rows, repeat):
+    """Plots one log `repeat` times cold, returns the fastest run's stage totals."""
+    import plot_csv
+    from analysis_cache import CACHE_DIR_NAME
+    from plot_csv import plot_encoders, remove_extension
+
+    name = remove_extension(os.path.basename(path))
+    best = None
+    for _ in range(repeat):
+        shutil.rmtree(os.path.join(os.path.dirname(path), CACHE_DIR_NAME), ignore_errors=True)
+        plot_encoders(path, 'not_a_name', 'not_a_time', replotting_flag=1, filename=name, interactive=False, profile=True)
+        with open(os.path.join(plot_csv.plot_output_directory, name + "_profile.json"), encoding='utf-8') as file:
+            report = json.load(file)
+        if best is None or report['total_seconds'] < best['total_seconds']:
+            best = report
+    return {'rows': rows, 'total_seconds': best['total_seconds'], 'stages': best['totals']}
+
+
+def scaling_exponents(runs):
+    """Log-log slope of each stage's seconds vs rows, between the smallest and largest size it ran at."""
+    exponents = {}
+    stages = {stage for run in runs for stage in run['stages']}
+    for stage in stages:
+        points = [(run['rows'], run['stages'][stage]['seconds']) for run in runs if stage in run['stages']]
+        points = [(rows, seconds) for rows, seconds in points if seconds > 0]
+        if len(points) < 2 or points[-1][0] == points[0][0]:
+            continue
+        (rows_a, seconds_a), (rows_b, seconds_b) = points[0], points[-1]
+        exponents[stage] = {'exponent': float(np.log(seconds_b / seconds_a) / np.log(rows_b / rows_a)),
+                            'largest_rows': rows_b, 'largest_seconds': seconds_b}
+    return exponents
+
+
+def print_report(report):
+    runs = report['runs']
+    stages = []
+    for run in runs:
+        stages.extend(stage for stage in run['stages'] if stage not in stages)
+    print(f"{'stage':<28}" + "".join(f"{run['rows']:>12,}" for run in runs) + f"{'exponent':>10}{'peak MB':>10}")
+    for stage in stages:
+        depth = next(run['stages'][stage]['depth'] for run in runs if stage in run['stages'])
+        cells = "".join(f"{run['stages'][stage]['seconds']:11.3f}s" if stage in run['stages'] else f"{'-':>12}"
+                        for run in runs)
+        scaling = report['scaling'].get(stage)
+        exponent = f"{scaling['exponent']:10.2f}" if scaling else f"{'-':>10}"
+        peak = max(run['stages'][stage]['peak_bytes'] for run in runs if stage in run['stages']) / 1e6
+        print(f"{'  ' * depth + stage:<28}{cells}{exponent}{peak:10.1f}")
+    print("ns/row total: " + ", ".join(f"{run['rows']:,}: {run['total_seconds'] / run['rows'] * 1e9:,.0f}" for run in runs))
+
+
+def check_regressions(report, baseline=None, tolerance=0.3):
+    """Returns a list of failure messages (empty if the run is fine)."""
+    failures = []
+    for stage, scaling in report['scaling'].items():
+        if scaling['largest_seconds'] >= SCALING_MIN_SECONDS and scaling['exponent'] > MAX_SCALING_EXPONENT:
+            failures.append(f"{stage} scales as rows^{scaling['exponent']:.2f} up to {scaling['largest_rows']:,} rows")
+    if baseline is None:
+        return failures
+    previous = {run['rows']: run for run in baseline['runs']}
+    for run in report['runs']:
+        old = previous.get(run['rows'])
+        if old is None:
+            continue
+        for stage, total in run['stages'].items():
+            before = old['stages'].get(stage)
+            if before is not None and total['seconds'] > before['seconds'] * (1 + tolerance) + TIME_SLACK_S:
+                failures.append(f"{stage} at {run['rows']:,} rows: {total['seconds']:.3f} s regressed from {before['seconds']:.3f} s")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the plot_encoders stages over synthetic logs.")
+    parser.add_argument("--rows", type=int, nargs="+", default=list(ROW_COUNTS), help="log sizes in rows")
+    parser.add_argument("--repeat", type=int, default=3, help="cold runs per size, the fastest counts (default: 3)")
+    parser.add_argument("--csv", action="store_true", help="plot from full CSV logs instead of their .rec copies")
+    parser.add_argument("--data-dir", default=None, help="keep the synthetic logs here between runs (default: a temp folder)")
+    parser.add_argument("--baseline", default=None, help="JSON report of an earlier run to compare against")
+    parser.add_argument("--save-baseline", default=None, help="write this run's JSON report here")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed relative regression (default: 0.3)")
+    args = parser.parse_args()
+
+    import matplotlib
+    matplotlib.use("Agg")
+    import plot_csv
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="benchmark_plot_")
+    os.makedirs(data_dir, exist_ok=True)
+    plot_csv.plot_output_directory = os.path.join(data_dir, "plot outputs") # keep the synthetic figures out of the real folder
+    try:
+        runs = []
+        for rows in sorted(args.rows):
+            path = make_log(data_dir, rows, args.csv)
+            runs.append(bench_size(path, rows, args.repeat))
+        report = {'csv': args.csv, 'runs': runs, 'scaling': scaling_exponents(runs)}
+    finally:
+        if args.data_dir is None:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    print_report(report)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+    failures = check_regressions(report, baseline, args.tolerance)
+
+    if args.save_baseline:
+        with open(args.save_baseline, mode='w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    sys.exit(1 if failures else 0)
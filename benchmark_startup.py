@@ -0,0 +1,164 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# GUI startup-time benchmark.
+#
+#   python benchmark_startup.py [--repeat 5] [--no-gui] [--baseline startup.json] [--save-baseline startup.json]
+#
+# Reports:
+#   - imports: seconds to import each group of modules in a fresh interpreter (best of
+#     --repeat). 'window' is what the GUI imports before its window shows, 'eager' is
+#     everything it imported up front before the plotting stack was deferred, for comparison.
+#   - gui: EncoderDataCollectionGUI.py started for real with ENCODER_GUI_STARTUP_REPORT=1,
+#     seconds from the first line of the script until the window shows, the collection
+#     modules are loaded and the plot worker is warm. Needs a display, skipped without one.
+#   - plot worker: seconds from starting plot_worker.py until it is warm.
+#
+# Exits 1 when the window-time imports pull in a heavy module (numpy, pandas, matplotlib,
+# scipy, PIL, pyserial) or when a time regressed past --tolerance against --baseline.
+
+IMPORT_GROUPS = {
+    'window': ('tkinter', 'tkinter.ttk', 'tkinter.messagebox', 'plot_worker'),
+    'collection': ('EncoderDataCollector', 'multi_station', 'live_ring_buffer', 'acquisition_telemetry', 'run_catalog'),
+    'live_view': ('live_view',),
+    'plotting': ('plot_csv',),
+}
+IMPORT_GROUPS['eager'] = IMPORT_GROUPS['window'] + IMPORT_GROUPS['collection'] + IMPORT_GROUPS['live_view'] + IMPORT_GROUPS['plotting']
+HEAVY_MODULES = ('numpy', 'pandas', 'matplotlib', 'scipy', 'PIL', 'serial')
+GUI_TIMEOUT_S = 120
+TIME_SLACK_S = 0.05             # absolute slack on top of --tolerance, startup times are noisy
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_IMPORT_PROBE = (
+    "import json, sys, time\n"
+    "start = time.perf_counter()\n"
+    "for name in sys.argv[1:]:\n"
+    "    __import__(name)\n"
+    "elapsed = time.perf_counter() - start\n"
+    "print(json.dumps({'seconds': elapsed, 'heavy': [m for m in %r if m in sys.modules]}))\n" % (HEAVY_MODULES,)
+)
+
+
+def time_imports(modules, repeat=5):
+    """Best-of-`repeat` seconds to import `modules` in a fresh interpreter, and the heavy modules they load."""
+    best, heavy = None, []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", _IMPORT_PROBE, *modules], cwd=_HERE, capture_output=True,
+                                text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        heavy = result['heavy']
+        best = result['seconds'] if best is None else min(best, result['seconds'])
+    return {'seconds': best, 'heavy_modules': heavy}
+
+
+def time_gui(repeat=3):
+    """Starts the GUI `repeat` times, returns the best timings, or {"skipped": reason} without a display."""
+    env = dict(os.environ, ENCODER_GUI_STARTUP_REPORT="1")
+    runs = []
+    for _ in range(repeat):
+        try:
+            completed = subprocess.run([sys.executable, "EncoderDataCollectionGUI.py"], cwd=_HERE, env=env,
+                                       capture_output=True, text=True, timeout=GUI_TIMEOUT_S)
+        except subprocess.TimeoutExpired:
+            return {'skipped': f"the GUI did not report within {GUI_TIMEOUT_S} s"}
+        reports = [line[len("STARTUP "):] for line in completed.stdout.splitlines() if line.startswith("STARTUP ")]
+        if not reports:
+            reason = (completed.stderr.strip().splitlines() or ["no output"])[-1]
+            return {'skipped': f"the GUI did not start: {reason}"}
+        runs.append(json.loads(reports[-1]))
+    best = {name: min(run[name] for run in runs) for name in ('window_shown_s', 'backend_ready_s', 'plot_worker_ready_s')}
+    best['heavy_modules_at_show'] = sorted(set().union(*(run['heavy_modules_at_show'] for run in runs)))
+    return best
+
+
+def time_plot_worker(repeat=3):
+    """Best-of-`repeat` seconds from starting the plot worker until it is warm."""
+    from plot_worker import PlotWorker
+
+    best = None
+    for _ in range(repeat):
+        worker = PlotWorker()
+        start = time.perf_counter()
+        worker.start()
+        while not worker.ready:
+            if worker.process.poll() is not None:
+                raise RuntimeError("the plot worker exited while warming up")
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        worker.close()
+        best = elapsed if best is None else min(best, elapsed)
+    return {'seconds': best}
+
+
+def print_report(report):
+    print("Imports (fresh interpreter, best of runs):")
+    for name, result in report['imports'].items():
+        heavy = f" [loads {', '.join(result['heavy_modules'])}]" if result['heavy_modules'] else ""
+        print(f"  {name:<11} {result['seconds']:7.3f} s{heavy}")
+    eager, window = report['imports']['eager']['seconds'], report['imports']['window']['seconds']
+    print(f"  window imports are {eager / window:.0f}x faster than importing everything up front")
+    gui = report.get('gui')
+    if gui is not None and 'skipped' in gui:
+        print(f"GUI: skipped, {gui['skipped']}")
+    elif gui is not None:
+        print(f"GUI: window shown after {gui['window_shown_s']:.3f} s, collection ready after {gui['backend_ready_s']:.3f} s, "
+              f"plot worker warm after {gui['plot_worker_ready_s']:.3f} s")
+    print(f"Plot worker: warm after {report['plot_worker']['seconds']:.3f} s")
+
+
+def check_regressions(report, baseline=None, tolerance=0.3):
+    """Returns a list of failure messages (empty if the run is fine)."""
+    failures = []
+    heavy = report['imports']['window']['heavy_modules']
+    if heavy:
+        failures.append(f"the GUI imports {', '.join(heavy)} before its window shows")
+    gui = report.get('gui') or {}
+    if gui.get('heavy_modules_at_show'):
+        failures.append(f"{', '.join(gui['heavy_modules_at_show'])} loaded when the GUI window showed")
+    if baseline is None:
+        return failures
+
+    def compare(label, now, before):
+        if now is not None and before is not None and now > before * (1 + tolerance) + TIME_SLACK_S:
+            failures.append(f"{label} {now:.3f} s regressed from {before:.3f} s")
+
+    compare("window imports", report['imports']['window']['seconds'], baseline['imports']['window']['seconds'])
+    compare("plot worker warm-up", report['plot_worker']['seconds'], baseline['plot_worker']['seconds'])
+    old_gui = baseline.get('gui') or {}
+    for name in ('window_shown_s', 'backend_ready_s'):
+        compare(f"GUI {name}", gui.get(name), old_gui.get(name))
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the GUI startup time.")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement, the best counts (default: 5)")
+    parser.add_argument("--no-gui", action="store_true", help="skip starting the real GUI")
+    parser.add_argument("--baseline", default=None, help="JSON report of an earlier run to compare against")
+    parser.add_argument("--save-baseline", default=None, help="write this run's JSON report here")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed relative regression (default: 0.3)")
+    args = parser.parse_args()
+
+    report = {'imports': {name: time_imports(modules, args.repeat) for name, modules in IMPORT_GROUPS.items()}}
+    if not args.no_gui:
+        report['gui'] = time_gui(min(args.repeat, 3))
+    report['plot_worker'] = time_plot_worker(min(args.repeat, 3))
+    print_report(report)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+    failures = check_regressions(report, baseline, args.tolerance)
+
+    if args.save_baseline:
+        with open(args.save_baseline, mode='w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,282 @@
+import os
+import numpy as np
+import pandas as pd
+from savgol_smoothing import WINDOW_LENGTH, POLYORDER, halo_samples, savgol_smooth
+from columnar_log import CSV_COLUMNS, current_columnar_path, load_columnar_log
+
+# Out-of-core version of the plot_encoders analysis for multi-hour captures.
+# The log is read in chunks, unwrap carries its state from chunk to chunk and the
+# gradients / Savitzky-Golay filters are evaluated on chunks extended by a halo of
+# neighbouring samples, then trimmed. Every per-sample output is bit-for-bit the same
+# as running the in-memory path on the whole log, peak memory only depends on the
+# chunk size and the filter window.
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+ANALYSIS_FIELDS = ('message', 'c_degrees', 'f_degrees', 'absolute_index', 'c_cmd_val', 'f_cmd_val')
+
+
+def iter_log_columns(filepath, chunk_rows=DEFAULT_CHUNK_ROWS, start_row=0, fields=ANALYSIS_FIELDS):
+    """
+    Reads a log chunk by chunk.
+
+    Uses the memory-mapped columnar (.rec) file when there is an up to date one, otherwise
+    reads the CSV with pandas' chunked reader.
+
+    Yields:
+        Dicts of field name -> numpy array, each at most chunk_rows long, starting at start_row.
+    """
+    columnar_path = current_columnar_path(filepath)
+    if columnar_path is not None:
+        _, records = load_columnar_log(columnar_path)
+        for start in range(start_row, len(records), chunk_rows):
+            chunk = records[start:start + chunk_rows]
+            yield {name: np.array(chunk[name]) for name in fields}
+        return
+
+    row = 0
+    reader = pd.read_csv(filepath, skiprows=1, header=None, usecols=[CSV_COLUMNS[name] for name in fields],
+                         chunksize=chunk_rows, float_precision='round_trip')
+    for df in reader:
+        skip = max(0, start_row - row)
+        row += len(df)
+        if skip >= len(df):
+            continue
+        yield {name: df[CSV_COLUMNS[name]].values[skip:] for name in fields}
+
+
+def log_row_count(filepath):
+    """Number of data rows in a log, without loading it."""
+    columnar_path = current_columnar_path(filepath)
+    if columnar_path is not None:
+        _, records = load_columnar_log(columnar_path)
+        return len(records)
+
+    lines = 0
+    last = b"\n"
+    with open(filepath, mode='rb') as file:
+        while True:
+            block = file.read(1 << 24)
+            if not block:
+                break
+            lines += block.count(b"\n")
+            last = block[-1:]
+    if last != b"\n":
+        lines += 1 # no newline after the last row
+    return max(0, lines - 1) # header row
+
+
+def find_index_changes(filepath, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Streaming version of the index-change detection on the 'Index Angle' column.
+
+    Returns:
+        Tuple (list of rows where the value changes, value at the last change).
+    """
+    change_rows = []
+    previous = None
+    last_value = None
+    row = 0
+    for chunk in iter_log_columns(filepath, chunk_rows, fields=('absolute_index',)):
+        col = chunk['absolute_index']
+        if previous is None:
+            changed = np.concatenate(([True], col[1:] != col[:-1]))
+        else:
+            changed = np.concatenate(([col[0] != previous], col[1:] != col[:-1]))
+        rows = np.flatnonzero(changed)
+        if len(rows):
+            change_rows.extend((rows + row).tolist())
+            last_value = col[rows[-1]]
+        previous = col[-1]
+        row += len(col)
+    return change_rows, last_value
+
+
+class _Unwrapper:
+    """np.unwrap (in degrees) that carries its state across chunks."""
+
+    def __init__(self):
+        self._last_phase = None
+        self._correction = 0.0
+
+    def __call__(self, degrees):
+        p = np.deg2rad(degrees)
+        if self._last_phase is None:
+            dd = np.diff(p)
+        else:
+            dd = np.diff(np.concatenate(([self._last_phase], p)))
+
+        # Same steps as np.unwrap with period 2*pi
+        ddmod = np.mod(dd + np.pi, 2 * np.pi) - np.pi
+        np.copyto(ddmod, np.pi, where=(ddmod == -np.pi) & (dd > 0))
+        ph_correct = ddmod - dd
+        np.copyto(ph_correct, 0, where=abs(dd) < np.pi)
+
+        # Continue the running sum from the previous chunk (prepending keeps the summation order)
+        cumulative = np.cumsum(np.concatenate(([self._correction], ph_correct)))[1:]
+        up = np.array(p, dtype=float)
+        if self._last_phase is None:
+            up[1:] = p[1:] + cumulative
+        else:
+            up = p + cumulative
+
+        if len(p):
+            self._last_phase = p[-1]
+            if len(cumulative):
+                self._correction = cumulative[-1]
+        return np.rad2deg(up)
+
+
+class SlewStats:
+    """Online max/min/mean of a velocity series."""
+
+    def __init__(self):
+        self.maximum = -np.inf
+        self.minimum = np.inf
+        self.total = 0.0
+        self.count = 0
+
+    def update(self, values):
+        if len(values) == 0:
+            return
+        self.maximum = max(self.maximum, values.max())
+        self.minimum = min(self.minimum, values.min())
+        self.total += values.sum()
+        self.count += len(values)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else np.nan
+
+
+class ChunkedAnalysis:
+    """
+    Runs the plot_encoders analysis over a log in bounded memory.
+
+    Iterate chunks() to get the derived arrays piece by piece. Once it is exhausted,
+    coarse_stats / fine_stats hold the slew statistics of the whole run.
+    The mean is accumulated per chunk, so it can differ from numpy's pairwise
+    mean in the last bits. Everything else matches exactly.
+    """
+
+    def __init__(self, filepath, chunk_rows=DEFAULT_CHUNK_ROWS, window_length=WINDOW_LENGTH, polyorder=POLYORDER):
+        self.filepath = filepath
+        self.chunk_rows = chunk_rows
+        self.window_length = window_length
+        self.polyorder = polyorder
+        # Samples needed on each side of a chunk: the filter's halo plus two per gradient
+        self.halo = halo_samples(window_length, polyorder) + 4
+
+        self.change_rows = []
+        self.last_changed_value = None
+        self.coarse_offset = None
+        self.fine_offset = None
+        self.sample_count = 0
+        self.coarse_stats = SlewStats()
+        self.fine_stats = SlewStats()
+
+    def chunks(self):
+        """
+        Yields:
+            Dicts with 'time_s', 'y1_unwrapped', 'y2_unwrapped', 'y1_wrapped', 'y2_wrapped',
+            'dy1_dt', 'dy2_dt', 'd2y1_dt2', 'd2y2_dt2' and the four 'filtered_*' arrays
+            for consecutive pieces of the run.
+        """
+        self.change_rows, self.last_changed_value = find_index_changes(self.filepath, self.chunk_rows)
+        last_change_index = self.change_rows[-1]
+
+        samples = self._offset_samples(last_change_index)
+        buffer_t, buffer_y1, buffer_y2 = np.empty(0), np.empty(0), np.empty(0)
+        buffer_start = 0    # global sample number of buffer[0]
+        core_start = 0      # first sample not yet yielded
+        finished = False
+
+        while True:
+            try:
+                t, y1, y2 = next(samples)
+                buffer_t = np.concatenate((buffer_t, t))
+                buffer_y1 = np.concatenate((buffer_y1, y1))
+                buffer_y2 = np.concatenate((buffer_y2, y2))
+            except StopIteration:
+                finished = True
+
+            buffer_end = buffer_start + len(buffer_t)
+            while core_start < buffer_end:
+                if not finished and buffer_end - core_start < self.chunk_rows + self.halo:
+                    break # need the right-hand halo before this chunk can be finished
+                core_end = min(core_start + self.chunk_rows, buffer_end)
+                ext_start = max(buffer_start, core_start - self.halo)
+                ext_end = min(buffer_end, core_end + self.halo)
+
+                lo, hi = ext_start - buffer_start, ext_end - buffer_start
+                result = self._analyze(buffer_t[lo:hi], buffer_y1[lo:hi], buffer_y2[lo:hi],
+                                       ext_start, core_start - ext_start, core_end - core_start)
+                self.coarse_stats.update(result['dy1_dt'])
+                self.fine_stats.update(result['dy2_dt'])
+                self.sample_count += core_end - core_start
+                yield result
+                core_start = core_end
+
+            # Drop what no later chunk can reach
+            keep_from = max(buffer_start, core_start - self.halo) - buffer_start
+            buffer_t, buffer_y1, buffer_y2 = buffer_t[keep_from:], buffer_y1[keep_from:], buffer_y2[keep_from:]
+            buffer_start += keep_from
+
+            if finished:
+                return
+
+    def _offset_samples(self, last_change_index):
+        """Yields (time_s, y1_unwrapped, y2_unwrapped) per raw chunk, repeated times removed and offsets applied."""
+        unwrap_coarse, unwrap_fine = _Unwrapper(), _Unwrapper()
+        previous_time = None
+        for chunk in iter_log_columns(self.filepath, self.chunk_rows, start_row=last_change_index):
+            time_s = chunk['message'] / 1000.0
+            if self.coarse_offset is None:
+                self.fine_offset = chunk['absolute_index'][0]
+                self.coarse_offset = chunk['c_degrees'][0]
+                if self.coarse_offset < 0: self.coarse_offset += 360 # wraps to 360
+                if self.fine_offset < 0: self.fine_offset += 360 # wraps to 360
+
+            # Remove repeated time values
+            if previous_time is None:
+                valid = np.concatenate(([True], np.diff(time_s) != 0))
+            else:
+                valid = np.diff(np.concatenate(([previous_time], time_s))) != 0
+            if len(time_s):
+                previous_time = time_s[-1]
+
+            y1_unwrapped = unwrap_coarse(chunk['c_degrees'][valid])
+            y2_unwrapped = unwrap_fine(chunk['f_degrees'][valid])
+            y2_unwrapped -= self.fine_offset
+            y1_unwrapped -= self.coarse_offset
+            yield time_s[valid], y1_unwrapped, y2_unwrapped
+
+    def _analyze(self, time_s, y1_unwrapped, y2_unwrapped, ext_start, core_offset, core_length):
+        core = slice(core_offset, core_offset + core_length)
+
+        dy1_dt = np.gradient(y1_unwrapped, time_s)
+        dy2_dt = np.gradient(y2_unwrapped, time_s)
+        d2y1_dt2 = np.gradient(dy1_dt, time_s)
+        d2y2_dt2 = np.gradient(dy2_dt, time_s)
+
+        # offset keeps the FFT blocks on the same samples as a whole-run filter
+        filtered = savgol_smooth(np.vstack((dy1_dt, dy2_dt, d2y1_dt2, d2y2_dt2)),
+                                 window_length=self.window_length, polyorder=self.polyorder, offset=ext_start)
+        filtered = dict(zip(('filtered_dy1_dt', 'filtered_dy2_dt', 'filtered_d2y1_dt2', 'filtered_d2y2_dt2'), filtered))
+
+        y1 = y1_unwrapped[core]
+        y2 = y2_unwrapped[core]
+        result = {
+            'time_s': time_s[core],
+            'y1_unwrapped': y1,
+            'y2_unwrapped': y2,
+            'y1_wrapped': ((y1 + 180) % 360) - 180,
+            'y2_wrapped': ((y2 + 180) % 360) - 180,
+            'dy1_dt': dy1_dt[core],
+            'dy2_dt': dy2_dt[core],
+            'd2y1_dt2': d2y1_dt2[core],
+            'd2y2_dt2': d2y2_dt2[core],
+        }
+        for name, values in filtered.items():
+            result[name] = values[core]
+        return result
@@ -0,0 +1,232 @@
+import json
+import os
+import re
+import struct
+import sys
+import numpy as np
+from frame_decoder import COARSE_MAX_COUNTS, FINE_MAX_COUNTS, FIRMWARE_VERSION
+
+# Compact typed companion to the CSV log:
+#   8-byte magic | uint32 header length | JSON header (space padded) | fixed-size records
+# Records start on a RECORD_ALIGNMENT boundary so the file can be memory-mapped directly.
+# Rows are appended as they are decoded, the row count comes from the file size.
+
+COLUMNAR_EXTENSION = ".rec"
+MAGIC = b"I2ENCLOG"
+FORMAT_VERSION = 1
+RECORD_ALIGNMENT = 64
+STALE_AFTER_S = 2.0     # a .rec this much older than its CSV no longer matches it
+
+# Same column order as the CSV log, counts are stored as signed integers instead of hex strings
+LOG_DTYPE = np.dtype([
+    ('message', '<i8'),         # Message #
+    ('c_counts', '<i4'),        # Coarse (motor) encoder counts
+    ('c_degrees', '<f8'),       # Coarse Degree
+    ('f_counts', '<i4'),        # Fine (work/glass) encoder counts, firmware sign convention
+    ('f_degrees', '<f8'),       # Fine Degree
+    ('absolute_index', '<f8'),  # Index Angle
+    ('c_cmd_val', '<i4'),       # Coarse Encoder Commands
+    ('f_cmd_val', '<i4'),       # Fine Encoder Commands
+])
+
+# CSV column position of each record field (the CSV has no header row once skipped)
+CSV_COLUMNS = {name: i for i, name in enumerate(LOG_DTYPE.names)}
+
+_TIMESTAMP_SUFFIX = re.compile(r"_(\d{8}_\d{6})$")
+
+
+def columnar_path_for(csv_path):
+    """Returns the path of the columnar file that goes with a CSV log."""
+    return os.path.splitext(csv_path)[0] + COLUMNAR_EXTENSION
+
+
+def current_columnar_path(filepath):
+    """
+    Columnar file to read a log from, if it is up to date with the CSV.
+
+    Writers fill the CSV and the .rec side by side, so their modification times are
+    within moments of each other. A CSV modified later than that (edited, re-recorded
+    or copied over) makes the .rec stale, and the CSV has to be read instead.
+
+    Args:
+        filepath: path of the CSV log (or of the columnar file itself).
+
+    Returns:
+        Path of the .rec, or None when there is none or it is stale.
+    """
+    if filepath.endswith(COLUMNAR_EXTENSION):
+        return filepath
+    columnar_path = columnar_path_for(filepath)
+    if not os.path.exists(columnar_path):
+        return None
+    if os.path.exists(filepath) and os.path.getmtime(filepath) > os.path.getmtime(columnar_path) + STALE_AFTER_S:
+        return None
+    return columnar_path
+
+
+def split_log_name(filename):
+    """
+    Splits a log file name into its base name and timestamp.
+
+    Example: '616-00021_CCW_3.8V_20250425_142244.csv' -> ('616-00021_CCW_3.8V', '20250425_142244')
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    match = _TIMESTAMP_SUFFIX.search(stem)
+    if match is None:
+        return stem, ""
+    return stem[:match.start()], match.group(1)
+
+
+def decoded_to_records(decoded, first_message_number):
+    """Builds a LOG_DTYPE record array from decode_frames output (invalid frames skipped)."""
+    valid = decoded['valid']
+    records = np.empty(int(valid.sum()), dtype=LOG_DTYPE)
+    records['message'] = np.arange(first_message_number, first_message_number + len(records))
+    for name in LOG_DTYPE.names[1:]:
+        records[name] = decoded[name][valid]
+    return records
+
+
+class ColumnarLogWriter:
+    """Appends decoded frames to a columnar log file, written next to the CSV by the collector."""
+
+    def __init__(self, path, base_name, timestamp, **extra_header):
+        self.path = path
+        self.rows_written = 0
+        self._file = open(path, mode='wb')
+        _write_header(self._file, base_name, timestamp, extra_header)
+
+    def write(self, decoded, first_message_number):
+        self.write_records(decoded_to_records(decoded, first_message_number))
+
+    def write_records(self, records):
+        self._file.write(records.tobytes())
+        self.rows_written += len(records)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _write_header(file, base_name, timestamp, extra_header):
+    header = {
+        'format_version': FORMAT_VERSION,
+        'dtype': LOG_DTYPE.descr,
+        'firmware_version': FIRMWARE_VERSION,
+        'coarse_max_counts': COARSE_MAX_COUNTS,
+        'fine_max_counts': FINE_MAX_COUNTS,
+        'base_name': base_name,
+        'timestamp': timestamp,
+    }
+    header.update(extra_header)
+    header_bytes = json.dumps(header).encode('utf-8')
+
+    # Pad with spaces (still valid JSON) so the records start aligned
+    prefix_length = len(MAGIC) + 4
+    padded_length = -(-(prefix_length + len(header_bytes)) // RECORD_ALIGNMENT) * RECORD_ALIGNMENT
+    header_bytes += b" " * (padded_length - prefix_length - len(header_bytes))
+
+    file.write(MAGIC)
+    file.write(struct.pack('<I', len(header_bytes)))
+    file.write(header_bytes)
+
+
+def read_columnar_header(path):
+    """
+    Reads the JSON header of a columnar log.
+
+    Returns:
+        Tuple (header dict, byte offset of the first record).
+    """
+    with open(path, mode='rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an encoder columnar log")
+        (header_length,) = struct.unpack('<I', file.read(4))
+        header = json.loads(file.read(header_length).decode('utf-8'))
+    return header, len(MAGIC) + 4 + header_length
+
+
+def load_columnar_log(path):
+    """
+    Memory-maps a columnar log.
+
+    Returns:
+        Tuple (header dict, read-only LOG_DTYPE record array). A partly written last record is ignored.
+    """
+    header, offset = read_columnar_header(path)
+    dtype = np.dtype([tuple(field) for field in header['dtype']])
+    rows = (os.path.getsize(path) - offset) // dtype.itemsize
+    if rows == 0:
+        return header, np.zeros(0, dtype=dtype)
+    return header, np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(rows,))
+
+
+def csv_to_records(csv_path):
+    """Parses a CSV log into a LOG_DTYPE record array (hex count columns converted to signed ints)."""
+    import pandas as pd
+
+    df = pd.read_csv(csv_path, skiprows=1, header=None, dtype={1: str, 3: str}, float_precision='round_trip')
+    records = np.empty(len(df), dtype=LOG_DTYPE)
+    for name, column in CSV_COLUMNS.items():
+        if name in ('c_counts', 'f_counts'):
+            records[name] = [_signed_hex(value) for value in df[column].values]
+        else:
+            records[name] = df[column].values
+    return records
+
+
+def _signed_hex(hex_str):
+    bits = len(hex_str) * 4
+    value = int(hex_str, 16)
+    return value - (1 << bits) if value & (1 << (bits - 1)) else value
+
+
+def convert_csv_log(csv_path, overwrite=False):
+    """
+    Writes the columnar file for one existing CSV log.
+
+    Returns:
+        Path of the columnar file, or None if it was already up to date.
+    """
+    out_path = columnar_path_for(csv_path)
+    if not overwrite and os.path.exists(out_path) and os.path.getmtime(out_path) >= os.path.getmtime(csv_path):
+        return None
+
+    records = csv_to_records(csv_path)
+    base_name, timestamp = split_log_name(csv_path)
+    # Archive logs don't record which firmware produced them
+    with ColumnarLogWriter(out_path, base_name, timestamp, firmware_version=None, converted_from=os.path.basename(csv_path)) as writer:
+        writer.write_records(records)
+    return out_path
+
+
+def convert_csv_archive(log_folder="encoder_logs", overwrite=False):
+    """One-shot conversion of every CSV log in log_folder that has no up to date columnar file."""
+    converted = 0
+    for filename in sorted(os.listdir(log_folder)):
+        if not filename.lower().endswith(".csv"):
+            continue
+        csv_path = os.path.join(log_folder, filename)
+        try:
+            out_path = convert_csv_log(csv_path, overwrite=overwrite)
+        except Exception as e:
+            print(f"Could not convert {filename}: {e}")
+            continue
+        if out_path is not None:
+            converted += 1
+            print(f"Converted {filename} -> {os.path.basename(out_path)}")
+    print(f"Converted {converted} log(s) in '{log_folder}'.")
+
+
+if __name__ == "__main__":
+    # python columnar_log.py [log_folder] [--overwrite]
+    args = [arg for arg in sys.argv[1:] if arg != "--overwrite"]
+    convert_csv_archive(args[0] if args else "encoder_logs", overwrite="--overwrite" in sys.argv[1:])
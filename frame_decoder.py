@@ -0,0 +1,182 @@
+import numpy as np
+
+FIRMWARE_VERSION = "r56d06d41-log-i2aX"
+COARSE_MAX_COUNTS=5198400   #max counts for coarse motor encoder
+FINE_MAX_COUNTS=327680      #max counts for fine work encoder
+
+HEADER_BYTE = 0x5A          # 'Z'
+MESSAGE_LENGTH = 31         # 1-byte header + 30-byte payload (includes index)
+
+# Field positions inside a full frame (header included), as (start, stop)
+# Every field is sent as ASCII hex with the bytes reversed
+C_ENCODER_COM = (1, 5)      # Coarse (motor) commands, 4 hex chars
+C_ENCODER_CTS = (5, 11)     # Coarse (motor) encoder counts, 6 hex chars
+F_ENCODER_CTS = (11, 17)    # Fine (work/glass) encoder counts, 6 hex chars
+F_ENCODER_COM = (17, 21)    # Fine (work/glass) commands, 4 hex chars
+I_ENCODER_CTS = (21, 25)    # Inner encoder counts, unused for now
+FINE_INDEX = (25, 31)       # Absolute angle of the work encoder at the index point
+
+INVALID_NIBBLE = 0xFF
+
+# ASCII byte -> hex nibble lookup table, anything that is not a hex digit maps to INVALID_NIBBLE
+_NIBBLE_LUT = np.full(256, INVALID_NIBBLE, dtype=np.uint8)
+_NIBBLE_LUT[np.frombuffer(b"0123456789", dtype=np.uint8)] = np.arange(10)
+_NIBBLE_LUT[np.frombuffer(b"abcdef", dtype=np.uint8)] = np.arange(10, 16)
+_NIBBLE_LUT[np.frombuffer(b"ABCDEF", dtype=np.uint8)] = np.arange(10, 16)
+
+# Byte -> byte lookup table for the hex strings: 8-bit line noise becomes '?' so the
+# strings always decode as ASCII (such frames are invalid anyway, see _field_values)
+_ASCII_LUT = np.arange(256, dtype=np.uint8)
+_ASCII_LUT[0x80:] = ord("?")
+
+
+def frames_to_array(data):
+    """
+    Views a run of aligned frames as an (N, MESSAGE_LENGTH) uint8 array.
+
+    Args:
+        data: bytes-like object whose length is a multiple of MESSAGE_LENGTH,
+              or an existing uint8 array.
+
+    Returns:
+        2-D numpy array with one frame per row.
+    """
+    frames = np.frombuffer(data, dtype=np.uint8) if not isinstance(data, np.ndarray) else data
+    return frames.reshape(-1, MESSAGE_LENGTH)
+
+
+def _field_chars(frames, field):
+    """Returns the ASCII characters of a field in reading order (byte reversal undone)."""
+    start, stop = field
+    return frames[:, start:stop][:, ::-1]
+
+
+def _field_strings(frames, field):
+    """Returns the hex strings of a field exactly as the firmware sent them, one per frame."""
+    chars = _ASCII_LUT[_field_chars(frames, field)] # fancy indexing returns a contiguous copy
+    return chars.view(f"S{chars.shape[1]}").ravel().astype(f"U{chars.shape[1]}")
+
+
+def _field_values(frames, field):
+    """
+    Converts a field to signed integers using its two's complement width.
+
+    Returns:
+        Tuple (magnitude, is_negative, valid) of arrays, matching process_twos_complement_hex.
+    """
+    nibbles = _NIBBLE_LUT[_field_chars(frames, field)]
+    valid = (nibbles != INVALID_NIBBLE).all(axis=1)
+
+    width = nibbles.shape[1]
+    bits = width * 4
+    weights = np.left_shift(np.int64(1), 4 * np.arange(width - 1, -1, -1, dtype=np.int64))
+    value = nibbles.astype(np.int64) @ weights
+
+    is_negative = value >= (1 << (bits - 1))
+    magnitude = np.where(is_negative, ((1 << bits) - value) & ((1 << bits) - 1), value)
+    return magnitude, is_negative, valid
+
+
+def _counts_to_angle(frames, field, max_counts):
+    """Vectorized coarse_hex_to_angle / fine_hex_to_angle, also returns the signed counts."""
+    magnitude, is_negative, valid = _field_values(frames, field)
+    angle = (magnitude / max_counts) * 360
+    angle[is_negative] = -angle[is_negative]
+    counts = np.where(is_negative, -magnitude, magnitude)
+    return angle, counts, valid
+
+
+def _commands(frames, field):
+    """Vectorized command_conversion."""
+    magnitude, is_negative, valid = _field_values(frames, field)
+    return np.where(is_negative, -magnitude, magnitude), valid
+
+
+def decode_frames(frames):
+    """
+    Decodes a batch of aligned 31-byte 'Z' frames into columnar arrays.
+
+    Gives the same values as running each frame through process_twos_complement_hex,
+    coarse_hex_to_angle, fine_hex_to_angle and command_conversion one at a time.
+
+    Args:
+        frames: (N, MESSAGE_LENGTH) uint8 array, or bytes holding N whole frames.
+
+    Returns:
+        Dict of length-N arrays:
+            'c_encoder_cts_str', 'f_encoder_cts_str', 'c_encoder_com_str',
+            'f_encoder_com_str', 'i_encoder_cts_str' : hex strings as sent
+            'c_degrees', 'f_degrees', 'absolute_index' : angles in degrees (fine sign convention swapped)
+            'c_cmd_val', 'f_cmd_val' : signed command values
+            'c_counts', 'f_counts' : signed encoder counts (fine counts keep the firmware sign)
+            'valid' : False for frames holding non-hex characters
+    """
+    frames = frames_to_array(frames)
+
+    c_degrees, c_counts, c_valid = _counts_to_angle(frames, C_ENCODER_CTS, COARSE_MAX_COUNTS)
+    f_degrees, f_counts, f_valid = _counts_to_angle(frames, F_ENCODER_CTS, FINE_MAX_COUNTS)
+    absolute_index, _, i_valid = _counts_to_angle(frames, FINE_INDEX, FINE_MAX_COUNTS)
+    c_cmd_val, c_cmd_valid = _commands(frames, C_ENCODER_COM)
+    f_cmd_val, f_cmd_valid = _commands(frames, F_ENCODER_COM)
+
+    return {
+        'c_encoder_cts_str': _field_strings(frames, C_ENCODER_CTS),
+        'c_degrees': c_degrees,
+        'f_encoder_cts_str': _field_strings(frames, F_ENCODER_CTS),
+        'f_degrees': -f_degrees, # -sign is to swap sign convention of work encoder angle
+        'absolute_index': -absolute_index, # The actual angle read from the index point
+        'c_cmd_val': c_cmd_val,
+        'f_cmd_val': f_cmd_val,
+        'c_encoder_com_str': _field_strings(frames, C_ENCODER_COM),
+        'f_encoder_com_str': _field_strings(frames, F_ENCODER_COM),
+        'i_encoder_cts_str': _field_strings(frames, I_ENCODER_CTS),
+        'c_counts': c_counts,
+        'f_counts': f_counts,
+        'valid': c_valid & f_valid & i_valid & c_cmd_valid & f_cmd_valid,
+    }
+
+
+def decoded_to_rows(decoded, first_message_number):
+    """
+    Builds CSV rows (same column order as the log header) from decode_frames output.
+
+    Invalid frames are skipped, message numbers only count frames that were written.
+
+    Returns:
+        List of row lists ready for csv.writer.writerows.
+    """
+    valid = decoded['valid']
+    if valid.all():
+        columns = [decoded[key] for key in LOG_COLUMNS]
+    else:
+        columns = [decoded[key][valid] for key in LOG_COLUMNS]
+    count = len(columns[0])
+    message_numbers = range(first_message_number, first_message_number + count)
+    # tolist() hands csv plain python ints/floats so the text matches the scalar path
+    return [list(row) for row in zip(message_numbers, *(column.tolist() for column in columns))]
+
+
+# Header row of the CSV log
+CSV_HEADER = [
+    'Message #',
+    #'Elapsed Time (ms)',
+    'Coarse Encoder Counts (6B)', # Motor Encoder Counts
+    'Coarse Degree',
+    'Fine Encoder Counts (6B)', # Work/Glass Encoder Counts
+    'Fine Degree',
+    'Index Angle',
+    'Coarse Encoder Commands (4B)', # Motor Commands -> called encoder commands for convention only
+    'Fine Encoder Commands (4B)', # Work/Glass Encoder Counts
+    #'Inner Encoder Counts (4B)' # Not Being used as of this implementation
+]
+
+# decode_frames keys in the order they are written to the CSV (after 'Message #')
+LOG_COLUMNS = (
+    'c_encoder_cts_str',
+    'c_degrees',
+    'f_encoder_cts_str',
+    'f_degrees',
+    'absolute_index',
+    'c_cmd_val',
+    'f_cmd_val',
+)
@@ -0,0 +1,143 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Background jobs for the GUI.
+#
+# Collections and plots run on a thread pool instead of inside Tk callbacks, so the window
+# keeps responding and several plots can run at once. Tk is only touched on its own
+# thread: job threads update plain attributes of their Job (report()), and the GUI calls
+# JobManager.poll() from root.after to redraw the job list and run each finished job's
+# on_done callback. Cancellation is cooperative: Job.cancel() sets cancel_event, which the
+# work passes on as a stop_event (collections stop, flush their logs and return what was
+# captured) or checks itself.
+
+JOB_WORKERS = 4         # jobs that run at once, the rest wait as 'queued'
+KEEP_FINISHED = 20      # finished jobs kept in the job list
+
+
+class Job:
+    """One unit of background work and what the GUI shows about it."""
+
+    ACTIVE = ('queued', 'running', 'cancelling')
+
+    def __init__(self, job_id, kind, title, watch=None, on_done=None):
+        self.id = job_id
+        self.kind = kind                # 'collect', 'plot', ...
+        self.title = title
+        self.state = 'queued'           # queued, running, cancelling, done, failed, cancelled
+        self.progress = None            # 0..1, None when unknown
+        self.detail = ""
+        self.result = None              # what the work returned
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.watch = watch              # optional function(job) called on every poll while running
+        self.on_done = on_done          # optional function(job) called on the Tk thread when finished
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self._notified = False
+
+    @property
+    def active(self):
+        return self.state in self.ACTIVE
+
+    def report(self, progress=None, detail=None):
+        """Called by the work (any thread) to update its progress and detail text."""
+        if progress is not None:
+            self.progress = min(max(progress, 0.0), 1.0)
+        if detail is not None:
+            self.detail = detail
+
+    def cancel(self):
+        """Asks the work to stop, it finishes at its own pace."""
+        if self.active:
+            self.cancel_event.set()
+            if self.state != 'queued':
+                self.state = 'cancelling'
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+
+class JobManager:
+    """Runs jobs on a thread pool, poll() hands finished ones back to the Tk thread."""
+
+    def __init__(self, max_workers=JOB_WORKERS):
+        self.jobs = []
+        self._next_id = 1
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gui-job")
+
+    def submit(self, kind, title, work, on_done=None, watch=None):
+        """
+        Queues `work(job)` and returns its Job.
+
+        Args:
+            kind: job type, shown in the job list and used by active().
+            title: what the job list shows.
+            work: function(job) run on a pool thread, its return value becomes job.result.
+                  It should watch job.cancel_event and may call job.report().
+            on_done: optional function(job) called from poll() once the job has finished.
+            watch: optional function(job) called from poll() while the job runs, to update
+                   its progress from state the work doesn't report itself.
+        """
+        job = Job(self._next_id, kind, title, watch=watch, on_done=on_done)
+        self._next_id += 1
+        self.jobs.append(job)
+        self._executor.submit(self._run, job, work)
+        return job
+
+    def _run(self, job, work):
+        if job.cancel_event.is_set():
+            job.state, job.finished = 'cancelled', time.time()
+            return
+        job.state, job.started = 'running', time.time()
+        try:
+            job.result = work(job)
+        except Exception as e:
+            job.error = e
+            job.state = 'cancelled' if job.cancel_event.is_set() else 'failed'
+            job.detail = "" if job.state == 'cancelled' else str(e)
+        else:
+            # Cancelled work that returned normally stopped early but kept what it had
+            job.state = 'done'
+            job.detail = "stopped early" if job.cancel_event.is_set() else ""
+            job.progress = 1.0
+        finally:
+            job.finished = time.time()
+
+    def active(self, kind=None):
+        """Jobs not finished yet, optionally of one kind."""
+        return [job for job in self.jobs if job.active and (kind is None or job.kind == kind)]
+
+    def poll(self):
+        """
+        Runs watch and on_done callbacks, call it periodically on the Tk thread.
+
+        Returns:
+            List of the jobs that finished since the last poll.
+        """
+        finished = []
+        for job in list(self.jobs):
+            if job.state == 'running' and job.watch is not None:
+                job.watch(job)
+            if not job.active and not job._notified:
+                job._notified = True
+                finished.append(job)
+                if job.on_done is not None:
+                    job.on_done(job)
+        done = [job for job in self.jobs if not job.active and job._notified]
+        for job in done[:max(0, len(done) - KEEP_FINISHED)]:
+            self.jobs.remove(job)
+        return finished
+
+    def cancel_all(self):
+        for job in self.jobs:
+            job.cancel()
+
+    def shutdown(self):
+        """Cancels every job and stops the pool without waiting for running work."""
+        self.cancel_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,54 @@
+import numpy as np
+
+LIVE_CAPACITY = 1 << 16     # recent samples kept for the live view (about a minute at 1 kHz)
+LIVE_FIELDS = ('message', 'c_degrees', 'f_degrees')
+
+
+class SampleRingBuffer:
+    """
+    Fixed-size ring of the most recent decoded samples, shared between the acquisition
+    thread (single writer) and the GUI (readers) without a lock.
+
+    The writer fills the slots first and publishes them by bumping `written` afterwards
+    (a single int assignment). Readers snapshot `written` and copy the slots behind it.
+    A reader can only see torn data if the writer laps it during the copy, which takes
+    more than `capacity` new samples. Readers ask for a small window, so the writer
+    would need to lap the whole buffer mid-copy.
+    """
+
+    def __init__(self, capacity=LIVE_CAPACITY, fields=LIVE_FIELDS):
+        self.capacity = capacity
+        self.fields = fields
+        self._data = {name: np.zeros(capacity) for name in fields}
+        self.written = 0
+
+    def clear(self):
+        """Forgets every sample (call before starting a new run, not while one is writing)."""
+        self.written = 0
+
+    def push(self, **columns):
+        """Appends equal-length arrays, one keyword per field. Writer thread only."""
+        n = len(columns[self.fields[0]])
+        if n == 0:
+            return
+        skip = max(0, n - self.capacity) # more than fits: only the newest samples matter
+        start = (self.written + skip) % self.capacity
+        first = min(self.capacity - start, n - skip)
+
+        for name in self.fields:
+            values = columns[name][skip:]
+            self._data[name][start:start + first] = values[:first]
+            self._data[name][:len(values) - first] = values[first:]
+        self.written += n
+
+    def latest(self, count):
+        """
+        Copies the newest samples.
+
+        Returns:
+            Tuple (dict of field -> array of up to `count` samples, oldest first, total samples written).
+        """
+        written = self.written
+        count = min(count, written, self.capacity)
+        index = np.arange(written - count, written) % self.capacity
+        return {name: self._data[name][index] for name in self.fields}, written
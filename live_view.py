@@ -0,0 +1,88 @@
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+
+LIVE_WINDOW_SAMPLES = 5000  # most recent samples shown (5 s at 1 kHz)
+LIVE_MAX_FPS = 20           # redraw cap
+
+
+class LiveView:
+    """
+    Live angle plot embedded in the Tk window while data is being collected.
+
+    Reads the newest samples from a live_ring_buffer.SampleRingBuffer on the Tk thread,
+    at most LIVE_MAX_FPS times a second. The x axis is the sample offset from the newest
+    sample, so the axes never move and each frame is blitted: the static background is
+    restored and only the lines and the status text are redrawn.
+    """
+
+    def __init__(self, master, ring, window_samples=LIVE_WINDOW_SAMPLES, max_fps=LIVE_MAX_FPS):
+        self.master = master
+        self.ring = ring
+        self.window_samples = window_samples
+        self.period_ms = max(1, int(1000 / max_fps))
+
+        self.figure = Figure(figsize=(8.4, 2.8), dpi=100, facecolor="#1e1e1e")
+        self.ax = self.figure.add_subplot()
+        self.ax.set_facecolor("#2e2e2e")
+        self.ax.set_xlim(-window_samples, 0)
+        self.ax.set_ylim(-180, 180)
+        self.ax.set_xlabel("Samples before newest", color="white")
+        self.ax.set_ylabel("Angle (°)", color="white")
+        self.ax.tick_params(colors="white")
+        self.ax.grid(True, color="#444444")
+        (self.coarse_line,) = self.ax.plot([], [], color='tab:blue', label='Motor Encoder Angle', animated=True)
+        (self.fine_line,) = self.ax.plot([], [], color='tab:orange', label='Glass Encoder Angle', animated=True)
+        self.status_text = self.ax.text(0.01, 0.95, "", transform=self.ax.transAxes, va='top', color="white", animated=True)
+        self.ax.legend(loc='upper right')
+        self.figure.tight_layout()
+
+        self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        self.widget = self.canvas.get_tk_widget()
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+        self._background = None
+        self._after_id = None
+        self._last_written = -1
+
+    def start(self):
+        """Starts the capped-rate redraw loop."""
+        self._last_written = -1
+        if self._after_id is None:
+            self._tick()
+
+    def stop(self):
+        """Stops redrawing, the last frame stays on screen."""
+        if self._after_id is not None:
+            self.master.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _on_draw(self, event):
+        # Full redraws (first show, resize) refresh the cached background
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_artists()
+
+    def _tick(self):
+        self._after_id = self.master.after(self.period_ms, self._tick)
+        if self._background is None:
+            self.canvas.draw()
+            return
+
+        samples, written = self.ring.latest(self.window_samples)
+        if written == self._last_written:
+            return # nothing new since the last frame
+        self._last_written = written
+
+        message = samples['message']
+        offset = message - message[-1] if len(message) else message
+        self.coarse_line.set_data(offset, samples['c_degrees'])
+        self.fine_line.set_data(offset, samples['f_degrees'])
+        self.status_text.set_text(f"{written} messages")
+
+        self.canvas.restore_region(self._background)
+        self._draw_artists()
+        self.canvas.blit(self.figure.bbox)
+
+    def _draw_artists(self):
+        self.ax.draw_artist(self.coarse_line)
+        self.ax.draw_artist(self.fine_line)
+        self.ax.draw_artist(self.status_text)
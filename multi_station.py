@@ -0,0 +1,109 @@
+import threading
+import time
+import serial
+from EncoderDataCollector import EncoderDataCollector, SAMPLING_DURATION, BAUDRATE
+
+# Concurrent capture from several inspection stations, one serial port per encoder.
+#
+# Every station gets its own reader thread, framer, log files and telemetry (everything
+# EncoderDataCollector sets up for one port) plus one collection thread running its
+# decode/write stage. All ports are opened first so a missing one fails before anything
+# is logged, then the stations start together on a barrier, share the log timestamp and
+# sampling duration, and stop together on the shared stop_event. Decoding is batched, so
+# a station at 460800 baud costs about 4% of a core and 8 stations fit on one core
+# (python benchmark_acquisition.py --stations 8 measures it).
+
+MAX_STATIONS = 8
+
+
+class Station:
+    """One encoder on one serial port: its settings, and its state while collecting."""
+
+    def __init__(self, base_name, port, baudrate=BAUDRATE, live_buffer=None):
+        self.base_name = base_name
+        self.port = port
+        self.baudrate = baudrate
+        self.live_buffer = live_buffer  # optional live_ring_buffer.SampleRingBuffer
+        self.pipeline = None            # AcquisitionPipeline once collecting
+        self.result = None              # (filepath, base_name, timestamp) when done
+        self.error = None
+        self.thread = None
+
+    def _started(self, pipeline):
+        self.pipeline = pipeline
+
+    def status(self):
+        """Short status text for the GUI."""
+        if self.error is not None:
+            return f"failed: {self.error}"
+        if self.pipeline is None:
+            return "waiting"
+        pipeline = self.pipeline
+        elapsed = time.time() - pipeline.start_time if pipeline.start_time else 0.0
+        rate = pipeline.message_count / elapsed if elapsed > 0 else 0.0
+        state = "done" if self.result is not None else f"{rate:.0f} msg/s"
+        return f"{pipeline.message_count} msgs, {state}"
+
+
+def open_ports(stations, timeout=1):
+    """Opens every station's port, closing the ones already open if one fails."""
+    ports = []
+    try:
+        for station in stations:
+            ports.append(serial.Serial(port=station.port, baudrate=station.baudrate, timeout=timeout))
+    except Exception:
+        for ser in ports:
+            ser.close()
+        raise
+    return ports
+
+
+def collect_stations(stations, sampling_duration=SAMPLING_DURATION, stop_event=None, raw=False):
+    """
+    Collects from every station at once.
+
+    Args:
+        stations: list of Station, names and ports must be unique.
+        sampling_duration: seconds to collect for, shared by all stations.
+        stop_event: optional threading.Event, setting it stops every station.
+        raw: capture raw bytes and decode after the run (see EncoderDataCollector).
+
+    Returns:
+        The stations, with `result` set for the ones that logged and `error` for the ones that failed.
+    """
+    if not stations:
+        raise ValueError("No stations to collect from.")
+    if len(stations) > MAX_STATIONS:
+        raise ValueError(f"At most {MAX_STATIONS} stations can be collected at once.")
+    for attribute in ('base_name', 'port'):
+        values = [getattr(station, attribute) for station in stations]
+        if len(set(values)) != len(values):
+            raise ValueError(f"Station {attribute.replace('_', ' ')}s must be unique: {values}")
+
+    ports = open_ports(stations)
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    barrier = threading.Barrier(len(stations)) if len(stations) > 1 else None
+
+    def collect(station, ser):
+        try:
+            station.result = EncoderDataCollector(station.base_name, sampling_duration, live_buffer=station.live_buffer,
+                                                  stop_event=stop_event, plot=False, port=station.port,
+                                                  baudrate=station.baudrate, ser=ser, timestamp=timestamp,
+                                                  start_barrier=barrier, on_start=station._started, raw=raw)
+        except Exception as e:
+            station.error = e
+            if barrier is not None:
+                barrier.abort() # don't keep the others waiting for this one
+            ser.close()
+
+    for station, ser in zip(stations, ports):
+        station.pipeline = station.result = station.error = None
+        station.thread = threading.Thread(target=collect, args=(station, ser), name=f"collect-{station.port}", daemon=True)
+        station.thread.start()
+    for station in stations:
+        station.thread.join()
+
+    for station in stations:
+        if station.error is not None:
+            print(f"{station.port} ({station.base_name}) failed: {station.error}")
+    return stations
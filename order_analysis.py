@@ -0,0 +1,226 @@
+import argparse
+import os
+import sys
+import numpy as np
+
+# Order-domain (per revolution) spectrum of the encoder velocity ripple.
+#
+#   python order_analysis.py [--log-dir encoder_logs] [--plot] [--orders 1 2 ...] [query ...]
+#
+# Velocity is resampled from the time grid onto a uniform angle grid (SAMPLES_PER_REV
+# points per revolution, np.interp on the unwrapped angle), cut into whole revolutions
+# starting at 0°, and the revolutions are transformed together with one batched rfft
+# per REVOLUTION_BATCH revolutions. Order k is k cycles per revolution: eccentricity
+# shows up at 1x, an elliptical disc at 2x, and so on. The spectra are averaged
+# synchronously (complex mean), so only ripple locked to the shaft angle survives;
+# the mean magnitude is kept too. Cost is O(N log N) and the input arrays are only read.
+#
+# Orders above half the raw samples per revolution are interpolation artefacts, so
+# 'max_valid_order' is reported with every spectrum. The unfiltered velocity (dy_dt) is
+# used, the Savitzky-Golay filtered one has the ripple smoothed away.
+
+SAMPLES_PER_REV = 2048          # uniform angle grid, orders up to 1024 (power of 2 for the FFT)
+REVOLUTION_BATCH = 64           # revolutions per rfft call
+REPORT_ORDERS = (1, 2, 3, 4)    # orders printed / marked by default
+TOP_PEAKS = 5
+
+
+class OrderAnalyzer:
+    """
+    Streaming order spectrum of one encoder.
+
+    Feed (unwrapped angle, velocity) pieces in time order with add(); one sample is
+    carried over so interpolation crosses the piece boundaries, and the partly filled
+    revolution is carried over too. result() returns the spectrum of all whole revolutions.
+    """
+
+    def __init__(self, samples_per_rev=SAMPLES_PER_REV, batch=REVOLUTION_BATCH):
+        self.samples_per_rev = samples_per_rev
+        self.step = 360.0 / samples_per_rev
+        self.batch = batch
+        self.direction = 0          # +1 / -1 once the shaft has moved
+        self.first_point = None     # grid index (along the direction of travel) of the first resampled point
+        self.next_point = None      # ... and of the next one
+        self.raw_samples = 0        # input samples that were resampled, for max_valid_order
+        self._last = None           # (angle, value) of the last sample of the previous piece
+        self._revolution = np.empty(samples_per_rev)
+        self._filled = 0
+        self._rows = []
+        self._spectrum_sum = np.zeros(samples_per_rev // 2 + 1, dtype=complex)
+        self._magnitude_sum = np.zeros(samples_per_rev // 2 + 1)
+        self.revolutions = 0
+
+    def add(self, angle, value):
+        if self._last is not None:
+            angle = np.concatenate(([self._last[0]], angle))
+            value = np.concatenate(([self._last[1]], value))
+        if len(angle) < 2:
+            if len(angle):
+                self._last = (angle[-1], value[-1])
+            return
+        self._last = (angle[-1], value[-1])
+
+        if self.direction == 0:
+            self.direction = int(np.sign(angle[-1] - angle[0]))
+            if self.direction == 0:
+                return # not moving yet
+            # First whole revolution starts at the first multiple of 360° reached
+            self.first_point = self.next_point = int(np.ceil(angle[0] * self.direction / 360.0)) * self.samples_per_rev
+
+        # np.interp needs increasing sample positions: read decreasing runs backwards (views, no copy)
+        if self.direction > 0:
+            xp, fp = angle, value
+        else:
+            xp, fp = angle[::-1], value[::-1]
+        if np.any(xp[1:] <= xp[:-1]):
+            # Jitter or a stop: keep only the samples that move the angle forward
+            keep = np.concatenate(([True], xp[1:] > np.maximum.accumulate(xp)[:-1]))
+            xp, fp = xp[keep], fp[keep]
+
+        travelled = (angle[-1] * self.direction) / self.step
+        last_point = int(np.floor(travelled))
+        if last_point < self.next_point:
+            return
+        points = np.arange(self.next_point, last_point + 1)
+        self.next_point = last_point + 1
+        self.raw_samples += len(angle) - 1
+        query = points * (self.step * self.direction)
+        if self.direction < 0:
+            query = query[::-1]
+        resampled = np.interp(query, xp, fp)
+        if self.direction < 0:
+            resampled = resampled[::-1]
+        self._append(resampled)
+
+    def _append(self, samples):
+        while len(samples):
+            take = min(self.samples_per_rev - self._filled, len(samples))
+            self._revolution[self._filled:self._filled + take] = samples[:take]
+            self._filled += take
+            samples = samples[take:]
+            if self._filled == self.samples_per_rev:
+                self._rows.append(self._revolution.copy())
+                self._filled = 0
+                if len(self._rows) == self.batch:
+                    self._transform()
+
+    def _transform(self):
+        if not self._rows:
+            return
+        spectra = np.fft.rfft(np.vstack(self._rows), axis=1) * (2.0 / self.samples_per_rev)
+        spectra[:, 0] /= 2 # order 0 is the mean speed, not a ripple amplitude
+        self._spectrum_sum += spectra.sum(axis=0)
+        self._magnitude_sum += np.abs(spectra).sum(axis=0)
+        self.revolutions += len(self._rows)
+        self._rows = []
+
+    def result(self):
+        """
+        Returns:
+            Dict with 'orders', 'amplitude' (synchronous average), 'mean_amplitude',
+            'revolutions' and 'max_valid_order'. Amplitudes are NaN without a whole revolution.
+        """
+        self._transform()
+        orders = np.arange(self.samples_per_rev // 2 + 1)
+        if self.revolutions == 0:
+            nan = np.full(len(orders), np.nan)
+            return {'orders': orders, 'amplitude': nan, 'mean_amplitude': nan.copy(), 'revolutions': 0, 'max_valid_order': 0}
+        raw_per_rev = self.raw_samples * self.samples_per_rev / (self.next_point - self.first_point)
+        return {
+            'orders': orders,
+            'amplitude': np.abs(self._spectrum_sum) / self.revolutions,
+            'mean_amplitude': self._magnitude_sum / self.revolutions,
+            'revolutions': self.revolutions,
+            'max_valid_order': int(min(orders[-1], raw_per_rev // 2)),
+        }
+
+
+def order_spectrum(angle_unwrapped, velocity, samples_per_rev=SAMPLES_PER_REV):
+    """Order spectrum of one encoder from whole-run arrays (see OrderAnalyzer.result)."""
+    analyzer = OrderAnalyzer(samples_per_rev)
+    analyzer.add(angle_unwrapped, velocity)
+    return analyzer.result()
+
+
+def pack_orders(coarse, fine):
+    """Flat entries for the plot_encoders analysis dict (and the analysis cache)."""
+    return {
+        'orders': coarse['orders'],
+        'coarse_order_amplitude': coarse['amplitude'],
+        'fine_order_amplitude': fine['amplitude'],
+        'order_info': {'coarse_revolutions': coarse['revolutions'], 'fine_revolutions': fine['revolutions'],
+                       'coarse_max_valid_order': coarse['max_valid_order'], 'fine_max_valid_order': fine['max_valid_order']},
+    }
+
+
+def top_orders(orders, amplitude, max_order, count=TOP_PEAKS):
+    """The `count` largest ripple orders (order >= 1, up to max_order) as (order, amplitude) pairs."""
+    valid = (orders >= 1) & (orders <= max_order) & ~np.isnan(amplitude)
+    candidates = np.flatnonzero(valid)
+    best = candidates[np.argsort(amplitude[candidates])[::-1][:count]]
+    return [(int(orders[i]), float(amplitude[i])) for i in best]
+
+
+def plot_order_spectrum(ax, analysis, marked_orders=REPORT_ORDERS):
+    """Draws both encoders' order spectra (from a plot_encoders analysis dict) on ax."""
+    info = analysis['order_info']
+    max_order = max(info['coarse_max_valid_order'], info['fine_max_valid_order'], 1)
+    orders = analysis['orders']
+    shown = (orders >= 1) & (orders <= max_order)
+    ax.semilogy(orders[shown], analysis['coarse_order_amplitude'][shown], label=f"Motor Encoder ({info['coarse_revolutions']} rev)", color='tab:blue')
+    ax.semilogy(orders[shown], analysis['fine_order_amplitude'][shown], label=f"Glass Encoder ({info['fine_revolutions']} rev)", color='tab:orange')
+    for order in marked_orders:
+        if order <= max_order:
+            ax.axvline(order, color='gray', linestyle=':', linewidth=0.8)
+    ax.set_xlabel("Order (cycles per revolution)")
+    ax.set_ylabel("Velocity ripple amplitude (°/s)")
+    ax.set_title("Order Spectrum of Angular Velocity")
+    ax.legend()
+    ax.grid(True, which='both', alpha=0.4)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Order spectra of the velocity ripple of encoder runs.")
+    parser.add_argument("query", nargs="*", help="run catalog search, e.g. 616-00021 CCW (default: every run)")
+    parser.add_argument("--log-dir", default="encoder_logs", help="folder with the CSV logs (default: encoder_logs)")
+    parser.add_argument("--orders", type=int, nargs="+", default=list(REPORT_ORDERS), help="orders to report")
+    parser.add_argument("--plot", action="store_true", help="save each run's order spectrum to 'plot outputs'")
+    args = parser.parse_args()
+
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib import pyplot as plt
+    from plot_csv import analyze_for_plot, make_plot_dir_if_doesnt_exist, plot_output_directory, remove_extension
+    from run_catalog import search_log_names, sync_catalog
+
+    sync_catalog(args.log_dir)
+    logs = search_log_names(args.log_dir, " ".join(args.query))
+    if not logs:
+        print("No runs match.")
+        sys.exit(1)
+
+    failures = 0
+    print("run: " + ", ".join(f"{order}x" for order in args.orders) + " (motor / glass amplitude, °/s)")
+    for log in logs:
+        try:
+            analysis = analyze_for_plot(os.path.join(args.log_dir, log))
+        except Exception as e:
+            print(f"Could not analyse {log}: {e}")
+            failures += 1
+            continue
+        orders = analysis['orders']
+        cells = []
+        for order in args.orders:
+            i = np.searchsorted(orders, order)
+            cells.append(f"{order}x {analysis['coarse_order_amplitude'][i]:.4g} / {analysis['fine_order_amplitude'][i]:.4g}")
+        print(f"{log}: " + ", ".join(cells))
+        peaks = top_orders(orders, analysis['fine_order_amplitude'], analysis['order_info']['fine_max_valid_order'])
+        print("    glass peaks: " + ", ".join(f"{order}x {amplitude:.4g}" for order, amplitude in peaks))
+
+        if args.plot:
+            make_plot_dir_if_doesnt_exist()
+            fig, ax = plt.subplots(figsize=(14, 6))
+            plot_order_spectrum(ax, analysis, args.orders)
+            fig.savefig(os.path.join(plot_output_directory, remove_extension(log) + "_order_spectrum.png"), bbox_inches='tight')
+            plt.close(fig)
+    sys.exit(1 if failures else 0)
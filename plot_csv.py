@@ -1,11 +1,18 @@
 import pandas as pd
 from matplotlib import pyplot as plt
 import numpy as np
-from PIL.ImageChops import offset
-from scipy.signal import savgol_filter
+from savgol_smoothing import WINDOW_LENGTH, POLYORDER, savgol_smooth
 import os
 import re
 from datetime import datetime
+from columnar_log import CSV_COLUMNS, current_columnar_path, load_columnar_log
+from chunked_analysis import ChunkedAnalysis, log_row_count
+from plot_decimation import decimated_plot, minmax_indices
+from analysis_cache import cached_analysis
+from frame_decoder import COARSE_MAX_COUNTS, FINE_MAX_COUNTS
+from run_catalog import record_analysis
+from order_analysis import SAMPLES_PER_REV, OrderAnalyzer, order_spectrum, pack_orders, plot_order_spectrum
+from stage_profiler import StageProfiler
 #from scipy import signal
 
 # Plot acceleration as well, low pass filter
@@ -14,6 +21,21 @@ from datetime import datetime
 # Initialize Folder where the image plots will be saved
 plot_output_directory = "plot outputs"
 
+# Logs longer than this are analysed out-of-core (chunked_analysis.py)
+CHUNKED_ANALYSIS_ROWS = 5_000_000
+# Samples kept per plotted series when a log is analysed out-of-core
+MAX_CHUNKED_PLOT_POINTS = 500_000
+
+# Plotted lines as (x, y) names from the analysis results
+PLOT_SERIES = {
+    'coarse_angle': ('time_s', 'y1_wrapped'),
+    'fine_angle': ('time_s', 'y2_wrapped'),
+    'coarse_velocity': ('y1_wrapped', 'filtered_dy1_dt'),
+    'fine_velocity': ('y2_wrapped', 'filtered_dy2_dt'),
+    'coarse_acceleration': ('y1_wrapped', 'filtered_d2y1_dt2'),
+    'fine_acceleration': ('y2_wrapped', 'filtered_d2y2_dt2'),
+}
+
 def match_lengths(*arrays):
     """
     Trims all input arrays to the same minimum length.
@@ -42,35 +64,70 @@ def make_plot_dir_if_doesnt_exist():
 
 
 
-def plot_encoders(filepath,base_name,timestamp,replotting_flag=0,filename = ""):
-    #For window resizing
-    screen_width = 1920  # change to your actual screen width
-    screen_height = 1000  # change if needed : Actual is 1080 but removed some to show tools at the bottom
+def load_encoder_log(filepath):
+    """
+    Loads an encoder log as named columns.
 
-    # Width and height for half-screen windows
-    half_width = screen_width // 2
-    window_height = screen_height
+    Memory-maps the columnar (.rec) file written next to the CSV when there is one and it
+    is up to date (see columnar_log.current_columnar_path), otherwise parses the CSV.
+
+    Args:
+        filepath: path of the CSV log (or of the columnar file itself).
 
-    # Load CSV, skip the first row
-    df = pd.read_csv(filepath, skiprows=1, header=None)
+    Returns:
+        Record array or dict, indexable by the columnar_log.LOG_DTYPE field names
+        ('message', 'c_degrees', 'f_degrees', 'absolute_index', 'c_cmd_val', 'f_cmd_val', ...).
+    """
+    columnar_path = current_columnar_path(filepath)
+    if columnar_path is not None:
+        _, records = load_columnar_log(columnar_path)
+        return records
 
-    # Find index change column
-    col = df.iloc[:, 5]
-    # Find where the value changes
-    change_rows = col[col != col.shift()].index
-    # Get the last index where it changed
-    last_change_index = change_rows[-1]
-    # Get the value at that index
-    last_changed_value = col.iloc[last_change_index]
-    fine_offset = df.iloc[last_change_index, 5]
-    coarse_offset = df.iloc[last_change_index, 2]
+    # Hex count columns aren't used for plotting, skip them
+    names = ['message', 'c_degrees', 'f_degrees', 'absolute_index', 'c_cmd_val', 'f_cmd_val']
+    # round_trip parses the floats exactly as written, so the CSV gives the same values as the .rec
+    df = pd.read_csv(filepath, skiprows=1, header=None, usecols=[CSV_COLUMNS[name] for name in names],
+                     float_precision='round_trip')
+    return {name: df[CSV_COLUMNS[name]].values for name in names}
+
+
+def analyze_encoder_log(filepath, profiler=None):
+    """
+    Runs the plot_encoders analysis on a whole log held in memory.
+
+    profiler: optional stage_profiler.StageProfiler timing each step ('load' only maps a
+    .rec file, its pages are read by the first step that touches them, 'index').
+
+    Returns:
+        Dict with the arrays that get plotted ('time_s', 'y1_wrapped', 'y2_wrapped',
+        'filtered_dy1_dt', 'filtered_dy2_dt', 'filtered_d2y1_dt2', 'filtered_d2y2_dt2'),
+        the slew 'stats', the index 'change_rows' / 'last_changed_value' and the order
+        spectra of both encoders (order_analysis.pack_orders).
+    """
+    if profiler is None:
+        profiler = StageProfiler(enabled=False)
+    # Load log (memory-mapped columnar file if available, CSV otherwise)
+    with profiler.stage('load'):
+        log = load_encoder_log(filepath)
+
+    with profiler.stage('index'):
+        # Find index change column
+        col = log['absolute_index']
+        # Find where the value changes (first row always counts as a change)
+        change_rows = np.flatnonzero(np.concatenate(([True], col[1:] != col[:-1])))
+        # Get the last index where it changed
+        last_change_index = change_rows[-1]
+        # Get the value at that index
+        last_changed_value = col[last_change_index]
+        fine_offset = col[last_change_index]
+        coarse_offset = log['c_degrees'][last_change_index]
 
     # Extract time and angle data
-    time_ms = df.iloc[last_change_index:, 0].values
+    time_ms = log['message'][last_change_index:]
     time_s = time_ms / 1000.0
     # Get the full column as a NumPy array, starting from last_change_index
-    y1 = df.iloc[last_change_index:, 2].values  # Coarse angle
-    y2 = df.iloc[last_change_index:, 4].values  # Fine angle
+    y1 = log['c_degrees'][last_change_index:]  # Coarse angle
+    y2 = log['f_degrees'][last_change_index:]  # Fine angle
 
     if coarse_offset < 0:coarse_offset += 360 # wraps to 360
 
@@ -78,38 +135,44 @@ def plot_encoders(filepath,base_name,timestamp,replotting_flag=0,filename = ""):
 
     #print(angle_offset)
 
-    c_cmd = df[6].values #Coarse Command Values
-    f_cmd = df[7].values #Fine Command Values
+    c_cmd = log['c_cmd_val'] #Coarse Command Values
+    f_cmd = log['f_cmd_val'] #Fine Command Values
+
+    with profiler.stage('unwrap'):
+        # Remove repeated time values
+        dt = np.diff(time_s)
+        dt = np.insert(dt, 0, 1e-6)
+        valid_indices = dt != 0
 
-    # Remove repeated time values
-    dt = np.diff(time_s)
-    dt = np.insert(dt, 0, 1e-6)
-    valid_indices = dt != 0
+        time_s = time_s[valid_indices]
+        y1 = y1[valid_indices]
+        y2 = y2[valid_indices]
 
-    time_s = time_s[valid_indices]
-    y1 = y1[valid_indices]
-    y2 = y2[valid_indices]
+        # Shift fine angle before unwrap
+        #y2_shifted = y2 - angle_offset # shifts y2 values
 
-    # Shift fine angle before unwrap
-    #y2_shifted = y2 - angle_offset # shifts y2 values
+        # Unwrap angles for derivative calc and offsets
+        y1_unwrapped = np.rad2deg(np.unwrap(np.deg2rad(y1)))
+        #y2_unwrapped = np.rad2deg(np.unwrap(np.deg2rad(y2_shifted))) #NEW
+        y2_unwrapped = np.rad2deg(np.unwrap(np.deg2rad(y2))) #OLD
 
-    # Unwrap angles for derivative calc and offsets
-    y1_unwrapped = np.rad2deg(np.unwrap(np.deg2rad(y1)))
-    #y2_unwrapped = np.rad2deg(np.unwrap(np.deg2rad(y2_shifted))) #NEW
-    y2_unwrapped = np.rad2deg(np.unwrap(np.deg2rad(y2))) #OLD
+        y2_unwrapped -= fine_offset
 
-    y2_unwrapped -= fine_offset
+        #needs to be unwrapped first
+        y1_unwrapped -= coarse_offset  # to add offset the motor encoder angle values
 
-    #needs to be unwrapped first
-    y1_unwrapped -= coarse_offset  # to add offset the motor encoder angle values
+    with profiler.stage('gradient'):
+        # Compute derivatives for Velocity
+        dy1_dt = np.gradient(y1_unwrapped, time_s)
+        dy2_dt = np.gradient(y2_unwrapped, time_s)
 
-    # Compute derivatives for Velocity
-    dy1_dt = np.gradient(y1_unwrapped, time_s)
-    dy2_dt = np.gradient(y2_unwrapped, time_s)
+        # Compute 2nd derivatives for Acceleration
+        d2y1_dt2 = np.gradient(dy1_dt, time_s)
+        d2y2_dt2 = np.gradient(dy2_dt, time_s)
 
-    # Compute 2nd derivatives for Acceleration
-    d2y1_dt2 = np.gradient(dy1_dt, time_s)
-    d2y2_dt2 = np.gradient(dy2_dt, time_s)
+    with profiler.stage('orders'):
+        # Velocity ripple per revolution (order spectrum), from the unfiltered velocity
+        orders = pack_orders(order_spectrum(y1_unwrapped, dy1_dt), order_spectrum(y2_unwrapped, dy2_dt))
 
     # Wrap angles to -180 to 180 for plotting
     y1_wrapped = ((y1_unwrapped + 180) % 360) - 180
@@ -117,105 +180,252 @@ def plot_encoders(filepath,base_name,timestamp,replotting_flag=0,filename = ""):
 
     #aligned_coarse, aligned_fine = align_by_zero_crossings(y1_wrapped, y2_wrapped) #to fix motor phase shift
 
-    #Filtering for Values
-    filtered_dy1_dt =  savgol_filter(dy1_dt, window_length=10001 ,  polyorder=3)
-    filtered_dy2_dt =  savgol_filter(dy2_dt, window_length=10001 ,  polyorder=3)
-
-    filtered_d2y1_dt2 = savgol_filter(d2y1_dt2, window_length=10001 ,  polyorder=3)
-    filtered_d2y2_dt2 = savgol_filter(d2y2_dt2, window_length=10001 ,  polyorder=3)
+    with profiler.stage('savgol'):
+        #Filtering for Values, all four in one batched pass (window shrinks on short runs)
+        filtered_dy1_dt, filtered_dy2_dt, filtered_d2y1_dt2, filtered_d2y2_dt2 = savgol_smooth(
+            np.vstack((dy1_dt, dy2_dt, d2y1_dt2, d2y2_dt2)), window_length=WINDOW_LENGTH, polyorder=POLYORDER)
 
     # Matches size of Shifted arrays to fix in time domain
     time_s, aligned_coarse, aligned_fine, dy1_dt, dy2_dt, c_cmd, f_cmd = match_lengths(time_s, y1_wrapped, y2_wrapped, dy1_dt, dy2_dt, c_cmd, f_cmd)
 
+    return {
+        'time_s': time_s,
+        'y1_wrapped': y1_wrapped,
+        'y2_wrapped': y2_wrapped,
+        'filtered_dy1_dt': filtered_dy1_dt,
+        'filtered_dy2_dt': filtered_dy2_dt,
+        'filtered_d2y1_dt2': filtered_d2y1_dt2,
+        'filtered_d2y2_dt2': filtered_d2y2_dt2,
+        'stats': {
+            'coarse': {'max': dy1_dt.max(), 'min': dy1_dt.min(), 'mean': dy1_dt.mean()},
+            'fine': {'max': dy2_dt.max(), 'min': dy2_dt.min(), 'mean': dy2_dt.mean()},
+        },
+        'change_rows': change_rows.tolist(),
+        'last_changed_value': last_changed_value,
+        **orders,
+    }
+
+
+def analyze_encoder_log_chunked(filepath, max_points=MAX_CHUNKED_PLOT_POINTS, profiler=None):
+    """
+    Same as analyze_encoder_log but streams the log through chunked_analysis.ChunkedAnalysis.
+
+    The full-length arrays are never built: each plotted series is min/max decimated
+    chunk by chunk (at most about max_points per series) and returned under 'series',
+    so memory stays bounded however long the capture is. Stats cover every sample.
+    The chunk generator interleaves the analysis steps, so profiler (optional
+    stage_profiler.StageProfiler) only splits the analysis from the decimation and orders.
+    """
+    if profiler is None:
+        profiler = StageProfiler(enabled=False)
+    analysis = ChunkedAnalysis(filepath)
+    bucket = max(1, 2 * log_row_count(filepath) // max_points + 1)
+    kept = {name: ([], []) for name in PLOT_SERIES}
+    coarse_orders, fine_orders = OrderAnalyzer(), OrderAnalyzer()
+
+    chunks = analysis.chunks()
+    while True:
+        with profiler.stage('chunk_analysis'):
+            chunk = next(chunks, None)
+        if chunk is None:
+            break
+        with profiler.stage('chunk_decimate'):
+            for name, (x_name, y_name) in PLOT_SERIES.items():
+                keep = minmax_indices(chunk[y_name], bucket)
+                kept[name][0].append(chunk[x_name][keep])
+                kept[name][1].append(chunk[y_name][keep])
+        with profiler.stage('chunk_orders'):
+            coarse_orders.add(chunk['y1_unwrapped'], chunk['dy1_dt'])
+            fine_orders.add(chunk['y2_unwrapped'], chunk['dy2_dt'])
+
+    return {
+        'series': {name: (np.concatenate(xs), np.concatenate(ys)) for name, (xs, ys) in kept.items()},
+        'stats': {
+            'coarse': {'max': analysis.coarse_stats.maximum, 'min': analysis.coarse_stats.minimum, 'mean': analysis.coarse_stats.mean},
+            'fine': {'max': analysis.fine_stats.maximum, 'min': analysis.fine_stats.minimum, 'mean': analysis.fine_stats.mean},
+        },
+        'change_rows': analysis.change_rows,
+        'last_changed_value': analysis.last_changed_value,
+        **pack_orders(coarse_orders.result(), fine_orders.result()),
+    }
+
+
+def analysis_params(chunked):
+    """Everything besides the log itself that the analysis results depend on (analysis cache key)."""
+    return {
+        'window_length': WINDOW_LENGTH,
+        'polyorder': POLYORDER,
+        'coarse_max_counts': COARSE_MAX_COUNTS,
+        'fine_max_counts': FINE_MAX_COUNTS,
+        'chunked': chunked,
+        'max_chunked_plot_points': MAX_CHUNKED_PLOT_POINTS if chunked else None,
+        'order_samples_per_rev': SAMPLES_PER_REV,
+    }
+
+
+def analyze_for_plot(filepath, profiler=None):
+    """The plot_encoders analysis of a log: from the analysis cache, in memory or chunked for long captures."""
+    # Multi-hour captures don't fit in memory, analyse those chunk by chunk
+    chunked = log_row_count(filepath) > CHUNKED_ANALYSIS_ROWS
+    # Derived arrays and stats are cached next to the log, reopening a run skips the analysis
+    return cached_analysis(filepath, analysis_params(chunked),
+                           lambda: (analyze_encoder_log_chunked(filepath, profiler=profiler) if chunked
+                                    else analyze_encoder_log(filepath, profiler=profiler)),
+                           profiler=profiler)
+
+
+def plot_output_paths(name):
+    """Paths of the four saved figures for a run name ('<base_name>_<timestamp>')."""
+    return (
+        os.path.join(plot_output_directory, name+"_angle_vs_time.png"),
+        os.path.join(plot_output_directory, name+"_angular_velocity_vs_angle.png"),
+        os.path.join(plot_output_directory, name+"_angular_acceleration_vs_angle.png"),
+        os.path.join(plot_output_directory, name+"_order_spectrum.png"),
+    )
+
+
+def plot_encoders(filepath,base_name,timestamp,replotting_flag=0,filename = "",interactive=True,progress=None,profile=None):
+    # interactive=False is for headless/batch use (Agg backend): no window placement, no plt.show, figures closed after saving
+    # progress: optional function called with the stage name ('analysing', 'drawing', 'showing', 'saving') as each starts
+    # profile: time every stage (stage_profiler.py) and save '<run>_profile.json' with the figures,
+    #          None follows the ENCODER_PROFILE environment variable
+    if progress is None:
+        progress = lambda stage: None
+    profiler = StageProfiler(profile)
+    # Name the figures (and the profile report) are saved under
+    name = base_name+"_"+timestamp if replotting_flag == 0 else filename
+
+    with profiler.stage('plot_encoders'):
+        figures = _plot_encoder_stages(filepath, name, interactive, progress, profiler)
+
+    if not interactive:
+        for fig in figures:
+            plt.close(fig)
+
+    if profiler.enabled:
+        report_path = os.path.join(plot_output_directory, name+"_profile.json")
+        profiler.write(report_path, log=os.path.basename(filepath), interactive=interactive)
+        print("\n".join(profiler.table()))
+        print(f"Saved stage profile to '{report_path}'.")
+
+
+def _plot_encoder_stages(filepath, name, interactive, progress, profiler):
+    """The plot_encoders pipeline, one profiler stage per step. Returns the four figures."""
+    #For window resizing
+    screen_width = 1920  # change to your actual screen width
+    screen_height = 1000  # change if needed : Actual is 1080 but removed some to show tools at the bottom
+
+    # Width and height for half-screen windows
+    half_width = screen_width // 2
+    window_height = screen_height
+
+    progress('analysing')
+    with profiler.stage('analysis'):
+        analysis = analyze_for_plot(filepath, profiler=profiler)
+    # Index offset and slew stats go to the run catalog for cross-run queries
+    with profiler.stage('catalog'):
+        try:
+            record_analysis(filepath, analysis)
+        except Exception as e:
+            print(f"Could not update the run catalog: {e}")
+
+    # (x, y) pairs for every plotted line, full resolution or already decimated by the chunked path
+    series = analysis.get('series') or {name: (analysis[x_name], analysis[y_name]) for name, (x_name, y_name) in PLOT_SERIES.items()}
+    coarse_stats = analysis['stats']['coarse']
+    fine_stats = analysis['stats']['fine']
+
     # Print row numbers where the value changes
-    print("Value changes at rows:", change_rows.tolist(), last_changed_value)
+    print("Value changes at rows:", analysis['change_rows'], analysis['last_changed_value'])
     # === Plotting ===
+    progress('drawing')
     # === Figure 1: Angle vs. Time ===
-    fig1, ax1 = plt.subplots(figsize=(14, 6))
-    ax1.plot(time_s, y1_wrapped, label='Motor Encoder Angle (Wrapped)')
-    ax1.plot(time_s, y2_wrapped, label='Glass Encoder Angle (Wrapped)')
-    ax1.set_ylabel("Angle (°)")
-    ax1.set_title("Encoder Angle (Wrapped) vs. Time")
-    ax1.legend()
-    ax1.grid(True)
-    fig1.canvas.manager.window.wm_geometry(f"{half_width}x{window_height}+0+0")  # Left half
+    with profiler.stage('figure_angle'):
+        fig1, ax1 = plt.subplots(figsize=(14, 6))
+        # Lines go through the decimation layer: min/max per pixel, re-decimated on zoom
+        decimated_plot(ax1, *series['coarse_angle'], label='Motor Encoder Angle (Wrapped)')
+        decimated_plot(ax1, *series['fine_angle'], label='Glass Encoder Angle (Wrapped)')
+        ax1.set_ylabel("Angle (°)")
+        ax1.set_title("Encoder Angle (Wrapped) vs. Time")
+        ax1.legend()
+        ax1.grid(True)
+        if interactive:
+            fig1.canvas.manager.window.wm_geometry(f"{half_width}x{window_height}+0+0")  # Left half
 
     # === Figure 2: Angular Velocity vs. Wrapped Angle ===
-    fig2, ax2 = plt.subplots(figsize=(14, 6))
-    ax2.step(y1_wrapped, filtered_dy1_dt, where='mid', label='Motor Encoder dθ/dt vs Angle', color='tab:blue')
-    ax2.step(y2_wrapped, filtered_dy2_dt, where='mid', label='Glass Encoder dθ/dt vs Angle', color='tab:orange')
-    ax2.set_xlabel("Angle (wrapped, °)")
-    ax2.set_ylabel("Angular Velocity (°/s)")
-    ax2.set_title("Angular Velocity vs. Wrapped Angle (Step Plot)")
-    ax2.legend()
-    ax2.grid(True)
-    fig2.canvas.manager.window.wm_geometry(f"{half_width}x{window_height}+{half_width}+0")  # Right half
-
-    # === Stats Box in Figure 2 ===
-    stats_text = (
-        f"Coarse Slew:\n"
-        f"  Max dθ/dt: {dy1_dt.max():.2f}°/s\n"
-        f"  Min dθ/dt: {dy1_dt.min():.2f}°/s\n"
-        f"  Avg dθ/dt: {dy1_dt.mean():.2f}°/s\n\n"
-        f"Fine Slew:\n"
-        f"  Max dθ/dt: {dy2_dt.max():.2f}°/s\n"
-        f"  Min dθ/dt: {dy2_dt.min():.2f}°/s\n"
-        f"  Avg dθ/dt: {dy2_dt.mean():.2f}°/s"
-    )
-
-    fig2.text(0.85, 0.5, stats_text, fontsize=10, bbox=dict(facecolor='white', edgecolor='gray'))
+    with profiler.stage('figure_velocity'):
+        fig2, ax2 = plt.subplots(figsize=(14, 6))
+        decimated_plot(ax2, *series['coarse_velocity'], step=True, label='Motor Encoder dθ/dt vs Angle', color='tab:blue')
+        decimated_plot(ax2, *series['fine_velocity'], step=True, label='Glass Encoder dθ/dt vs Angle', color='tab:orange')
+        ax2.set_xlabel("Angle (wrapped, °)")
+        ax2.set_ylabel("Angular Velocity (°/s)")
+        ax2.set_title("Angular Velocity vs. Wrapped Angle (Step Plot)")
+        ax2.legend()
+        ax2.grid(True)
+        if interactive:
+            fig2.canvas.manager.window.wm_geometry(f"{half_width}x{window_height}+{half_width}+0")  # Right half
+
+        # === Stats Box in Figure 2 ===
+        stats_text = (
+            f"Coarse Slew:\n"
+            f"  Max dθ/dt: {coarse_stats['max']:.2f}°/s\n"
+            f"  Min dθ/dt: {coarse_stats['min']:.2f}°/s\n"
+            f"  Avg dθ/dt: {coarse_stats['mean']:.2f}°/s\n\n"
+            f"Fine Slew:\n"
+            f"  Max dθ/dt: {fine_stats['max']:.2f}°/s\n"
+            f"  Min dθ/dt: {fine_stats['min']:.2f}°/s\n"
+            f"  Avg dθ/dt: {fine_stats['mean']:.2f}°/s"
+        )
+
+        fig2.text(0.85, 0.5, stats_text, fontsize=10, bbox=dict(facecolor='white', edgecolor='gray'))
 
     # === Figure 3: Angular Acceleration vs. Wrapped Angle ===
-    fig3, ax3 = plt.subplots(figsize=(14, 6))
-    ax3.step(y1_wrapped, filtered_d2y1_dt2, where='mid', label='Motor Encoder dθ/dt vs Angle', color='tab:blue')
-    ax3.step(y2_wrapped, filtered_d2y2_dt2, where='mid', label='Glass Encoder dθ/dt vs Angle', color='tab:orange')
-    ax3.set_xlabel("Angle (wrapped, °)")
-    ax3.set_ylabel("Angular Acceleration (°/s^2)")
-    ax3.set_title("Angular Acceleration vs. Wrapped Angle (Step Plot)")
-    ax3.legend()
-    ax3.grid(True)
+    with profiler.stage('figure_acceleration'):
+        fig3, ax3 = plt.subplots(figsize=(14, 6))
+        decimated_plot(ax3, *series['coarse_acceleration'], step=True, label='Motor Encoder dθ/dt vs Angle', color='tab:blue')
+        decimated_plot(ax3, *series['fine_acceleration'], step=True, label='Glass Encoder dθ/dt vs Angle', color='tab:orange')
+        ax3.set_xlabel("Angle (wrapped, °)")
+        ax3.set_ylabel("Angular Acceleration (°/s^2)")
+        ax3.set_title("Angular Acceleration vs. Wrapped Angle (Step Plot)")
+        ax3.legend()
+        ax3.grid(True)
 
+    # === Figure 4: Order Spectrum of the Velocity Ripple ===
+    with profiler.stage('figure_orders'):
+        fig4, ax4 = plt.subplots(figsize=(14, 6))
+        plot_order_spectrum(ax4, analysis)
 
-    plt.show()
+
+    if interactive:
+        progress('showing')
+        with profiler.stage('show'):
+            plt.show()
 
 
     # autosaving the plots 
+    progress('saving')
     make_plot_dir_if_doesnt_exist() #as a redundancy to make sure that the directory exists before trying to save to it
 
-    
-    if replotting_flag == 0:
-        # Save each figure & construct names for each plot from the user input
-        fig1_path = os.path.join(plot_output_directory, base_name+"_"+timestamp+"_angle_vs_time.png")
-        fig2_path = os.path.join(plot_output_directory, base_name+"_"+timestamp+"_angular_velocity_vs_angle.png")
-        fig3_path = os.path.join(plot_output_directory, base_name+"_"+timestamp+"_angular_acceleration_vs_angle.png")
-
-        fig1.savefig(fig1_path, bbox_inches='tight')
-        fig2.savefig(fig2_path, bbox_inches='tight')
-        fig3.savefig(fig3_path, bbox_inches='tight')
-
-    if replotting_flag == 1:
-        # Save each figure & construct names for each plot from the user input
-        fig1_path = os.path.join(plot_output_directory, filename+"_angle_vs_time.png")
-        fig2_path = os.path.join(plot_output_directory, filename+"_angular_velocity_vs_angle.png")
-        fig3_path = os.path.join(plot_output_directory, filename+"_angular_acceleration_vs_angle.png")
-
-        fig1.savefig(fig1_path, bbox_inches='tight')
-        fig2.savefig(fig2_path, bbox_inches='tight')
-        fig3.savefig(fig3_path, bbox_inches='tight')
+    # Save each figure & construct names for each plot from the user input (or the replotted file name)
+    figures = (fig1, fig2, fig3, fig4)
+    for stage, fig, path in zip(('savefig_angle', 'savefig_velocity', 'savefig_acceleration', 'savefig_orders'),
+                                figures, plot_output_paths(name)):
+        with profiler.stage(stage):
+            fig.savefig(path, bbox_inches='tight')
 
     print(f"Saved figures to '{plot_output_directory}' directory.")
+    return figures
 
 
 
 
 
 
-def replot_encoder_data(filename):
+def replot_encoder_data(filename, interactive=True, progress=None, profile=None):
     print("running replot encode data running...")
     filepath = os.path.join("encoder_logs/"+filename)
     file_without_ext = remove_extension(filename)   # remove filename extension
     #recal the function with parmeters set and dummy arguments that will get ignored due to the flag passed in
-    plot_encoders(filepath,'not_a_name','not_a_time', replotting_flag = 1,filename=file_without_ext)
+    plot_encoders(filepath,'not_a_name','not_a_time', replotting_flag = 1,filename=file_without_ext, interactive=interactive, progress=progress, profile=profile)
     
 
 
@@ -228,4 +438,4 @@ def replot_encoder_data(filename):
 #replot_encoder_data('616-00021_CCW_3.8V_20250425_142244.csv')
 #plot_encoders(r'C:\Users\i2Tech\Desktop\I2EncoderDataInspectionTool_V2\encoder_logs\616-00022_Slow_Right_20250416_162402.csv') #Slow Right
 #plot_encoders(r'C:\Users\i2Tech\PycharmProjects\I2EncoderInspectionTool\.venv\Scripts\encoder_logs\616-00022_Fast_Left_20250416_163143.csv') #Fast Left
-#plot_encoders(r'C:\Users\i2Tech\PycharmProjects\I2EncoderInspectionTool\.venv\Scripts\encoder_logs\616-00022_Fast_Right_20250416_162950.csv') #Fast Right
\ No newline at end of file
+#plot_encoders(r'C:\Users\i2Tech\PycharmProjects\I2EncoderInspectionTool\.venv\Scripts\encoder_logs\616-00022_Fast_Right_20250416_162950.csv') #Fast Right
\ No newline at end of file
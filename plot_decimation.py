@@ -0,0 +1,137 @@
+import numpy as np
+
+# Decimation layer between the analysis arrays and matplotlib.
+#
+# Every pass of a line through a horizontal pixel column of the axes is drawn with at
+# most four points: its first, min, max and last sample (M4 decimation). That draws the
+# same pixels as the full line, peaks, spikes and wrap-around drops included, while
+# matplotlib only gets a few thousand points per series. Columns are cut by x, not by
+# sample index, so a series vs wrapped angle keeps one trace per revolution. The
+# full-resolution arrays are kept and the visible range is re-decimated whenever the x
+# limits change (zoom / pan), so zooming in still shows every sample once there are
+# fewer of them than pixels.
+
+POINTS_PER_PIXEL = 4
+DEFAULT_PIXELS = 2000       # used before the figure has a size (e.g. while building it)
+
+
+def minmax_indices(y, bucket):
+    """
+    Indices of the min and max of y in every run of `bucket` consecutive samples.
+
+    Returns:
+        Sorted index array, always including the first and last sample.
+    """
+    n = len(y)
+    if n <= 2 or bucket <= 1:
+        return np.arange(n)
+
+    n_full = n // bucket
+    full = y[:n_full * bucket].reshape(n_full, bucket)
+    starts = np.arange(n_full) * bucket
+    picks = [starts + full.argmin(axis=1), starts + full.argmax(axis=1), [0, n - 1]]
+
+    if n_full * bucket < n:
+        tail = y[n_full * bucket:]
+        picks.append([n_full * bucket + tail.argmin(), n_full * bucket + tail.argmax()])
+    return np.unique(np.concatenate(picks))
+
+
+def column_run_indices(x, y, lo, hi, columns):
+    """
+    Indices of the first, min, max and last sample of every run of consecutive samples
+    whose x falls in the same one of `columns` equal-width columns over [lo, hi].
+
+    Drawn in order these give the same pixels as the full line (M4 decimation), also
+    when x goes back and forth: each pass through a column is a run of its own. Samples
+    outside [lo, hi] count towards the first or last column.
+
+    Returns:
+        Sorted index array.
+    """
+    n = len(y)
+    if n <= 4:
+        return np.arange(n)
+    scale = columns / (hi - lo) if hi > lo else 0.0
+    column = np.clip(((x - lo) * scale).astype(np.int64), 0, columns - 1)
+    starts = np.flatnonzero(np.r_[True, column[1:] != column[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    # Sorted by run, then by y: each run keeps its place, its first sample is its min, its last the max
+    order = np.lexsort((y, np.cumsum(np.r_[True, column[1:] != column[:-1]])))
+    return np.unique(np.concatenate((starts, ends, order[starts], order[ends])))
+
+
+def decimate(x, y, max_points, x_range=None):
+    """
+    M4 decimation of one series for an axis max_points / POINTS_PER_PIXEL pixels wide.
+
+    A series that passes through the same columns many times (e.g. vs wrapped angle)
+    keeps up to POINTS_PER_PIXEL samples per pass, so it can come back with more than max_points.
+
+    Args:
+        x_range: (lo, hi) of the axis, defaults to the range of x.
+
+    Returns:
+        Tuple (x, y) of the kept samples, in their original order.
+    """
+    if len(y) <= max_points:
+        return x, y
+    lo, hi = x_range if x_range is not None else (x.min(), x.max())
+    keep = column_run_indices(x, y, lo, hi, max(1, max_points // POINTS_PER_PIXEL))
+    return x[keep], y[keep]
+
+
+def _axes_pixels(ax):
+    width = ax.get_window_extent().width
+    return int(width) if width > 1 else DEFAULT_PIXELS
+
+
+def decimated_plot(ax, x, y, step=False, **kwargs):
+    """
+    Drop-in for ax.plot(x, y, ...) / ax.step(x, y, where='mid', ...) on long series.
+
+    The line is re-decimated to the axes' pixel width on every x limit change.
+
+    Args:
+        ax: matplotlib Axes.
+        x, y: full-resolution arrays. x may be sorted (time) or not (wrapped angle).
+        step: draw as a mid step plot.
+        **kwargs: passed on to ax.plot / ax.step.
+
+    Returns:
+        The Line2D artist.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    x_sorted = len(x) < 2 or bool(np.all(x[1:] >= x[:-1]))
+
+    def visible_data(lo, hi):
+        if x_sorted:
+            start, stop = np.searchsorted(x, [lo, hi], side='left')
+            start, stop = max(0, start - 1), min(len(x), stop + 1) # keep the segments leaving the view
+            return x[start:stop], y[start:stop]
+        # Out of view samples collapse into the edge columns, the segments leaving the view stay
+        return x, y
+
+    max_points = _axes_pixels(ax) * POINTS_PER_PIXEL
+    dx, dy = decimate(x, y, max_points)
+
+    if step:
+        (line,) = ax.step(dx, dy, where='mid', **kwargs)
+    else:
+        (line,) = ax.plot(dx, dy, **kwargs)
+    if not x_sorted and len(x) > max_points:
+        # The decimated points may miss the x extremes, autoscale to the whole angle range
+        # (extending the line itself to them would draw a segment that isn't in the data)
+        ax.update_datalim([(x.min(), dy[0]), (x.max(), dy[0])], updatey=False)
+        ax.autoscale_view()
+
+    # Plain function (not a bound method) so the callback registry keeps it alive
+    def on_xlim_changed(changed_ax):
+        lo, hi = changed_ax.get_xlim()
+        lo, hi = min(lo, hi), max(lo, hi)
+        vx, vy = visible_data(lo, hi)
+        line.set_data(*decimate(vx, vy, _axes_pixels(changed_ax) * POINTS_PER_PIXEL, (lo, hi)))
+
+    ax.callbacks.connect('xlim_changed', on_xlim_changed)
+    return line
@@ -0,0 +1,243 @@
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+import traceback
+
+# Long-lived plotting process for the GUI.
+#
+#   python plot_worker.py       (started by PlotWorker: requests on stdin, replies on stdout)
+#
+# The analysis and plotting stack (pandas, matplotlib, scipy) takes seconds to import, so
+# the GUI never loads it. PlotWorker starts this script once the window is showing; the
+# worker imports plot_csv, draws a throwaway figure to warm the font cache, says it is
+# ready and then serves every plot request of the session. Requests and replies are one
+# JSON object per line, the worker's own prints go to stderr so they still reach the console.
+#
+# Plot windows belong to the worker, so they don't block the GUI. A worker handles one
+# request at a time (an interactive plot holds it until its windows are closed), so
+# PlotWorkerPool runs up to PLOT_WORKERS of them for plots that overlap. Only this file's
+# standard library imports are loaded in the GUI process.
+
+WORKER_SCRIPT = os.path.abspath(__file__)
+PLOT_WORKERS = 3                # plotting processes the GUI runs at most, i.e. plots that can run at once
+
+# Share of a plot done when each progress stage starts (the job list's progress column).
+# Saving the four figures takes most of a headless plot, the analysis is usually cached;
+# an interactive plot sits at 'showing' until its windows are closed.
+STAGE_PROGRESS = {
+    'waiting for a plot worker': 0.0,
+    'analysing': 0.05,
+    'drawing': 0.3,
+    'showing': 0.5,
+    'saving': 0.55,
+}
+
+
+class PlotCancelled(Exception):
+    """Raised by PlotWorker.run when its cancel_event was set, the worker process is ended."""
+
+
+class PlotWorker:
+    """GUI side of one plotting process: starts it and runs requests on it, one at a time."""
+
+    def __init__(self):
+        self.process = None
+        self.ready = False          # set by the reply thread once the worker has warmed up
+        self.warmup_s = None        # seconds the worker took to import and warm up
+        self._replies = queue.Queue()
+        self._next_id = 1
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """Starts (or restarts) the worker process, it warms up in the background."""
+        if self.alive:
+            return
+        self.ready = False
+        self._replies = queue.Queue() # replies of a previous process are void
+        self.process = subprocess.Popen([sys.executable, WORKER_SCRIPT], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        text=True, encoding='utf-8', bufsize=1)
+        threading.Thread(target=self._read_replies, args=(self.process, self._replies),
+                         name="plot-worker-replies", daemon=True).start()
+
+    def _read_replies(self, process, replies):
+        for line in process.stdout:
+            try:
+                reply = json.loads(line)
+            except ValueError:
+                print(f"plot worker: {line.rstrip()}")
+                continue
+            if reply.get('ready'):
+                self.warmup_s = reply['warmup_s']
+                self.ready = True
+            else:
+                replies.put(reply)
+        if process is self.process:
+            self.ready = False
+        replies.put({'exited': True})
+
+    def run(self, request, cancel_event=None, on_progress=None):
+        """
+        Runs one request and waits for it, (re)starting the worker if needed.
+
+        Args:
+            request: dict with 'action' ('plot' or 'replot') and its arguments, see serve().
+            cancel_event: optional threading.Event, setting it kills the worker (plot windows
+                          included) and raises PlotCancelled.
+            on_progress: optional function called with each stage the worker reports.
+
+        Raises:
+            RuntimeError: the plot failed or the worker exited.
+        """
+        self.start()
+        request = dict(request, id=self._next_id)
+        self._next_id += 1
+        replies = self._replies
+        try:
+            self.process.stdin.write(json.dumps(request) + "\n")
+            self.process.stdin.flush()
+        except OSError:
+            pass # exited already, its 'exited' reply is waiting
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                self.process.kill()
+                raise PlotCancelled()
+            try:
+                reply = replies.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if reply.get('exited'):
+                raise RuntimeError("the plot worker exited")
+            if reply.get('id') != request['id']:
+                continue
+            if 'stage' in reply:
+                if on_progress is not None:
+                    on_progress(reply['stage'])
+                continue
+            if reply.get('error'):
+                raise RuntimeError(reply['error'])
+            return
+
+    def close(self, timeout=2.0):
+        """Asks the worker to finish, and ends it if it is still busy (e.g. plot windows open)."""
+        if not self.alive:
+            return
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+
+
+class PlotWorkerPool:
+    """
+    Up to `size` plotting processes, so several plots can run at once.
+
+    start() pre-warms the first worker; more are started when every running one is busy.
+    run() blocks the calling (job) thread until a worker is free and the plot is done.
+    """
+
+    def __init__(self, size=PLOT_WORKERS):
+        self.size = size
+        self.workers = []
+        self._idle = []
+        self._lock = threading.Condition()
+
+    @property
+    def ready(self):
+        """True once a worker has warmed up."""
+        return any(worker.ready for worker in self.workers)
+
+    def start(self):
+        with self._lock:
+            if not self.workers:
+                worker = PlotWorker()
+                worker.start()
+                self.workers.append(worker)
+                self._idle.append(worker)
+
+    def _acquire(self, cancel_event):
+        with self._lock:
+            while True:
+                if self._idle:
+                    # Warm workers first
+                    self._idle.sort(key=lambda worker: not worker.ready)
+                    return self._idle.pop(0)
+                if len(self.workers) < self.size:
+                    worker = PlotWorker()
+                    self.workers.append(worker)
+                    return worker
+                if cancel_event is not None and cancel_event.is_set():
+                    raise PlotCancelled()
+                self._lock.wait(0.1)
+
+    def run(self, request, cancel_event=None, on_progress=None):
+        """PlotWorker.run on the first free worker, reports 'waiting for a plot worker' while queued."""
+        if on_progress is not None:
+            on_progress('waiting for a plot worker')
+        worker = self._acquire(cancel_event)
+        try:
+            worker.run(request, cancel_event, on_progress)
+        finally:
+            with self._lock:
+                self._idle.append(worker)
+                self._lock.notify()
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+
+def warm_up():
+    """Imports the plotting stack and renders one figure, returns the seconds it took."""
+    start = time.perf_counter()
+    from matplotlib import pyplot as plt
+    import plot_csv # pandas, scipy and the analysis modules
+
+    fig, ax = plt.subplots(figsize=(14, 6))
+    ax.plot([0, 1], [0, 1], label="warm-up")
+    ax.legend()
+    fig.canvas.draw()
+    plt.close(fig)
+    return time.perf_counter() - start
+
+
+def serve(requests, replies):
+    """Worker loop: one JSON request per line from `requests`, one JSON reply per line to `replies`."""
+    def reply(message):
+        replies.write(json.dumps(message) + "\n")
+        replies.flush()
+
+    reply({'ready': True, 'warmup_s': round(warm_up(), 3)})
+    from plot_csv import plot_encoders, replot_encoder_data
+
+    for line in requests:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        progress = lambda stage: reply({'id': request['id'], 'stage': stage})
+        try:
+            if request['action'] == 'plot':
+                plot_encoders(request['filepath'], request['base_name'], request['timestamp'],
+                              interactive=request['interactive'], progress=progress)
+            elif request['action'] == 'replot':
+                replot_encoder_data(request['filename'], interactive=request['interactive'], progress=progress)
+            else:
+                raise ValueError(f"unknown action {request['action']!r}")
+            reply({'id': request['id']})
+        except Exception as e:
+            traceback.print_exc()
+            reply({'id': request['id'], 'error': f"{type(e).__name__}: {e}"})
+
+
+if __name__ == "__main__":
+    # stdout carries the replies, everything plot_csv prints goes to the console through stderr
+    protocol = sys.stdout
+    sys.stdout = sys.stderr
+    serve(sys.stdin, protocol)
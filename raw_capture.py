@@ -0,0 +1,383 @@
+import argparse
+import csv
+import json
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from frame_decoder import (COARSE_MAX_COUNTS, FINE_MAX_COUNTS, FIRMWARE_VERSION, HEADER_BYTE, MESSAGE_LENGTH,
+                           CSV_HEADER, decode_frames, decoded_to_rows)
+from serial_framer import SerialFramer
+from columnar_log import ColumnarLogWriter, columnar_path_for, split_log_name
+from acquisition_pipeline import READ_INTERVAL, READ_MIN_BYTES, STATUS_INTERVAL
+from acquisition_telemetry import MAX_LOST_FRAMES, AcquisitionTelemetry, telemetry_path_for
+
+# Raw capture: the serial bytes exactly as they were read, decoded after the run.
+#
+#   python raw_capture.py [--workers N] [--overwrite] [--plot] encoder_logs/<run>.raw [...]
+#
+# Capturing does nothing per message, the loop is a read and a write, so it keeps up at
+# baud rates where live decoding would start dropping. Layout (like the columnar log):
+#   8-byte magic | uint32 header length | JSON header | blocks
+# with one block per ser.read: float64 host time (s since the capture started) |
+# uint32 byte count | the bytes.
+#
+# decode_raw_capture() writes the usual CSV and .rec log next to the raw file. The byte
+# stream is cut into DECODE_CHUNK_BYTES chunks at frame boundaries and the chunks are
+# framed and decoded in a process pool, then written in order. A cut is only made where
+# two headers sit exactly one frame apart, which is a point the sequential SerialFramer
+# also starts a frame at (frames are ASCII hex, 'Z' never appears inside one), so the
+# log is the same as live decoding would have written. Raw files are kept, re-decoding
+# an old run after the conversion constants or sign conventions change is one command.
+# Decoding also writes the run's telemetry sidecar (acquisition_telemetry.py format), with
+# the per-second rates taken from the block times.
+
+RAW_EXTENSION = ".raw"
+RAW_MAGIC = b"I2ENCRAW"
+RAW_FORMAT_VERSION = 1
+BLOCK_HEADER = struct.Struct('<dI')         # host time, byte count
+DECODE_CHUNK_BYTES = 8 * 1024 * 1024        # bytes framed and decoded per worker task
+SPLIT_SEARCH_BYTES = 64 * 1024              # how far past a chunk target to look for a clean cut
+
+
+def raw_path_for(csv_path):
+    """Returns the path of the raw capture that goes with a CSV log."""
+    return os.path.splitext(csv_path)[0] + RAW_EXTENSION
+
+
+def _write_raw_header(file, header):
+    header_bytes = json.dumps(header).encode('utf-8')
+    file.write(RAW_MAGIC)
+    file.write(struct.pack('<I', len(header_bytes)))
+    file.write(header_bytes)
+
+
+def capture_raw(ser, path, duration, stop_event=None, **info):
+    """
+    Appends everything read from `ser` to a raw capture file for `duration` seconds.
+
+    Args:
+        ser: open serial port (not closed here).
+        path: raw file to write.
+        duration: seconds to capture for.
+        stop_event: optional threading.Event, setting it ends the capture early.
+        info: extra header fields, e.g. base_name, timestamp, port, baudrate.
+
+    Returns:
+        Dict with 'bytes', 'reads' and 'duration_s'.
+    """
+    header = {
+        'format_version': RAW_FORMAT_VERSION,
+        'firmware_version': FIRMWARE_VERSION,
+        'coarse_max_counts': COARSE_MAX_COUNTS,
+        'fine_max_counts': FINE_MAX_COUNTS,
+        'start_time': time.time(),
+    }
+    header.update(info)
+    total_bytes = 0
+    reads = 0
+
+    with open(path, mode='wb', buffering=1 << 20) as file:
+        _write_raw_header(file, header)
+        start = time.perf_counter()
+        end = start + duration
+        next_status = start + STATUS_INTERVAL
+        while True:
+            now = time.perf_counter()
+            if now >= end or (stop_event is not None and stop_event.is_set()):
+                break
+            waiting = ser.in_waiting
+            if waiting < READ_MIN_BYTES:
+                time.sleep(READ_INTERVAL)
+                waiting = ser.in_waiting
+            data = ser.read(waiting or 1)
+            if not data:
+                continue
+            file.write(BLOCK_HEADER.pack(time.perf_counter() - start, len(data)))
+            file.write(data)
+            total_bytes += len(data)
+            reads += 1
+            if now >= next_status:
+                print(f"[{now - start:6.1f} s] {total_bytes} B captured ({total_bytes / (now - start):.0f} B/s), {reads} reads")
+                next_status = now + STATUS_INTERVAL
+
+    elapsed = time.perf_counter() - start
+    print(f"Captured {total_bytes} bytes in {reads} reads over {elapsed:.1f} s to {path}")
+    return {'bytes': total_bytes, 'reads': reads, 'duration_s': elapsed}
+
+
+def read_raw_capture(path):
+    """
+    Maps a raw capture and indexes its blocks.
+
+    Returns:
+        Tuple (header dict, uint8 memmap of the file, blocks) where blocks is a dict of
+        'time_s', 'offset' (file offset of the bytes), 'length' and 'start' (position of
+        the first byte in the captured stream) arrays. A block cut short by a crash is left out.
+    """
+    with open(path, mode='rb') as file:
+        if file.read(len(RAW_MAGIC)) != RAW_MAGIC:
+            raise ValueError(f"{path} is not an encoder raw capture")
+        (header_length,) = struct.unpack('<I', file.read(4))
+        header = json.loads(file.read(header_length).decode('utf-8'))
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+
+    times, offsets, lengths = [], [], []
+    position = len(RAW_MAGIC) + 4 + header_length
+    size = len(data)
+    with open(path, mode='rb') as file:
+        file.seek(position)
+        while position + BLOCK_HEADER.size <= size:
+            time_s, length = BLOCK_HEADER.unpack(file.read(BLOCK_HEADER.size))
+            position += BLOCK_HEADER.size
+            if position + length > size:
+                break
+            times.append(time_s)
+            offsets.append(position)
+            lengths.append(length)
+            position += length
+            file.seek(position)
+
+    lengths = np.array(lengths, dtype=np.int64)
+    blocks = {
+        'time_s': np.array(times),
+        'offset': np.array(offsets, dtype=np.int64),
+        'length': lengths,
+        'start': np.cumsum(lengths) - lengths,
+    }
+    return header, data, blocks
+
+
+def _segments(blocks, start, stop):
+    """(file offset, length) arrays of the pieces of blocks that hold stream bytes [start, stop)."""
+    first = np.searchsorted(blocks['start'], start, side='right') - 1
+    last = np.searchsorted(blocks['start'], stop, side='left')
+    offsets = blocks['offset'][first:last].copy()
+    ends = offsets + blocks['length'][first:last]
+    offsets[0] += start - blocks['start'][first]
+    ends[-1] -= blocks['start'][last - 1] + blocks['length'][last - 1] - stop
+    return offsets, ends - offsets
+
+
+def _stream_bytes(data, offsets, lengths):
+    return np.concatenate([data[offset:offset + length] for offset, length in zip(offsets, lengths)])
+
+
+def find_chunk_bounds(data, blocks, chunk_bytes=DECODE_CHUNK_BYTES):
+    """
+    Stream positions to cut the capture at, so every chunk can be framed on its own.
+
+    A cut goes right after the first pair of headers exactly MESSAGE_LENGTH apart at or
+    after each chunk target; where there is none within SPLIT_SEARCH_BYTES the chunk just grows.
+
+    Returns:
+        List of (start, stop) stream positions covering the whole capture.
+    """
+    total = int(blocks['length'].sum())
+    bounds = [0]
+    target = chunk_bytes
+    while target + MESSAGE_LENGTH < total:
+        window_start = target - MESSAGE_LENGTH
+        window_stop = min(total, target + SPLIT_SEARCH_BYTES)
+        window = _stream_bytes(data, *_segments(blocks, window_start, window_stop))
+        headers = np.flatnonzero(window == HEADER_BYTE)
+        pairs = np.flatnonzero(np.diff(headers) == MESSAGE_LENGTH)
+        if len(pairs):
+            cut = window_start + int(headers[pairs[0] + 1])
+            bounds.append(cut)
+            target = cut + chunk_bytes
+        else:
+            target = window_stop
+    bounds.append(total)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _decode_chunk(task):
+    """
+    Worker: frames and decodes one chunk of a raw capture.
+
+    Returns:
+        Tuple (decoded, framing stats, None), or (None, None, error message) when the chunk
+        could not be decoded, so one corrupt chunk doesn't fail the whole pool map.
+    """
+    path, offsets, lengths = task
+    try:
+        data = np.memmap(path, dtype=np.uint8, mode='r')
+        framer = SerialFramer()
+        framer.feed(memoryview(_stream_bytes(data, offsets, lengths)))
+        frames = framer.read_frames()
+        return decode_frames(frames), framer.stats(), None
+    except Exception as e:
+        return None, None, f"{type(e).__name__}: {e}"
+
+
+def write_capture_telemetry(csv_path, data, blocks, totals, **info):
+    """
+    Writes the telemetry sidecar of a decoded raw capture, in the live pipeline's format.
+
+    Per-second bytes come from the block times, frames per second are estimated from them.
+    Lost frames are inferred like AcquisitionTelemetry does: resyncs after the initial
+    sync, invalid frames and the frames of corrupt chunks. Bytes the serial driver dropped
+    never reached the raw file, so they can't be counted here.
+
+    Args:
+        csv_path: log the sidecar goes with.
+        data, blocks: the capture, from read_raw_capture.
+        totals: decode_raw_capture totals.
+        info: extra top-level fields, e.g. the log name.
+
+    Returns:
+        The report that was written.
+    """
+    telemetry = AcquisitionTelemetry()
+    seconds = np.floor(blocks['time_s']).astype(np.int64)
+    bytes_per_second = np.bincount(seconds, weights=blocks['length']).astype(np.int64) if len(seconds) else np.zeros(0, dtype=np.int64)
+    telemetry.samples['time_s'] = (np.arange(len(bytes_per_second)) + 1.0).tolist()
+    telemetry.samples['bytes_read'] = bytes_per_second.tolist()
+    telemetry.samples['frames'] = (bytes_per_second // MESSAGE_LENGTH).tolist()
+    per_second = {name: telemetry.samples[name] for name in ('time_s', 'frames', 'bytes_read')}
+    gaps = telemetry.rate_gaps()
+
+    # Whatever comes before the first header is the initial sync, not a loss
+    head = _stream_bytes(data, *_segments(blocks, 0, min(totals['bytes'], SPLIT_SEARCH_BYTES))) if totals['bytes'] else np.zeros(0, np.uint8)
+    headers = np.flatnonzero(head == HEADER_BYTE)
+    sync_bytes = int(headers[0]) if len(headers) else len(head)
+    lost_resyncs = max(0, totals['resyncs'] - (1 if sync_bytes else 0))
+    corrupt_frames = totals['corrupt_bytes'] // MESSAGE_LENGTH
+    duration = totals['capture_duration_s']
+
+    summary = {
+        'duration_s': round(duration, 3),
+        'messages': totals['messages'],
+        'mean_rate': totals['messages'] / duration if duration > 0 else 0.0,
+        'invalid_frames': totals['invalid_frames'],
+        'bytes_read': totals['bytes'],
+        'bytes_discarded': totals['bytes_skipped'],
+        'sync_bytes': sync_bytes,
+        'resyncs': totals['resyncs'],
+        'corrupt_chunks': totals['corrupt_chunks'],
+        'max_backlog_bytes': int(blocks['length'].max()) if len(blocks['length']) else 0, # largest single read
+        'estimated_lost_frames': lost_resyncs + totals['invalid_frames'] + corrupt_frames,
+        'rate_gaps': len(gaps),
+    }
+    problems = []
+    if totals['messages'] == 0:
+        problems.append("no messages were received")
+    if summary['estimated_lost_frames'] > MAX_LOST_FRAMES:
+        problems.append(f"about {summary['estimated_lost_frames']} frames lost "
+                        f"({lost_resyncs} resyncs after {totals['bytes_skipped'] - sync_bytes} B discarded, "
+                        f"{totals['invalid_frames']} invalid frames, {totals['corrupt_chunks']} corrupt chunk(s))")
+    if gaps:
+        problems.append(f"message rate dropped in {len(gaps)} second(s), first at {gaps[0]:.0f} s")
+
+    report = dict(info)
+    report.update({'raw_capture': True, 'totals': summary, 'healthy': not problems, 'problems': problems,
+                   'rate_gap_times_s': gaps, 'per_second': per_second})
+    path = telemetry_path_for(csv_path)
+    temp_path = path + ".tmp"
+    with open(temp_path, mode='w', encoding='utf-8') as file:
+        json.dump(report, file, indent=1)
+    os.replace(temp_path, path)
+    return report
+
+
+def decode_raw_capture(raw_path, workers=None, overwrite=False, chunk_bytes=DECODE_CHUNK_BYTES):
+    """
+    Decodes a raw capture into the CSV and columnar logs and the telemetry sidecar next to it.
+
+    Args:
+        raw_path: '<base_name>_<timestamp>.raw' file.
+        workers: decoder processes, 1 decodes in this process (default: one per CPU).
+        overwrite: replace existing logs (re-decoding), otherwise an existing CSV is an error.
+        chunk_bytes: stream bytes per decoder task.
+
+    Returns:
+        Tuple (csv path, totals dict with 'messages', 'invalid_frames', 'bytes', 'bytes_skipped',
+        'resyncs', 'pending_bytes', 'corrupt_chunks', 'corrupt_bytes' and 'capture_duration_s'). A chunk
+        that fails to decode is counted in 'corrupt_chunks', its bytes in 'corrupt_bytes' and
+        'bytes_skipped', and left out.
+    """
+    csv_path = os.path.splitext(raw_path)[0] + ".csv"
+    if os.path.exists(csv_path) and not overwrite:
+        raise FileExistsError(f"{csv_path} already exists, pass overwrite=True to re-decode")
+    header, data, blocks = read_raw_capture(raw_path)
+    base_name, timestamp = split_log_name(raw_path)
+    base_name = header.get('base_name', base_name)
+    timestamp = header.get('timestamp', timestamp)
+
+    chunks = find_chunk_bounds(data, blocks, chunk_bytes) if len(blocks['length']) else []
+    tasks = [(raw_path, *_segments(blocks, start, stop)) for start, stop in chunks]
+    totals = {'messages': 0, 'invalid_frames': 0, 'bytes': int(blocks['length'].sum()), 'bytes_skipped': 0,
+              'resyncs': 0, 'pending_bytes': 0, 'corrupt_chunks': 0, 'corrupt_bytes': 0,
+              'capture_duration_s': float(blocks['time_s'][-1]) if len(blocks['time_s']) else 0.0}
+
+    pool = ProcessPoolExecutor(max_workers=workers) if len(tasks) > 1 and workers != 1 else None
+    try:
+        results = pool.map(_decode_chunk, tasks) if pool is not None else map(_decode_chunk, tasks)
+        with open(csv_path, mode='w', newline='', encoding='utf-8') as file, \
+                ColumnarLogWriter(columnar_path_for(csv_path), base_name, timestamp,
+                                  raw_capture=os.path.basename(raw_path)) as columnar:
+            writer = csv.writer(file)
+            writer.writerow(CSV_HEADER)
+            for (start, stop), (decoded, framing, error) in zip(chunks, results):
+                if error is not None:
+                    print(f"Skipping corrupt chunk at stream bytes {start}-{stop}: {error}")
+                    totals['corrupt_chunks'] += 1
+                    totals['corrupt_bytes'] += stop - start
+                    totals['bytes_skipped'] += stop - start
+                    continue
+                rows = decoded_to_rows(decoded, totals['messages'] + 1)
+                writer.writerows(rows)
+                columnar.write(decoded, totals['messages'] + 1)
+                totals['messages'] += len(rows)
+                totals['invalid_frames'] += len(decoded['valid']) - len(rows)
+                totals['bytes_skipped'] += framing['bytes_skipped']
+                totals['resyncs'] += framing['resync_count']
+                totals['pending_bytes'] = framing['pending_bytes'] # only the last chunk can end mid-frame
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    print(f"Decoded {totals['messages']} messages from {totals['bytes']} bytes in {len(tasks)} chunk(s): "
+          f"{totals['invalid_frames']} invalid frames, {totals['bytes_skipped']} bytes skipped over "
+          f"{totals['resyncs']} resyncs, {totals['corrupt_chunks']} corrupt chunk(s) skipped -> {csv_path}")
+    write_capture_telemetry(csv_path, data, blocks, totals, log=os.path.basename(csv_path), base_name=base_name,
+                            timestamp=timestamp, port=header.get('port'), baudrate=header.get('baudrate'))
+    return csv_path, totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Decode raw encoder captures into CSV/columnar logs.")
+    parser.add_argument("raw_files", nargs="+", help="raw capture files (.raw)")
+    parser.add_argument("--workers", type=int, default=None, help="decoder processes (default: one per CPU)")
+    parser.add_argument("--overwrite", action="store_true", help="re-decode runs that already have a CSV log")
+    parser.add_argument("--plot", action="store_true", help="save the plots of every decoded run")
+    args = parser.parse_args()
+
+    if args.plot:
+        import matplotlib
+        matplotlib.use("Agg")
+    from run_catalog import record_run
+
+    failures = 0
+    for raw_file in args.raw_files:
+        start = time.perf_counter()
+        try:
+            csv_path, _ = decode_raw_capture(raw_file, workers=args.workers, overwrite=args.overwrite)
+        except Exception as e:
+            print(f"Could not decode {raw_file}: {e}")
+            failures += 1
+            continue
+        print(f"{raw_file} decoded in {time.perf_counter() - start:.1f} s")
+        try:
+            record_run(csv_path)
+        except Exception as e:
+            print(f"Could not add the run to the catalog: {e}")
+        if args.plot:
+            from plot_csv import plot_encoders
+
+            base_name, timestamp = split_log_name(csv_path)
+            plot_encoders(csv_path, base_name, timestamp, interactive=False)
+    sys.exit(1 if failures else 0)
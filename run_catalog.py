@@ -0,0 +1,248 @@
+import argparse
+import contextlib
+import os
+import re
+import sqlite3
+import time
+from columnar_log import split_log_name
+
+# SQLite catalog of the runs in encoder_logs, so the GUI and cross-run queries never
+# have to scan the folder or open logs.
+#
+#   python run_catalog.py [--log-dir encoder_logs] [--analyze] [query ...]
+#
+# One row per CSV log: the fields parsed from 'Serial-Number_direction_Voltage_timestamp',
+# row count, duration, the index offset and the slew stats that plot_encoders computes,
+# and the health verdict of its telemetry sidecar. Rows are added by the collector when
+# a run finishes and by plot_encoders when a run is analysed. sync_catalog() picks up
+# files that appeared, changed or vanished behind the tool's back, comparing size and
+# mtime so only those are re-read.
+
+CATALOG_NAME = "run_catalog.sqlite"
+SAMPLE_RATE_HZ = 1000           # 'Message #' counts milliseconds (plot_csv divides it by 1000)
+
+_VOLTAGE = re.compile(r"^(\d+(?:\.\d+)?)V$", re.IGNORECASE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    log TEXT PRIMARY KEY,           -- CSV file name in the log folder
+    base_name TEXT,
+    serial TEXT,
+    direction TEXT,
+    voltage TEXT,
+    voltage_v REAL,
+    timestamp TEXT,                 -- 'YYYYmmdd_HHMMSS' from the file name
+    size INTEGER,
+    mtime_ns INTEGER,
+    row_count INTEGER,
+    duration_s REAL,
+    index_row INTEGER,              -- row of the last index change, the analysis starts there
+    index_offset REAL,              -- index angle at that row
+    coarse_max REAL, coarse_min REAL, coarse_mean REAL,
+    fine_max REAL, fine_min REAL, fine_mean REAL,
+    healthy INTEGER,                -- telemetry verdict, NULL for runs without a sidecar
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS runs_serial ON runs (serial, direction, voltage_v);
+CREATE INDEX IF NOT EXISTS runs_timestamp ON runs (timestamp);
+"""
+
+# Column names accepted as 'field:value' terms in search queries
+SEARCH_FIELDS = ('serial', 'direction', 'voltage', 'timestamp', 'healthy')
+
+
+def catalog_path(log_dir):
+    return os.path.join(log_dir, CATALOG_NAME)
+
+
+@contextlib.contextmanager
+def open_catalog(log_dir):
+    """Connection to the catalog of a log folder (created if needed), committed and closed on exit."""
+    connection = sqlite3.connect(catalog_path(log_dir), timeout=10)
+    try:
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL") # readers don't block the collector's writes
+        connection.executescript(SCHEMA)
+        with connection:
+            yield connection
+    finally:
+        connection.close()
+
+
+def parse_run_name(filename):
+    """
+    Splits a log name into its fields.
+
+    Example: '616-00021_CCW_3.8V_20250425_142244.csv' ->
+             {'base_name': '616-00021_CCW_3.8V', 'serial': '616-00021', 'direction': 'CCW',
+              'voltage': '3.8V', 'voltage_v': 3.8, 'timestamp': '20250425_142244'}
+    Names that don't follow the convention keep whatever fields can be recognised.
+    """
+    base_name, timestamp = split_log_name(filename)
+    parts = base_name.split("_")
+    voltage, voltage_v = None, None
+    match = _VOLTAGE.match(parts[-1]) if len(parts) > 1 else None
+    if match:
+        voltage, voltage_v = parts.pop().upper(), float(match.group(1))
+    return {
+        'base_name': base_name,
+        'serial': parts[0],
+        'direction': "_".join(parts[1:]) or None,
+        'voltage': voltage,
+        'voltage_v': voltage_v,
+        'timestamp': timestamp or None,
+    }
+
+
+def _file_fields(filepath):
+    from chunked_analysis import log_row_count
+    from acquisition_telemetry import load_telemetry
+
+    stat = os.stat(filepath)
+    fields = parse_run_name(filepath)
+    rows = log_row_count(filepath)
+    telemetry = load_telemetry(filepath)
+    fields.update({
+        'log': os.path.basename(filepath),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'row_count': rows,
+        'duration_s': rows / SAMPLE_RATE_HZ,
+        'healthy': None if telemetry is None else int(telemetry['healthy']),
+        'updated': time.time(),
+    })
+    return fields
+
+
+def _upsert(connection, fields):
+    names = list(fields)
+    connection.execute(
+        f"INSERT INTO runs ({', '.join(names)}) VALUES ({', '.join('?' * len(names))}) "
+        f"ON CONFLICT(log) DO UPDATE SET {', '.join(f'{name}=excluded.{name}' for name in names if name != 'log')}",
+        [fields[name] for name in names])
+
+
+def record_run(filepath):
+    """Adds or refreshes one log's row (called by the collector when a run finishes)."""
+    log_dir = os.path.dirname(filepath) or "."
+    with open_catalog(log_dir) as connection:
+        _upsert(connection, _file_fields(filepath))
+
+
+def record_analysis(filepath, analysis):
+    """Stores the index offset and slew stats of a plot_encoders analysis."""
+    change_rows = analysis['change_rows']
+    fields = {'log': os.path.basename(filepath), 'index_row': int(change_rows[-1]) if len(change_rows) else None,
+              'index_offset': float(analysis['last_changed_value']), 'updated': time.time()}
+    for encoder in ('coarse', 'fine'):
+        for stat in ('max', 'min', 'mean'):
+            fields[f"{encoder}_{stat}"] = float(analysis['stats'][encoder][stat])
+
+    log_dir = os.path.dirname(filepath) or "."
+    with open_catalog(log_dir) as connection:
+        if connection.execute("SELECT 1 FROM runs WHERE log = ?", (fields['log'],)).fetchone() is None:
+            _upsert(connection, _file_fields(filepath))
+        _upsert(connection, fields)
+
+
+def sync_catalog(log_dir):
+    """
+    Brings the catalog in line with the folder: new and changed logs are (re)read, rows of
+    deleted logs are dropped. Unchanged logs cost one stat each.
+
+    Returns:
+        Tuple (added or updated count, removed count).
+    """
+    with open_catalog(log_dir) as connection:
+        known = {row['log']: (row['size'], row['mtime_ns']) for row in connection.execute("SELECT log, size, mtime_ns FROM runs")}
+        present = set()
+        changed = 0
+        with os.scandir(log_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.lower().endswith(".csv"):
+                    continue
+                present.add(entry.name)
+                stat = entry.stat()
+                if known.get(entry.name) == (stat.st_size, stat.st_mtime_ns):
+                    continue
+                try:
+                    _upsert(connection, _file_fields(entry.path))
+                    changed += 1
+                except (OSError, ValueError) as e:
+                    print(f"Could not catalog {entry.name}: {e}")
+        removed = [log for log in known if log not in present]
+        connection.executemany("DELETE FROM runs WHERE log = ?", [(log,) for log in removed])
+    return changed, len(removed)
+
+
+def _search_sql(query):
+    """WHERE clause for a query: 'field:value' terms match that column, other words match the file name."""
+    clauses, values = [], []
+    for term in query.split():
+        field, _, value = term.partition(":")
+        if value and field.lower() in SEARCH_FIELDS:
+            field = field.lower()
+            if field == 'healthy':
+                clauses.append("healthy = ?")
+                values.append(1 if value.lower() in ('1', 'yes', 'true', 'ok') else 0)
+            else:
+                clauses.append(f"{field} LIKE ?")
+                values.append(f"%{value}%")
+        else:
+            clauses.append("log LIKE ?")
+            values.append(f"%{term}%")
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", values
+
+
+def search_runs(log_dir, query=""):
+    """
+    Runs matching a query, e.g. '616-00021 CCW 3.8V' or 'serial:616-00021 voltage:3.8 healthy:no'.
+
+    Returns:
+        List of dicts (one per run, all catalog columns), sorted by file name.
+    """
+    where, values = _search_sql(query)
+    with open_catalog(log_dir) as connection:
+        return [dict(row) for row in connection.execute(f"SELECT * FROM runs{where} ORDER BY log", values)]
+
+
+def search_log_names(log_dir, query=""):
+    """File names of the runs matching a query (GUI dropdown)."""
+    where, values = _search_sql(query)
+    with open_catalog(log_dir) as connection:
+        return [row['log'] for row in connection.execute(f"SELECT log FROM runs{where} ORDER BY log", values)]
+
+
+def analyze_missing(log_dir):
+    """Runs the plot_encoders analysis (through the analysis cache) for catalogued runs without stats."""
+    from plot_csv import analyze_for_plot
+
+    with open_catalog(log_dir) as connection:
+        missing = [row['log'] for row in connection.execute("SELECT log FROM runs WHERE coarse_mean IS NULL ORDER BY log")]
+    for log in missing:
+        filepath = os.path.join(log_dir, log)
+        try:
+            record_analysis(filepath, analyze_for_plot(filepath))
+        except Exception as e:
+            print(f"Could not analyse {log}: {e}")
+    return len(missing)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update and query the encoder run catalog.")
+    parser.add_argument("query", nargs="*", help="search terms, e.g. 616-00021 CCW 3.8V or serial:616-00021 healthy:no")
+    parser.add_argument("--log-dir", default="encoder_logs", help="folder with the CSV logs (default: encoder_logs)")
+    parser.add_argument("--analyze", action="store_true", help="compute missing index offsets and slew stats")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    changed, removed = sync_catalog(args.log_dir)
+    print(f"Catalog synced in {time.perf_counter() - start:.3f} s: {changed} added/updated, {removed} removed.")
+    if args.analyze:
+        print(f"Analysed {analyze_missing(args.log_dir)} run(s).")
+
+    for run in search_runs(args.log_dir, " ".join(args.query)):
+        stats = "" if run['coarse_mean'] is None else (f", index {run['index_offset']:.3f}°, "
+                                                       f"coarse {run['coarse_mean']:.2f}°/s, fine {run['fine_mean']:.2f}°/s")
+        health = {None: "", 1: ", healthy", 0: ", UNHEALTHY"}[run['healthy']]
+        print(f"{run['log']}: {run['row_count']} rows, {run['duration_s']:.1f} s{stats}{health}")
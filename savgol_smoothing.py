@@ -0,0 +1,218 @@
+import functools
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.fft import irfft, next_fast_len, rfft
+from scipy.signal import savgol_coeffs
+
+# Savitzky-Golay smoothing for the big (10001 sample) windows used in plot_encoders.
+#
+# scipy.signal.savgol_filter convolves directly, O(N * window) per signal. Here the fixed
+# SG kernel is applied with FFTs over blocks (overlap-save), O(N log window), and every
+# signal in a stacked 2-D array is filtered in the same pass. Edges use the same 'interp'
+# polynomial fit as scipy. Blocks are aligned to the global sample index (offset), so a
+# chunk of a longer signal filtered with enough halo gives bit-for-bit the same values
+# as filtering the whole signal at once (chunked_analysis.py relies on that).
+
+WINDOW_LENGTH = 10001
+POLYORDER = 3
+FFT_BATCH_VALUES = 1 << 22      # FFT input values transformed at once, bounds the scratch memory
+
+
+def effective_window(n_samples, window_length=WINDOW_LENGTH, polyorder=POLYORDER):
+    """
+    Window actually used for a signal of n_samples.
+
+    Short captures get the largest odd window that fits instead of an error.
+
+    Returns:
+        Odd window length, or 0 if the signal is too short to fit the polynomial at all.
+    """
+    window = min(window_length, n_samples if n_samples % 2 else n_samples - 1)
+    if window <= polyorder:
+        return 0
+    return window
+
+
+@functools.lru_cache(maxsize=8)
+def _kernel(window_length, polyorder):
+    """Returns (block size, FFT length, kernel spectrum) for a window."""
+    coeffs = savgol_coeffs(window_length, polyorder, use='dot')
+    fft_length = next_fast_len(4 * window_length)
+    block = fft_length - window_length + 1
+    # Convolving with the reversed coefficients correlates with them
+    spectrum = rfft(coeffs[::-1], fft_length)
+    return block, fft_length, spectrum
+
+
+def _fit_edge(x, window_length, polyorder):
+    """
+    Start edge of every row of x, like savgol_filter's 'interp' mode (scipy's _fit_edge).
+
+    Fits a polynomial to each row's first window by least squares and evaluates it on the
+    first half window. Done per call on purpose: the equivalent edge matrix is
+    half x window (~400 MB at 10001 samples), far too big to cache.
+
+    Returns:
+        Array of shape (rows, window_length // 2).
+    """
+    half = window_length // 2
+    t = (np.arange(window_length) - half) / half    # scaled to [-1, 1] for a well conditioned fit
+    vander = np.vander(t, polyorder + 1)
+    poly = np.linalg.lstsq(vander, x[:, :window_length].T, rcond=None)[0]
+    return (vander[:half] @ poly).T
+
+
+def block_size(window_length=WINDOW_LENGTH, polyorder=POLYORDER):
+    """Output block length of the FFT evaluation for this window."""
+    return _kernel(window_length, polyorder)[0]
+
+
+def halo_samples(window_length=WINDOW_LENGTH, polyorder=POLYORDER):
+    """Samples needed on each side of a chunk for its filtered values to match the whole-signal result."""
+    return window_length + block_size(window_length, polyorder)
+
+
+def _correlate_blocks(x, offset, window_length, polyorder):
+    """Correlates every row of x with the SG kernel, blocks aligned to offset + local index."""
+    block, fft_length, spectrum = _kernel(window_length, polyorder)
+    rows, n = x.shape
+    half = window_length // 2
+
+    first_block = (offset // block) * block - offset      # local index of the first block start, <= 0
+    n_blocks = -(-(n - first_block) // block)
+    segment = block + window_length - 1
+    pad_left = half - first_block
+
+    padded = np.zeros((rows, n_blocks * block + window_length - 1))
+    padded[:, pad_left:pad_left + n] = x
+    segments = sliding_window_view(padded, segment, axis=1)
+
+    out = np.empty((rows, n_blocks * block))
+    per_batch = max(1, FFT_BATCH_VALUES // (fft_length * rows))
+    for b in range(0, n_blocks, per_batch):
+        stop = min(b + per_batch, n_blocks)
+        batch = segments[:, b * block:(stop - 1) * block + 1:block]
+        conv = irfft(rfft(batch, fft_length, axis=-1) * spectrum, fft_length, axis=-1)
+        out[:, b * block:stop * block] = conv[..., window_length - 1:window_length - 1 + block].reshape(rows, -1)
+    return out[:, -first_block:-first_block + n]
+
+
+def savgol_smooth(x, window_length=WINDOW_LENGTH, polyorder=POLYORDER, offset=0):
+    """
+    Savitzky-Golay smoothing (mode='interp'), FFT evaluated, for one or many signals.
+
+    Args:
+        x: 1-D signal or 2-D array with one signal per row (all filtered in one pass).
+        window_length: odd window, shrunk to fit when the signal is shorter (see effective_window).
+        polyorder: polynomial order.
+        offset: global index of x[0] when x is a piece of a longer signal, keeps block
+                alignment (and therefore rounding) the same as for the whole signal.
+
+    Returns:
+        Array of the same shape as x. Signals too short to fit the polynomial come back unfiltered.
+    """
+    x = np.asarray(x, dtype=float)
+    one_d = x.ndim == 1
+    x2 = x[np.newaxis, :] if one_d else x
+    n = x2.shape[1]
+
+    window = effective_window(n, window_length, polyorder)
+    if window == 0:
+        return x.copy()
+
+    out = _correlate_blocks(x2, offset, window, polyorder)
+
+    # Polynomial fit on the first and last window for the edges, like savgol_filter's 'interp'
+    half = window // 2
+    out[:, :half] = _fit_edge(x2, window, polyorder)
+    out[:, n - half:] = _fit_edge(x2[:, ::-1], window, polyorder)[:, ::-1]
+    return out[0] if one_d else out
+
+
+class StreamingSavgol:
+    """
+    Incremental savgol_smooth for data that arrives in pieces (one or more signals).
+
+    push() returns the filtered values that are final so far, finish() returns the rest.
+    Concatenated, the outputs equal savgol_smooth over the whole signal. Memory holds
+    about one window plus one block per signal.
+    """
+
+    def __init__(self, window_length=WINDOW_LENGTH, polyorder=POLYORDER, rows=1):
+        self.window_length = window_length
+        self.polyorder = polyorder
+        self.rows = rows
+        self._buffer = np.empty((rows, 0))
+        self._buffer_start = 0      # global index of _buffer[:, 0]
+        self._emitted = 0           # global index of the next output
+
+    def push(self, x):
+        """Adds samples, shape (n,) for one signal or (rows, n). Returns newly final outputs in the same layout."""
+        x = np.asarray(x, dtype=float)
+        self._buffer = np.concatenate((self._buffer, x.reshape(self.rows, -1)), axis=1)
+        buffer_end = self._buffer_start + self._buffer.shape[1]
+
+        # The start edge needs a full window, interior blocks need their right halo
+        if buffer_end < self.window_length:
+            return self._shape(np.empty((self.rows, 0)))
+        block = block_size(self.window_length, self.polyorder)
+        ready = ((buffer_end - self.window_length) // block) * block
+        return self._shape(self._emit(ready, final=False))
+
+    def finish(self):
+        """Returns every remaining output (applies the end edge fit)."""
+        buffer_end = self._buffer_start + self._buffer.shape[1]
+        return self._shape(self._emit(buffer_end, final=True))
+
+    def _emit(self, end, final):
+        if end <= self._emitted:
+            return np.empty((self.rows, 0))
+
+        if final:
+            if self._emitted == 0:
+                # Everything is still buffered, filter it as one signal (also handles short runs)
+                out = savgol_smooth(self._buffer, self.window_length, self.polyorder)
+            else:
+                out = savgol_smooth(self._buffer, self.window_length, self.polyorder, offset=self._buffer_start)
+                out = out[:, self._emitted - self._buffer_start:]
+        else:
+            out = savgol_smooth(self._buffer, self.window_length, self.polyorder, offset=self._buffer_start)
+            # A buffer starting at sample 0 gets the start edge fit here too
+            out = out[:, self._emitted - self._buffer_start:end - self._buffer_start]
+
+        self._emitted = end
+        # Keep only what later outputs can reach
+        keep_from = max(self._buffer_start, self._emitted - halo_samples(self.window_length, self.polyorder))
+        self._buffer = self._buffer[:, keep_from - self._buffer_start:]
+        self._buffer_start = keep_from
+        return out
+
+    def _shape(self, out):
+        return out[0] if self.rows == 1 else out
+
+
+if __name__ == "__main__":
+    # Accuracy and speed check against scipy: python savgol_smoothing.py [samples]
+    import sys
+    import time
+    from scipy.signal import savgol_filter
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 600_000
+    rng = np.random.default_rng(0)
+    signals = np.cumsum(rng.normal(size=(4, n)), axis=1)
+
+    window = effective_window(n)
+    t0 = time.perf_counter()
+    expected = np.vstack([savgol_filter(row, window, POLYORDER) for row in signals])
+    t1 = time.perf_counter()
+    got = savgol_smooth(signals)
+    t2 = time.perf_counter()
+
+    stream = StreamingSavgol(rows=4)
+    pieces = [stream.push(signals[:, i:i + 50_000]) for i in range(0, n, 50_000)] + [stream.finish()]
+    streamed = np.concatenate(pieces, axis=1)
+
+    scale = np.abs(expected).max()
+    print(f"{n} samples x 4 signals, window {window}: scipy {t1 - t0:.3f} s, savgol_smooth {t2 - t1:.3f} s")
+    print(f"max error vs scipy: {np.abs(got - expected).max() / scale:.2e} (relative to signal max)")
+    print(f"streaming matches batch: {np.array_equal(streamed, got)}")
@@ -0,0 +1,107 @@
+from frame_decoder import HEADER_BYTE, MESSAGE_LENGTH
+
+COMPACT_THRESHOLD = 1 << 16     # only shift the buffer down once this many consumed bytes pile up
+MAX_SCAN_FRAMES = 1 << 14       # upper bound on frames header-checked in one step
+
+
+class SerialFramer:
+    """
+    Splits the raw serial byte stream into aligned 31-byte 'Z' frames.
+
+    Bytes are appended to one bytearray and consumed through a read cursor, so a big
+    backlog from ser.read is framed in linear time instead of re-slicing the buffer
+    for every frame. Consumed bytes are dropped only once they make up at least half
+    of the buffer (and at least COMPACT_THRESHOLD bytes).
+
+    Framing rules are the same as the original loop: find the next header byte, take
+    the MESSAGE_LENGTH bytes starting there as one frame, repeat. Bytes passed over
+    while looking for a header are counted as skipped.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._cursor = 0
+
+        self.bytes_fed = 0          # total bytes handed to feed()
+        self.frames_read = 0        # total frames returned by read_frames()
+        self.bytes_skipped = 0      # bytes discarded while resyncing on a header
+        self.resync_count = 0       # number of times the stream was out of alignment
+
+    @property
+    def pending_bytes(self):
+        """Bytes carried over to the next read (partial frame and/or unsynced tail)."""
+        return len(self._buffer) - self._cursor
+
+    def feed(self, data):
+        """Appends freshly read serial bytes."""
+        self._buffer += data
+        self.bytes_fed += len(data)
+
+    def read_frames(self):
+        """
+        Pulls every complete frame out of the buffered bytes.
+
+        Returns:
+            bytearray holding the frames back to back (length is a multiple of MESSAGE_LENGTH),
+            empty if no complete frame is available yet.
+        """
+        buf = self._buffer
+        out = bytearray()
+        scan = 16
+
+        with memoryview(buf) as view:
+            while True:
+                pos = buf.find(HEADER_BYTE, self._cursor)
+                if pos < 0:
+                    # No header anywhere in what is left, none of it can start a frame
+                    if len(buf) > self._cursor:
+                        self._skip(len(buf) - self._cursor)
+                    break
+                if pos > self._cursor:
+                    self._skip(pos - self._cursor)
+
+                available = (len(buf) - self._cursor) // MESSAGE_LENGTH
+                if available == 0:
+                    break # partial frame, wait for more bytes
+
+                # Check the header byte of the next frames in one go (header of frame 0 is known good)
+                n = min(available, scan)
+                end = self._cursor + n * MESSAGE_LENGTH
+                headers = buf[self._cursor:end:MESSAGE_LENGTH]
+                aligned = n - len(headers.lstrip(bytes((HEADER_BYTE,))))
+                if aligned == 0:
+                    aligned = 1 # a frame always starts at a header, even if the next one is off
+
+                end = self._cursor + aligned * MESSAGE_LENGTH
+                out += view[self._cursor:end]
+                self._cursor = end
+                self.frames_read += aligned
+
+                # Gallop while the stream is aligned, fall back to short scans after a resync
+                scan = min(scan * 2, MAX_SCAN_FRAMES) if aligned == n else 16
+
+        self._compact()
+        return out
+
+    def stats(self):
+        """Returns the framing counters as a dict."""
+        return {
+            'bytes_fed': self.bytes_fed,
+            'frames_read': self.frames_read,
+            'bytes_skipped': self.bytes_skipped,
+            'resync_count': self.resync_count,
+            'pending_bytes': self.pending_bytes,
+        }
+
+    def _skip(self, count):
+        self.bytes_skipped += count
+        self.resync_count += 1
+        self._cursor += count
+
+    def _compact(self):
+        if self._cursor == len(self._buffer):
+            self._buffer.clear()
+            self._cursor = 0
+        elif self._cursor >= COMPACT_THRESHOLD and self._cursor * 2 >= len(self._buffer):
+            del self._buffer[:self._cursor]
+            self._cursor = 0
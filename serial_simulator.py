@@ -0,0 +1,265 @@
+import os
+import threading
+import time
+import numpy as np
+from frame_decoder import (COARSE_MAX_COUNTS, FINE_MAX_COUNTS, HEADER_BYTE, MESSAGE_LENGTH,
+                           C_ENCODER_COM, C_ENCODER_CTS, F_ENCODER_CTS, F_ENCODER_COM, I_ENCODER_CTS, FINE_INDEX)
+
+# Hardware-free stand-in for the encoder controller on COM3.
+#
+# encode_frames builds valid 31-byte 'Z' frames (same field layout, ASCII hex, reversed
+# bytes, two's complement) from columns of signed values. The values can come from a
+# synthetic motion profile or be replayed from an existing log. inject_noise adds partial
+# frames, stray header bytes and garbage. The byte stream is then served either by
+# SimulatedSerial (serial.Serial-compatible, paced at the baud rate, with a finite
+# receive buffer that overruns like a real UART driver) or through a Linux
+# pseudo-terminal by PtyFeeder.
+
+# Frame fields in the order encode_frames expects them
+FRAME_FIELDS = {
+    'c_cmd_val': C_ENCODER_COM,
+    'c_counts': C_ENCODER_CTS,
+    'f_counts': F_ENCODER_CTS,
+    'f_cmd_val': F_ENCODER_COM,
+    'i_counts': I_ENCODER_CTS,
+    'index_counts': FINE_INDEX,
+}
+
+_HEX_CHARS = np.frombuffer(b"0123456789ABCDEF", dtype=np.uint8)
+
+DEFAULT_BAUDRATE = 460800
+DEFAULT_RX_BUFFER = 4096        # bytes the OS driver holds before it overruns (Windows default)
+BITS_PER_BYTE = 10              # 8N1: start + 8 data + stop
+
+
+def encode_frames(columns):
+    """
+    Builds frames from columns of signed field values.
+
+    Args:
+        columns: dict with the FRAME_FIELDS keys, equal-length integer arrays
+                 (missing fields are sent as zero).
+
+    Returns:
+        (N, MESSAGE_LENGTH) uint8 array of frames.
+    """
+    n = len(next(iter(columns.values())))
+    frames = np.empty((n, MESSAGE_LENGTH), dtype=np.uint8)
+    frames[:, 0] = HEADER_BYTE
+    for name, (start, stop) in FRAME_FIELDS.items():
+        width = stop - start
+        values = np.asarray(columns.get(name, np.zeros(n)), dtype=np.int64) & ((1 << (4 * width)) - 1)
+        # Reversed on the wire: least significant hex digit first
+        for k in range(width):
+            frames[:, start + k] = _HEX_CHARS[(values >> (4 * k)) & 0xF]
+    return frames
+
+
+def degrees_to_counts(degrees, max_counts):
+    """Inverse of the decoder's (counts / max_counts) * 360 (exact for logged values)."""
+    return np.rint(np.asarray(degrees) / 360 * max_counts).astype(np.int64)
+
+
+def motion_profile(n, rate_hz=1000, speed_deg_s=95.0, ripple_deg=0.05, ripple_order=2, index_after_s=1.0, seed=0):
+    """
+    Synthetic constant-speed run: coarse angle ramps at speed_deg_s, the glass encoder
+    follows with an angle ripple (per revolution, order ripple_order) and a little noise,
+    and the index angle latches after index_after_s.
+
+    Returns:
+        Columns for encode_frames.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) / rate_hz
+    coarse = speed_deg_s * t
+    fine = coarse + ripple_deg * np.sin(np.deg2rad(coarse) * ripple_order) + rng.normal(0, 0.001, n)
+
+    def wrap(angle):
+        return ((angle + 180) % 360) - 180
+
+    index = np.where(t >= index_after_s, 12.5, 0.0)
+    return {
+        'c_cmd_val': np.zeros(n, dtype=np.int64),
+        'c_counts': degrees_to_counts(wrap(coarse), COARSE_MAX_COUNTS),
+        # Fine angle and index are sign swapped by the decoder
+        'f_counts': -degrees_to_counts(wrap(fine), FINE_MAX_COUNTS),
+        'f_cmd_val': np.full(n, 2, dtype=np.int64),
+        'i_counts': np.zeros(n, dtype=np.int64),
+        'index_counts': -degrees_to_counts(index, FINE_MAX_COUNTS),
+    }
+
+
+def profile_from_log(filepath, max_rows=None):
+    """
+    Columns for encode_frames that replay an existing log (CSV or its .rec copy).
+
+    Decoding the replayed frames gives back the logged angles and commands.
+    """
+    from chunked_analysis import iter_log_columns
+
+    fields = ('c_degrees', 'f_degrees', 'absolute_index', 'c_cmd_val', 'f_cmd_val')
+    parts = {name: [] for name in fields}
+    rows = 0
+    for chunk in iter_log_columns(filepath, fields=fields):
+        for name in fields:
+            parts[name].append(chunk[name])
+        rows += len(chunk[fields[0]])
+        if max_rows is not None and rows >= max_rows:
+            break
+    log = {name: np.concatenate(parts[name])[:max_rows] for name in fields}
+    return {
+        'c_cmd_val': log['c_cmd_val'].astype(np.int64),
+        'c_counts': degrees_to_counts(log['c_degrees'], COARSE_MAX_COUNTS),
+        'f_counts': -degrees_to_counts(log['f_degrees'], FINE_MAX_COUNTS),
+        'f_cmd_val': log['f_cmd_val'].astype(np.int64),
+        'i_counts': np.zeros(len(log['c_degrees']), dtype=np.int64),
+        'index_counts': -degrees_to_counts(log['absolute_index'], FINE_MAX_COUNTS),
+    }
+
+
+def inject_noise(frames, partial_frame_prob=0.0, stray_header_prob=0.0, garbage_prob=0.0, seed=0):
+    """
+    Serializes frames into a byte stream with line noise mixed in.
+
+    Args:
+        frames: (N, MESSAGE_LENGTH) uint8 array.
+        partial_frame_prob: chance a frame is cut short (its tail never arrives).
+        stray_header_prob: chance a lone 0x5A byte precedes a frame.
+        garbage_prob: chance 1-40 random non-header bytes precede a frame.
+
+    Returns:
+        bytes of the stream.
+    """
+    if not (partial_frame_prob or stray_header_prob or garbage_prob):
+        return frames.tobytes()
+
+    rng = np.random.default_rng(seed)
+    n = len(frames)
+    cut = np.where(rng.random(n) < partial_frame_prob, rng.integers(1, MESSAGE_LENGTH, n), MESSAGE_LENGTH)
+    stray = rng.random(n) < stray_header_prob
+    garbage = rng.random(n) < garbage_prob
+
+    pieces = []
+    for i in range(n):
+        if garbage[i]:
+            junk = rng.integers(0, 256, rng.integers(1, 41), dtype=np.uint8)
+            junk[junk == HEADER_BYTE] = 0
+            pieces.append(junk.tobytes())
+        if stray[i]:
+            pieces.append(bytes((HEADER_BYTE,)))
+        pieces.append(frames[i, :cut[i]].tobytes())
+    return b"".join(pieces)
+
+
+class SimulatedSerial:
+    """
+    serial.Serial-compatible stand-in (in_waiting, read, close) serving a byte stream at a baud rate.
+
+    Bytes "arrive" at baudrate / BITS_PER_BYTE bytes per second from the first access,
+    optionally in bursts every burst_interval seconds. Like a real driver only
+    rx_buffer_size unread bytes are held; older ones are overwritten and counted in
+    overrun_bytes.
+    """
+
+    def __init__(self, data, baudrate=DEFAULT_BAUDRATE, timeout=1, rx_buffer_size=DEFAULT_RX_BUFFER, burst_interval=0.0):
+        self.data = data
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.rx_buffer_size = rx_buffer_size
+        self.burst_interval = burst_interval
+        self.bytes_per_second = baudrate / BITS_PER_BYTE
+        self.is_open = True
+        self.overrun_bytes = 0
+        self.start_time = None
+        self._position = 0
+
+    def _elapsed(self):
+        if self.start_time is None:
+            self.start_time = time.perf_counter()
+        elapsed = time.perf_counter() - self.start_time
+        if self.burst_interval:
+            elapsed = (elapsed // self.burst_interval) * self.burst_interval
+        return elapsed
+
+    def _arrived(self):
+        arrived = min(len(self.data), int(self._elapsed() * self.bytes_per_second))
+        unread = arrived - self._position
+        if self.rx_buffer_size and unread > self.rx_buffer_size:
+            self.overrun_bytes += unread - self.rx_buffer_size
+            self._position = arrived - self.rx_buffer_size
+        return arrived
+
+    def arrival_time(self, offset):
+        """perf_counter time at which byte `offset` of the stream arrived (or will arrive)."""
+        self._elapsed()
+        arrival = (offset + 1) / self.bytes_per_second
+        if self.burst_interval:
+            arrival = -(-arrival // self.burst_interval) * self.burst_interval
+        return self.start_time + arrival
+
+    @property
+    def finished(self):
+        """True once the whole stream has arrived and been read."""
+        return self._arrived() == len(self.data) and self._position == len(self.data)
+
+    @property
+    def in_waiting(self):
+        return self._arrived() - self._position
+
+    def read(self, size=1):
+        deadline = time.perf_counter() + (self.timeout if self.timeout is not None else float('inf'))
+        while True:
+            available = self._arrived() - self._position
+            if available > 0:
+                data = self.data[self._position:self._position + min(size, available)]
+                self._position += len(data)
+                return data
+
+            # Block like a real port: until the next byte arrives or the timeout runs out
+            now = time.perf_counter()
+            if now >= deadline:
+                return b""
+            if self._position >= len(self.data):
+                wait_until = deadline # nothing more is coming
+            else:
+                wait_until = min(deadline, self.arrival_time(self._position))
+            time.sleep(max(0.0, wait_until - now))
+
+    def close(self):
+        self.is_open = False
+
+
+class PtyFeeder(threading.Thread):
+    """
+    Writes a byte stream into a Linux pseudo-terminal at a baud rate.
+
+    Open `port` with serial.Serial like a real device (e.g. pass it to EncoderDataCollector).
+    """
+
+    def __init__(self, data, baudrate=DEFAULT_BAUDRATE, chunk_bytes=256):
+        super().__init__(name="pty-feeder", daemon=True)
+        import tty
+
+        self.data = data
+        self.bytes_per_second = baudrate / BITS_PER_BYTE
+        self.chunk_bytes = chunk_bytes
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.stop_event = threading.Event()
+
+    def run(self):
+        start = time.perf_counter()
+        for offset in range(0, len(self.data), self.chunk_bytes):
+            if self.stop_event.is_set():
+                break
+            due = start + (offset + self.chunk_bytes) / self.bytes_per_second
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            os.write(self.master, self.data[offset:offset + self.chunk_bytes])
+
+    def close(self):
+        self.stop_event.set()
+        os.close(self.master)
+        os.close(self.slave)
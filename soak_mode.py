@@ -0,0 +1,355 @@
+import argparse
+import csv
+import os
+import sys
+import time
+import numpy as np
+from frame_decoder import CSV_HEADER
+from columnar_log import ColumnarLogWriter, columnar_path_for, split_log_name
+from acquisition_telemetry import telemetry_path_for
+
+# Soak (burn-in) mode: collect for many hours in flat memory.
+#
+#   python soak_mode.py NAME [--hours 12] [--port COM3] [--segment-mb 256] [--segment-minutes 60] [--window 10]
+#   python soak_mode.py --trend encoder_logs/NAME_TIMESTAMP.soak      (trend plots of a soak)
+#
+# The log is cut into segments by size or age. Every segment is an ordinary log
+# ('<base name>_<segment start time>.csv' plus its .rec) that plot_encoders, the run
+# catalog and the GUI dropdown take as is; 'Message #' keeps counting across segments so
+# they line up in time. Each closed segment is added to the run catalog.
+#
+# While capturing, the velocity of both encoders (one-sample difference of the decoded
+# angles, message # = ms) goes into per-window mean / variance (Welford, merged batch by
+# batch with Chan's update) and min / max. One row per window is appended to
+# '<base name>_<run start>.soak', a small CSV (about 9k rows a day at 10 s windows)
+# that trend plots load at once instead of hours of raw data.
+#
+# Nothing grows with the run length: rows go straight to disk, the statistics are a few
+# numbers per window and the telemetry keeps only the last TELEMETRY_SAMPLES seconds.
+# The run's telemetry sidecar is written next to the first segment.
+
+SOAK_SUFFIX = ".soak"
+SEGMENT_BYTES = 256 * 1024 * 1024   # CSV size at which a new segment starts
+SEGMENT_S = 3600                    # age at which a new segment starts
+MIN_SEGMENT_S = 1                   # segments are named by their start second, never rotate faster
+WINDOW_S = 10                       # seconds of samples per summary row
+TELEMETRY_SAMPLES = 3600            # per-second telemetry samples kept
+SAMPLE_RATE_HZ = 1000               # 'Message #' counts milliseconds
+
+STATS_FIELDS = ('mean', 'std', 'min', 'max')
+SUMMARY_HEADER = (['window_start_s', 'window_s', 'wall_time', 'messages', 'segment']
+                  + [f"{encoder}_velocity_{stat}" for encoder in ('coarse', 'fine') for stat in STATS_FIELDS])
+
+
+def soak_summary_path_for(log_path):
+    """Returns the path of the soak summary that goes with the first segment of a soak."""
+    return os.path.splitext(log_path)[0] + SOAK_SUFFIX
+
+
+class RunningStats:
+    """Online count, mean, variance, min and max, fed a batch at a time."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0               # sum of squared deviations from the mean
+        self.minimum = np.inf
+        self.maximum = -np.inf
+
+    def update(self, values):
+        if len(values) == 0:
+            return
+        # Batch mean / M2 from numpy, merged into the running ones (Chan et al.), so the
+        # per-sample Python loop of textbook Welford is avoided without losing its stability
+        count = len(values)
+        mean = values.mean()
+        m2 = ((values - mean) ** 2).sum()
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.minimum = min(self.minimum, values.min())
+        self.maximum = max(self.maximum, values.max())
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+    def as_dict(self):
+        if not self.count:
+            return {stat: np.nan for stat in STATS_FIELDS}
+        return {'mean': self.mean, 'std': self.std, 'min': self.minimum, 'max': self.maximum}
+
+
+class WindowedVelocityStats:
+    """Velocity statistics of both encoders per WINDOW_S of message time, plus the whole run."""
+
+    def __init__(self, window_s=WINDOW_S, on_window=None):
+        self.window_samples = int(window_s * SAMPLE_RATE_HZ)
+        self.on_window = on_window      # function(window_start_s, messages, stats dict) per finished window
+        self.window = None              # index of the window being filled
+        self.window_messages = 0
+        self.current = {'coarse': RunningStats(), 'fine': RunningStats()}
+        self.run = {'coarse': RunningStats(), 'fine': RunningStats()}
+        self._last = None               # (message, coarse, fine) of the previous sample
+
+    def update(self, message, c_degrees, f_degrees):
+        if len(message) == 0:
+            return
+        if self._last is not None:
+            message = np.concatenate(([self._last[0]], message))
+            c_degrees = np.concatenate(([self._last[1]], c_degrees))
+            f_degrees = np.concatenate(([self._last[2]], f_degrees))
+        self._last = (message[-1], c_degrees[-1], f_degrees[-1])
+        if len(message) < 2:
+            return
+
+        dt = np.diff(message) / SAMPLE_RATE_HZ
+        velocity = {}
+        for encoder, degrees in (('coarse', c_degrees), ('fine', f_degrees)):
+            step = np.diff(degrees)
+            velocity[encoder] = (((step + 180) % 360) - 180) / dt # shortest way round a wrap
+        message = message[1:]
+
+        # Split the batch where it crosses into the next window(s)
+        windows = (message - 1) // self.window_samples
+        bounds = np.flatnonzero(np.diff(windows)) + 1
+        for piece in np.split(np.arange(len(message)), bounds):
+            window = int(windows[piece[0]])
+            if self.window is not None and window != self.window:
+                self._emit()
+            self.window = window
+            self.window_messages += len(piece)
+            for encoder, values in velocity.items():
+                self.current[encoder].update(values[piece])
+                self.run[encoder].update(values[piece])
+
+    def _emit(self):
+        if self.on_window is not None and self.window_messages:
+            stats = {encoder: running.as_dict() for encoder, running in self.current.items()}
+            self.on_window(self.window * self.window_samples / SAMPLE_RATE_HZ, self.window_messages, stats)
+        self.current = {'coarse': RunningStats(), 'fine': RunningStats()}
+        self.window_messages = 0
+
+    def finish(self):
+        """Emits the partial last window."""
+        self._emit()
+
+
+class SoakLog:
+    """
+    Rotating log for AcquisitionPipeline, passed as both its `writer` and its `columnar`.
+
+    writerows() starts a new segment (CSV and .rec) when the current one is due, before
+    writing, so both files of a segment always hold the same rows. write() fills the
+    .rec and feeds the windowed velocity statistics.
+    """
+
+    def __init__(self, log_folder, base_name, timestamp, segment_bytes=SEGMENT_BYTES, segment_s=SEGMENT_S,
+                 window_s=WINDOW_S, on_segment=None):
+        self.log_folder = log_folder
+        self.base_name = base_name
+        self.segment_bytes = segment_bytes
+        self.segment_s = segment_s
+        self.window_s = window_s
+        self.on_segment = on_segment    # function(path) called with each closed segment
+        self.segments = []
+        self.first_path = os.path.join(log_folder, f"{base_name}_{timestamp}.csv")
+        self.summary_path = soak_summary_path_for(self.first_path)
+
+        self._summary_file = open(self.summary_path, mode='w', newline='', encoding='utf-8')
+        self._summary = csv.writer(self._summary_file)
+        self._summary.writerow(SUMMARY_HEADER)
+        self._summary_file.flush()
+        self.stats = WindowedVelocityStats(window_s, on_window=self._write_window)
+
+        self._file = None
+        self._open_segment(self.first_path, timestamp)
+
+    @property
+    def path(self):
+        """Current segment's CSV."""
+        return self.segments[-1]
+
+    def _open_segment(self, path, timestamp):
+        self._file = open(path, mode='w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(CSV_HEADER)
+        self._columnar = ColumnarLogWriter(columnar_path_for(path), self.base_name, timestamp,
+                                           soak_segment=len(self.segments), soak_summary=os.path.basename(self.summary_path))
+        self._opened = time.time()
+        self.segments.append(path)
+
+    def _close_segment(self):
+        self._file.close()
+        self._columnar.close()
+        if self.on_segment is not None:
+            self.on_segment(self.path)
+
+    def _rotation_due(self):
+        age = time.time() - self._opened
+        if age < MIN_SEGMENT_S:
+            return False
+        return age >= self.segment_s or self._file.tell() >= self.segment_bytes
+
+    def writerows(self, rows):
+        if self._rotation_due():
+            self._close_segment()
+            timestamp = time.strftime("%Y%m%d_%H%M%S")
+            self._open_segment(os.path.join(self.log_folder, f"{self.base_name}_{timestamp}.csv"), timestamp)
+            print(f"Soak: new segment {self.path}")
+        self._writer.writerows(rows)
+
+    def write(self, decoded, first_message_number):
+        self._columnar.write(decoded, first_message_number)
+        valid = decoded['valid']
+        count = int(valid.sum())
+        self.stats.update(np.arange(first_message_number, first_message_number + count),
+                          decoded['c_degrees'][valid], decoded['f_degrees'][valid])
+
+    def _write_window(self, start_s, messages, stats):
+        row = [f"{start_s:g}", f"{self.window_s:g}", f"{time.time():.3f}", messages, len(self.segments) - 1]
+        row += [f"{stats[encoder][stat]:.6g}" for encoder in ('coarse', 'fine') for stat in STATS_FIELDS]
+        self._summary.writerow(row)
+        self._summary_file.flush() # trend plots can follow a soak while it runs
+
+    def flush(self):
+        self._file.flush()
+        self._columnar.flush()
+
+    def close(self):
+        self.stats.finish()
+        self._summary_file.close()
+        self._close_segment()
+
+
+def run_soak(base_name, duration_s, port=None, baudrate=None, ser=None, stop_event=None, segment_bytes=SEGMENT_BYTES,
+             segment_s=SEGMENT_S, window_s=WINDOW_S, log_folder="encoder_logs"):
+    """
+    Collects a soak run into rotating segments with a rolling-statistics summary.
+
+    Args:
+        base_name: run name, 'Serial-Number_direction_Voltage'.
+        duration_s: seconds to collect for.
+        port, baudrate: serial port settings (EncoderDataCollector's defaults when None).
+        ser: already opened serial port to read instead of opening `port` (closed when done).
+        stop_event: optional threading.Event, setting it ends the soak early.
+        segment_bytes, segment_s: a new segment starts when the CSV reaches this size or age.
+        window_s: seconds of samples per summary row.
+        log_folder: where the segments and the summary go.
+
+    Returns:
+        Tuple (segment paths, summary path).
+    """
+    import serial
+    from acquisition_pipeline import AcquisitionPipeline
+    from EncoderDataCollector import SERIAL_PORT, BAUDRATE
+    from run_catalog import record_run
+
+    port = port or SERIAL_PORT
+    baudrate = baudrate or BAUDRATE
+    os.makedirs(log_folder, exist_ok=True)
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+
+    def catalog(path):
+        try:
+            record_run(path)
+        except Exception as e:
+            print(f"Could not add {path} to the catalog: {e}")
+
+    if ser is None:
+        ser = serial.Serial(port=port, baudrate=baudrate, timeout=1)
+    log = SoakLog(log_folder, base_name, timestamp, segment_bytes, segment_s, window_s, on_segment=catalog)
+    pipeline = AcquisitionPipeline(ser, log, columnar=log, telemetry_samples=TELEMETRY_SAMPLES)
+    print(f"Soak: logging for {duration_s} s to {log.first_path} (summary {log.summary_path})")
+    try:
+        pipeline.run(duration_s, stop_event=stop_event)
+    finally:
+        pipeline.print_summary()
+        log.close()
+        pipeline.telemetry.write(telemetry_path_for(log.first_path), pipeline, log=os.path.basename(log.first_path),
+                                 base_name=base_name, timestamp=timestamp, port=port, baudrate=baudrate,
+                                 soak_segments=[os.path.basename(path) for path in log.segments])
+        ser.close()
+    run = {encoder: stats.as_dict() for encoder, stats in log.stats.run.items()}
+    print(f"Soak: {len(log.segments)} segment(s), velocity mean ± std: "
+          f"motor {run['coarse']['mean']:.3f} ± {run['coarse']['std']:.3f} °/s, "
+          f"glass {run['fine']['mean']:.3f} ± {run['fine']['std']:.3f} °/s")
+    return log.segments, log.summary_path
+
+
+def load_soak_summary(path):
+    """
+    Reads a soak summary.
+
+    Returns:
+        Dict of column name -> numpy array (SUMMARY_HEADER).
+    """
+    table = np.genfromtxt(path, delimiter=',', names=True, ndmin=1)
+    return {name: np.atleast_1d(table[name]) for name in table.dtype.names}
+
+
+def plot_soak_trends(summary, title=""):
+    """Figure of the per-window velocity mean ± std and min / max of both encoders over the soak."""
+    from matplotlib import pyplot as plt
+
+    hours = summary['window_start_s'] / 3600
+    fig, axes = plt.subplots(3, 1, figsize=(14, 10), sharex=True)
+    for ax, encoder, label in ((axes[0], 'coarse', 'Motor Encoder'), (axes[1], 'fine', 'Glass Encoder')):
+        mean, std = summary[f"{encoder}_velocity_mean"], summary[f"{encoder}_velocity_std"]
+        ax.fill_between(hours, summary[f"{encoder}_velocity_min"], summary[f"{encoder}_velocity_max"],
+                        color='tab:gray', alpha=0.3, label='min / max')
+        ax.fill_between(hours, mean - std, mean + std, color='tab:blue', alpha=0.4, label='mean ± std')
+        ax.plot(hours, mean, color='tab:blue', label='mean')
+        ax.set_ylabel('dθ/dt (°/s)')
+        ax.set_title(f"{label} velocity per {summary['window_s'][0]:g} s window")
+        ax.legend(loc='upper right')
+        ax.grid(True)
+    axes[2].plot(hours, summary['messages'] / summary['window_s'], color='tab:orange')
+    axes[2].set_ylabel('messages/s')
+    axes[2].set_xlabel('Soak time (h)')
+    axes[2].grid(True)
+    fig.suptitle(title)
+    fig.tight_layout()
+    return fig
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Soak (burn-in) collection with rotating logs and rolling statistics.")
+    parser.add_argument("name", nargs="?", help="run name, 'Serial-Number_direction_Voltage'")
+    parser.add_argument("--hours", type=float, default=12.0, help="soak length (default: 12)")
+    parser.add_argument("--port", default=None, help="serial port (default: EncoderDataCollector.SERIAL_PORT)")
+    parser.add_argument("--segment-mb", type=float, default=SEGMENT_BYTES / 1024**2, help="segment CSV size limit")
+    parser.add_argument("--segment-minutes", type=float, default=SEGMENT_S / 60, help="segment age limit")
+    parser.add_argument("--window", type=float, default=WINDOW_S, help="seconds per summary row")
+    parser.add_argument("--log-dir", default="encoder_logs", help="folder for the logs (default: encoder_logs)")
+    parser.add_argument("--trend", default=None, help="plot the trends of this .soak summary instead of collecting")
+    args = parser.parse_args()
+
+    if args.trend is None:
+        if not args.name:
+            parser.error("a run name is needed to collect")
+        segments, summary_path = run_soak(args.name, args.hours * 3600, port=args.port,
+                                          segment_bytes=int(args.segment_mb * 1024**2), segment_s=args.segment_minutes * 60,
+                                          window_s=args.window, log_folder=args.log_dir)
+        args.trend = summary_path
+
+    import matplotlib
+    matplotlib.use("Agg")
+    from plot_csv import make_plot_dir_if_doesnt_exist, plot_output_directory
+
+    summary = load_soak_summary(args.trend)
+    if not len(summary['window_start_s']):
+        print(f"{args.trend} has no windows yet.")
+        sys.exit(1)
+    base_name, timestamp = split_log_name(args.trend)
+    make_plot_dir_if_doesnt_exist()
+    fig = plot_soak_trends(summary, f"{base_name} soak {timestamp}")
+    output = os.path.join(plot_output_directory, f"{base_name}_{timestamp}_soak_trends.png")
+    fig.savefig(output, bbox_inches='tight')
+    print(f"Saved {output}")
@@ -0,0 +1,155 @@
+import json
+import os
+import time
+import tracemalloc
+
+# Stage timing and peak-memory spans for the plot_encoders pipeline.
+#
+#   ENCODER_PROFILE=1 python ...      (or plot_encoders(..., profile=True), batch_replot.py --profile)
+#
+# Off by default: a disabled profiler hands out one shared no-op span, so the
+# instrumented code costs an attribute lookup per stage. Enabled, every span records
+# wall time, CPU time and the peak of Python-heap memory (tracemalloc, numpy buffers
+# included) reached inside it. Spans nest; a stage's peak covers its sub-stages. The
+# report of a run is a list of spans in the order they started, written as JSON next to
+# the saved figures ('<run>_profile.json') and printed as a table.
+# python benchmark_plot.py times the stages over synthetic logs of growing size.
+
+PROFILE_ENV = "ENCODER_PROFILE"
+
+
+def profiling_requested():
+    """True when the ENCODER_PROFILE environment variable turns profiling on."""
+    return os.environ.get(PROFILE_ENV, "").strip().lower() not in ("", "0", "false", "no")
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._enter(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._exit()
+        return False
+
+
+class StageProfiler:
+    """
+    Collects the spans of one run.
+
+    Usage:
+        profiler = StageProfiler(enabled)
+        with profiler.stage('load'):
+            ...
+        profiler.report()
+    """
+
+    def __init__(self, enabled=None):
+        self.enabled = profiling_requested() if enabled is None else enabled
+        self.spans = []
+        self._stack = []            # open spans, with the highest traced memory seen inside each
+        self._started_tracing = False
+        self._start = None
+
+    def stage(self, name):
+        """Context manager timing one stage (no-op when disabled)."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def _enter(self, name):
+        if self._start is None:
+            self._start = time.perf_counter()
+        # Tracing stops when a top-level span ends (close()), the next one starts it again
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        current, peak = tracemalloc.get_traced_memory()
+        # Every span restarts tracemalloc's peak, so the open spans keep the highest peak they saw
+        if self._stack:
+            self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+        tracemalloc.reset_peak()
+        record = {'stage': name, 'depth': len(self._stack), 'start_s': time.perf_counter() - self._start,
+                  'seconds': None, 'cpu_seconds': None, 'peak_bytes': None, 'start_bytes': current, 'end_bytes': None}
+        self.spans.append(record)
+        self._stack.append({'record': record, 'wall': time.perf_counter(), 'cpu': time.process_time(), 'peak': current})
+
+    def _exit(self):
+        span = self._stack.pop()
+        record = span['record']
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(span['peak'], peak)
+        record['seconds'] = time.perf_counter() - span['wall']
+        record['cpu_seconds'] = time.process_time() - span['cpu']
+        record['peak_bytes'] = peak - record['start_bytes'] # above what was allocated when the stage started
+        record['end_bytes'] = current
+        tracemalloc.reset_peak()
+        if self._stack:
+            self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+        else:
+            self.close()
+
+    def close(self):
+        """Stops tracemalloc if this profiler started it."""
+        if self._started_tracing and not self._stack:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def totals(self):
+        """
+        Spans merged by stage (chunked analyses repeat their stages once per chunk).
+
+        Returns:
+            Dict of stage name -> {'depth', 'calls', 'seconds', 'cpu_seconds', 'peak_bytes' (the largest)},
+            in the order the stages first started.
+        """
+        totals = {}
+        for span in self.spans:
+            if span['seconds'] is None:
+                continue
+            total = totals.setdefault(span['stage'], {'depth': span['depth'], 'calls': 0, 'seconds': 0.0,
+                                                      'cpu_seconds': 0.0, 'peak_bytes': 0})
+            total['calls'] += 1
+            total['seconds'] += span['seconds']
+            total['cpu_seconds'] += span['cpu_seconds']
+            total['peak_bytes'] = max(total['peak_bytes'], span['peak_bytes'])
+        return totals
+
+    def report(self, **info):
+        """Dict with `info` (e.g. the log name), the per-stage totals and every span."""
+        report = dict(info)
+        report['total_seconds'] = sum(span['seconds'] for span in self.spans if span['depth'] == 0 and span['seconds'] is not None)
+        report['totals'] = self.totals()
+        report['stages'] = [dict(span) for span in self.spans]
+        return report
+
+    def write(self, path, **info):
+        """Writes the report as JSON."""
+        report = self.report(**info)
+        with open(path, mode='w', encoding='utf-8') as file:
+            json.dump(report, file, indent=1)
+        return report
+
+    def table(self):
+        """Report lines for the console, one per stage."""
+        lines = [f"{'stage':<28} {'calls':>5} {'seconds':>9} {'cpu s':>9} {'peak MB':>9}"]
+        for stage, total in self.totals().items():
+            name = "  " * total['depth'] + stage
+            lines.append(f"{name:<28} {total['calls']:5d} {total['seconds']:9.3f} {total['cpu_seconds']:9.3f} "
+                         f"{total['peak_bytes'] / 1e6:9.1f}")
+        return lines
@@ -0,0 +1,10 @@
+from benchmark_acquisition import REQUIRED_BAUDRATE, bench_decode, bench_end_to_end, check_regressions
+
+
+def test_firmware_rate_is_drop_free():
+    runs = [bench_end_to_end(REQUIRED_BAUDRATE, 0.5), bench_end_to_end(REQUIRED_BAUDRATE, 0.5, noise=True)]
+    for run in runs:
+        assert run['written_frames'] == run['expected_frames'] > 0
+        assert run['dropped_frames'] == run['overrun_bytes'] == run['reader_dropped_bytes'] == 0
+    report = {'decode': bench_decode(20_000), 'end_to_end': runs}
+    assert check_regressions(report) == []
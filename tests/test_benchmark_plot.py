@@ -0,0 +1,18 @@
+import matplotlib
+matplotlib.use("Agg")
+import plot_csv
+from benchmark_plot import MAX_SCALING_EXPONENT, bench_size, check_regressions, make_log, scaling_exponents
+
+ROW_COUNTS = (10_000, 100_000)
+
+
+def test_stages_scale_at_most_linearly(tmp_path, monkeypatch):
+    monkeypatch.setattr(plot_csv, "plot_output_directory", str(tmp_path / "plot outputs"))
+    tmp_path.joinpath("plot outputs").mkdir()
+    runs = [bench_size(make_log(str(tmp_path), rows), rows, repeat=1) for rows in ROW_COUNTS]
+    report = {'csv': False, 'runs': runs, 'scaling': scaling_exponents(runs)}
+
+    assert {'analysis', 'figure_velocity'} <= set(report['scaling'])
+    assert all(run['stages']['plot_encoders']['peak_bytes'] > 0 for run in runs)
+    assert report['scaling']['plot_encoders']['exponent'] <= MAX_SCALING_EXPONENT
+    assert check_regressions(report) == []
@@ -0,0 +1,61 @@
+import csv
+import os
+import numpy as np
+from chunked_analysis import iter_log_columns, log_row_count
+from columnar_log import STALE_AFTER_S, ColumnarLogWriter, columnar_path_for, csv_to_records, current_columnar_path
+from frame_decoder import CSV_HEADER, decode_frames, decoded_to_rows
+from plot_csv import load_encoder_log
+from serial_simulator import encode_frames, motion_profile
+
+
+def _write_log(path, rows):
+    """CSV and .rec of the same `rows` samples, like the collector writes them."""
+    decoded = decode_frames(encode_frames(motion_profile(rows)))
+    with open(path, mode='w', newline='', encoding='utf-8') as file:
+        csv.writer(file).writerows([CSV_HEADER] + decoded_to_rows(decoded, 1))
+    with ColumnarLogWriter(columnar_path_for(path), "TEST", "20250101_000000") as columnar:
+        columnar.write(decoded, 1)
+
+
+def _age(path, seconds):
+    mtime = os.path.getmtime(path) - seconds
+    os.utime(path, (mtime, mtime))
+
+
+def test_current_rec_is_used(tmp_path):
+    path = str(tmp_path / "TEST_20250101_000000.csv")
+    _write_log(path, 100)
+    assert current_columnar_path(path) == columnar_path_for(path)
+    assert isinstance(load_encoder_log(path), np.ndarray)
+    assert log_row_count(path) == 100
+
+
+def test_stale_rec_falls_back_to_csv(tmp_path):
+    path = str(tmp_path / "TEST_20250101_000000.csv")
+    _write_log(path, 100)
+    _write_log(str(tmp_path / "NEW_20250101_000000.csv"), 40)
+    os.replace(str(tmp_path / "NEW_20250101_000000.csv"), path) # CSV re-recorded, .rec left behind
+    _age(columnar_path_for(path), STALE_AFTER_S + 10)
+
+    assert current_columnar_path(path) is None
+    assert len(load_encoder_log(path)['message']) == 40
+    assert log_row_count(path) == 40
+    assert sum(len(chunk['message']) for chunk in iter_log_columns(path, chunk_rows=16, fields=('message',))) == 40
+
+
+def test_csv_and_rec_give_identical_values(tmp_path):
+    path = str(tmp_path / "TEST_20250101_000000.csv")
+    _write_log(path, 20_000)
+    from_rec = load_encoder_log(path)
+    converted = csv_to_records(path)
+    chunks = list(iter_log_columns(path, chunk_rows=7_000))
+    os.remove(columnar_path_for(path))
+    from_csv = load_encoder_log(path)
+    from_csv_chunks = list(iter_log_columns(path, chunk_rows=7_000))
+
+    for name, values in from_csv.items():
+        assert np.array_equal(values, from_rec[name])
+    assert np.array_equal(converted, np.asarray(from_rec))
+    for chunk, csv_chunk in zip(chunks, from_csv_chunks):
+        for name, values in chunk.items():
+            assert np.array_equal(values, csv_chunk[name])
@@ -0,0 +1,91 @@
+import csv
+import io
+import numpy as np
+from EncoderDataCollector import coarse_hex_to_angle, command_conversion, fine_hex_to_angle
+from frame_decoder import (C_ENCODER_COM, C_ENCODER_CTS, F_ENCODER_COM, F_ENCODER_CTS, FINE_INDEX,
+                           HEADER_BYTE, MESSAGE_LENGTH, decode_frames, decoded_to_rows)
+from serial_framer import SerialFramer
+from serial_simulator import encode_frames, inject_noise, motion_profile
+
+
+def _frames(n):
+    return np.frombuffer(encode_frames(motion_profile(n)), dtype=np.uint8).reshape(n, -1)
+
+
+def test_8bit_garbage_frame_is_invalid():
+    decoded = decode_frames(b'Z' + b'\xc3' + b'0' * 29)
+    assert not decoded['valid'][0]
+
+
+def test_garbage_frame_does_not_spoil_the_batch():
+    frames = _frames(10).copy()
+    expected = decode_frames(frames.tobytes())
+    frames[4, 1:5] = 0xFF
+    decoded = decode_frames(frames.tobytes())
+    assert decoded['valid'].tolist() == [True] * 4 + [False] + [True] * 5
+    keep = np.arange(10) != 4
+    for name, values in expected.items():
+        assert np.array_equal(decoded[name][keep], values[keep])
+    assert len(decoded_to_rows(decoded, 1)) == 9
+
+
+def test_noisy_stream_decodes():
+    stream = inject_noise(encode_frames(motion_profile(5000)), 0.01, 0.01, 0.01)
+    framer = SerialFramer()
+    framer.feed(bytes(stream))
+    decoded = decode_frames(framer.read_frames())
+    assert 0 < decoded['valid'].sum() < len(decoded['valid'])
+
+
+def _random_frames(n, seed=0):
+    """Frames of random hex (either case, half of them negative in two's complement), some with garbage."""
+    rng = np.random.default_rng(seed)
+    digits = np.frombuffer(b"0123456789abcdefABCDEF", dtype=np.uint8)
+    frames = digits[rng.integers(0, len(digits), size=(n, MESSAGE_LENGTH))]
+    frames[:, 0] = HEADER_BYTE
+    # Sent byte-reversed: the last byte of a field is its most significant digit
+    for start, stop in (C_ENCODER_COM, C_ENCODER_CTS, F_ENCODER_CTS, F_ENCODER_COM, FINE_INDEX):
+        frames[:, stop - 1] = np.frombuffer(b"0123456789ABCDEF", dtype=np.uint8)[rng.integers(0, 16, n)]
+    # Not whitespace or '_': int() accepts those in a hex string, decode_frames rejects the frame
+    garbage = rng.random(n) < 0.05
+    frames[garbage, rng.integers(1, MESSAGE_LENGTH, garbage.sum())] = rng.choice(
+        np.frombuffer(b"\x80\xc3\xffgZ", dtype=np.uint8), garbage.sum())
+    return frames
+
+
+def _scalar_row(frame):
+    """One frame through the original per-message path, None where it couldn't be converted."""
+    payload = bytes(frame[1:])
+    field = lambda start, stop: payload[start - 1:stop - 1][::-1].decode(errors='replace')
+    try:
+        return [
+            field(*C_ENCODER_CTS),
+            coarse_hex_to_angle(field(*C_ENCODER_CTS)),
+            field(*F_ENCODER_CTS),
+            -fine_hex_to_angle(field(*F_ENCODER_CTS)),
+            -fine_hex_to_angle(field(*FINE_INDEX)),
+            command_conversion(field(*C_ENCODER_COM)),
+            command_conversion(field(*F_ENCODER_COM)),
+        ]
+    except ValueError:
+        return None
+
+
+def _csv_text(rows):
+    text = io.StringIO()
+    csv.writer(text).writerows(rows)
+    return text.getvalue()
+
+
+def test_matches_scalar_path():
+    frames = _random_frames(5000)
+    scalar = [_scalar_row(frame) for frame in frames]
+    decoded = decode_frames(frames.tobytes())
+
+    assert decoded['valid'].tolist() == [row is not None for row in scalar]
+    assert 0 < decoded['valid'].sum() < len(frames)
+    expected = [[i + 1] + row for i, row in enumerate(row for row in scalar if row is not None)]
+    rows = decoded_to_rows(decoded, 1)
+    assert rows == expected
+    assert _csv_text(rows) == _csv_text(expected)
+    assert (decoded['c_cmd_val'][decoded['valid']] < 0).any() and (decoded['c_degrees'][decoded['valid']] < 0).any()
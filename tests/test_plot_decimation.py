@@ -0,0 +1,83 @@
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+from plot_decimation import decimated_plot
+
+WIDTH_PX, HEIGHT_PX = 800, 400
+
+
+def _wrapped_series(n=60_000, rate_hz=1000, speed_deg_s=95.0):
+    """Velocity-like trace vs wrapped angle: every revolution a different curve."""
+    rng = np.random.default_rng(0)
+    t = np.arange(n) / rate_hz
+    unwrapped = speed_deg_s * t
+    angle = (unwrapped + 180) % 360 - 180
+    revolution = unwrapped // 360
+    y = speed_deg_s + 3 * np.sin(np.radians(2 * unwrapped) + revolution) + revolution + rng.normal(0, 0.2, n)
+    return angle, y, t
+
+
+def _ink(draw, x, y, xlim):
+    """Pixels the line covers, drawn without antialiasing or matplotlib's own path simplification."""
+    with plt.rc_context({'path.simplify': False, 'lines.antialiased': False}):
+        fig = plt.figure(figsize=(WIDTH_PX / 100, HEIGHT_PX / 100), dpi=100)
+        return _draw_ink(fig, draw, x, y, xlim)
+
+
+def _draw_ink(fig, draw, x, y, xlim):
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_axis_off()
+    draw(ax, x, y)
+    ax.set_xlim(*xlim)
+    ax.set_ylim(y.min() - 1, y.max() + 1)
+    fig.canvas.draw()
+    ink = np.asarray(fig.canvas.buffer_rgba())[..., 0] < 128   # dark line on white
+    plt.close(fig)
+    return ink
+
+
+def _assert_same_rendering(full, decimated):
+    """Same columns inked, top and bottom of every column within a pixel (a few line widths at worst)."""
+    columns = np.flatnonzero(full.any(axis=0))
+    assert np.array_equal(columns, np.flatnonzero(decimated.any(axis=0)))
+    rows = np.arange(full.shape[0])[:, np.newaxis]
+    for ink_a, ink_b in ((full, decimated), (full[::-1], decimated[::-1])):
+        top_a = np.where(ink_a, rows, full.shape[0]).min(axis=0)[columns]
+        top_b = np.where(ink_b, rows, full.shape[0]).min(axis=0)[columns]
+        off = np.abs(top_a - top_b)
+        assert (off <= 1).mean() >= 0.98 and off.max() <= 6
+    assert (full != decimated).sum() <= 0.02 * full.sum()
+
+
+@pytest.mark.parametrize("step", [False, True])
+@pytest.mark.parametrize("xlim", [(-180, 180), (-20, 35)])
+def test_wrapped_angle_rendering_matches_full_plot(step, xlim):
+    angle, y, _ = _wrapped_series()
+    if step:
+        full = _ink(lambda ax, x, y: ax.step(x, y, where='mid', color='k', lw=1), angle, y, xlim)
+    else:
+        full = _ink(lambda ax, x, y: ax.plot(x, y, color='k', lw=1), angle, y, xlim)
+    decimated = _ink(lambda ax, x, y: decimated_plot(ax, x, y, step=step, color='k', lw=1), angle, y, xlim)
+    _assert_same_rendering(full, decimated)
+
+
+def test_time_rendering_matches_full_plot():
+    angle, _, t = _wrapped_series()
+    full = _ink(lambda ax, x, y: ax.plot(x, y, color='k', lw=1), t, angle, (t[0], t[-1]))
+    decimated = _ink(lambda ax, x, y: decimated_plot(ax, x, y, color='k', lw=1), t, angle, (t[0], t[-1]))
+    _assert_same_rendering(full, decimated)
+
+
+def test_wrapped_angle_line_has_no_extra_points():
+    angle, y, _ = _wrapped_series()
+    fig, ax = plt.subplots()
+    line = decimated_plot(ax, angle, y)
+    x_drawn, y_drawn = line.get_data()
+    plt.close(fig)
+    # Every drawn point is a sample, in sample order, ending on the last one
+    position = {point: i for i, point in enumerate(zip(angle, y))}
+    index = np.array([position[point] for point in zip(x_drawn, y_drawn)])
+    assert len(index) < len(angle)
+    assert np.all(np.diff(index) > 0) and index[0] == 0 and index[-1] == len(angle) - 1
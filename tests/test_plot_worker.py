@@ -0,0 +1,22 @@
+import matplotlib
+matplotlib.use("Agg")
+import plot_csv
+from benchmark_plot import make_log
+from gui_jobs import Job
+from plot_csv import plot_encoders
+from plot_worker import STAGE_PROGRESS
+
+
+def test_every_plot_stage_has_a_progress_fraction(tmp_path, monkeypatch):
+    monkeypatch.setattr(plot_csv, "plot_output_directory", str(tmp_path / "plot outputs"))
+    tmp_path.joinpath("plot outputs").mkdir()
+    job = Job(1, 'plot', "Plot")
+    fractions = []
+
+    def progress(stage):
+        job.report(progress=STAGE_PROGRESS.get(stage), detail=stage)
+        fractions.append(job.progress)
+
+    plot_encoders(make_log(str(tmp_path), 5_000), "TEST", "20250101_000000", interactive=False, progress=progress)
+    assert None not in fractions and len(fractions) >= 3
+    assert fractions == sorted(fractions) and fractions[-1] < 1.0
@@ -0,0 +1,90 @@
+import csv
+import numpy as np
+import pytest
+import raw_capture
+from acquisition_telemetry import load_telemetry
+from EncoderDataCollector import EncoderDataCollector
+from frame_decoder import CSV_HEADER, decode_frames, decoded_to_rows
+from raw_capture import BLOCK_HEADER, _write_raw_header, decode_raw_capture
+from serial_framer import SerialFramer
+from serial_simulator import SimulatedSerial, encode_frames, inject_noise, motion_profile
+
+CHUNK_BYTES = 128 * 1024
+
+
+@pytest.fixture(scope="module")
+def noisy_stream():
+    return bytes(inject_noise(encode_frames(motion_profile(30_000)), 0.01, 0.01, 0.01))
+
+
+def _write_capture(path, stream, read_bytes=4096):
+    with open(path, mode='wb') as file:
+        _write_raw_header(file, {'base_name': "TEST", 'timestamp': "20250101_000000"})
+        for i, start in enumerate(range(0, len(stream), read_bytes)):
+            data = stream[start:start + read_bytes]
+            file.write(BLOCK_HEADER.pack(i * 0.001, len(data)))
+            file.write(data)
+
+
+def _read_rows(csv_path):
+    with open(csv_path, newline='', encoding='utf-8') as file:
+        return list(csv.reader(file))
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_noisy_capture_matches_sequential_decoding(tmp_path, noisy_stream, workers):
+    raw_path = str(tmp_path / "TEST_20250101_000000.raw")
+    _write_capture(raw_path, noisy_stream)
+    csv_path, totals = decode_raw_capture(raw_path, workers=workers, chunk_bytes=CHUNK_BYTES)
+
+    framer = SerialFramer()
+    framer.feed(noisy_stream)
+    decoded = decode_frames(framer.read_frames())
+    expected = [CSV_HEADER] + [[str(value) for value in row] for row in decoded_to_rows(decoded, 1)]
+    assert _read_rows(csv_path) == expected
+    assert totals['corrupt_chunks'] == 0
+    assert totals['invalid_frames'] == len(decoded['valid']) - int(decoded['valid'].sum()) > 0
+
+
+def test_corrupt_chunk_is_skipped(tmp_path, noisy_stream, monkeypatch):
+    raw_path = str(tmp_path / "TEST_20250101_000000.raw")
+    _write_capture(raw_path, noisy_stream)
+    calls = []
+
+    def failing_second_chunk(frames):
+        calls.append(len(calls))
+        if len(calls) == 2:
+            raise ValueError("corrupt")
+        return decode_frames(frames)
+
+    monkeypatch.setattr(raw_capture, "decode_frames", failing_second_chunk)
+    csv_path, totals = decode_raw_capture(raw_path, workers=1, chunk_bytes=CHUNK_BYTES)
+    assert len(calls) > 2
+    assert totals['corrupt_chunks'] == 1
+    assert 0 < totals['messages'] == len(_read_rows(csv_path)) - 1
+
+
+def test_decode_writes_telemetry(tmp_path, noisy_stream):
+    clean_path = str(tmp_path / "CLEAN_20250101_000000.raw")
+    _write_capture(clean_path, bytes(encode_frames(motion_profile(30_000))))
+    csv_path, _ = decode_raw_capture(clean_path, workers=1, chunk_bytes=CHUNK_BYTES)
+    telemetry = load_telemetry(csv_path)
+    assert telemetry['healthy'] and telemetry['totals']['messages'] == 30_000
+
+    noisy_path = str(tmp_path / "NOISY_20250101_000000.raw")
+    _write_capture(noisy_path, noisy_stream)
+    csv_path, totals = decode_raw_capture(noisy_path, workers=1, chunk_bytes=CHUNK_BYTES)
+    telemetry = load_telemetry(csv_path)
+    assert not telemetry['healthy']
+    assert telemetry['totals']['estimated_lost_frames'] >= totals['invalid_frames'] > 0
+
+
+def test_raw_collection_reports_health(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    stream = encode_frames(motion_profile(5_000)).tobytes()
+    ser = SimulatedSerial(stream, baudrate=460800, timeout=0.1)
+    filepath, _, _ = EncoderDataCollector("TEST_CW_3.8V", sampling_duration=len(stream) * 10 / 460800 + 0.3,
+                                          plot=False, ser=ser, raw=True)
+    telemetry = load_telemetry(filepath)
+    assert telemetry is not None and telemetry['healthy']
+    assert telemetry['totals']['messages'] == 5_000
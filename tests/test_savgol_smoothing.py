@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from scipy.signal import savgol_filter
+from savgol_smoothing import POLYORDER, WINDOW_LENGTH, StreamingSavgol, effective_window, savgol_smooth
+
+TOLERANCE = 1e-9    # relative to the signal's largest value
+
+
+def _signals(rows, n):
+    return np.cumsum(np.random.default_rng(0).normal(size=(rows, n)), axis=1)
+
+
+def _assert_close(got, expected):
+    assert got.shape == expected.shape
+    assert np.abs(got - expected).max() <= TOLERANCE * np.abs(expected).max()
+
+
+def _streamed(signals, piece):
+    stream = StreamingSavgol(rows=signals.shape[0])
+    pieces = [stream.push(signals[:, i:i + piece]) for i in range(0, signals.shape[1], piece)]
+    return np.concatenate(pieces + [stream.finish()], axis=1)
+
+
+@pytest.mark.parametrize("n", [3 * WINDOW_LENGTH + 123, 1234])
+def test_matches_scipy(n):
+    # Full window, and a short run that gets the largest window that fits
+    signals = _signals(3, n)
+    window = effective_window(n)
+    assert window == min(WINDOW_LENGTH, n - 1)
+    expected = np.vstack([savgol_filter(row, window, POLYORDER) for row in signals])
+    _assert_close(savgol_smooth(signals), expected)
+    _assert_close(savgol_smooth(signals[0]), expected[0])
+    _assert_close(_streamed(signals, 7_000), expected)
+
+
+def test_streaming_matches_batch_exactly():
+    signals = _signals(2, 5 * WINDOW_LENGTH)
+    assert np.array_equal(_streamed(signals, 4_321), savgol_smooth(signals))
+
+
+@pytest.mark.parametrize("n", [0, 1, 4])
+def test_too_short_passes_through(n):
+    signals = _signals(2, n)
+    assert np.array_equal(savgol_smooth(signals), signals)
+    assert np.array_equal(_streamed(signals, 3), signals)
@@ -0,0 +1,32 @@
+import tracemalloc
+import numpy as np
+from stage_profiler import StageProfiler
+
+
+def test_sequential_top_level_stages_report_memory():
+    profiler = StageProfiler(enabled=True)
+    for name in ('load', 'analysis'):
+        with profiler.stage(name):
+            np.ones(1_000_000).sum()
+    totals = profiler.totals()
+    assert totals['load']['peak_bytes'] >= 8_000_000
+    assert totals['analysis']['peak_bytes'] >= 8_000_000
+    assert not tracemalloc.is_tracing()
+
+
+def test_nested_stage_peak_covers_sub_stages():
+    profiler = StageProfiler(enabled=True)
+    with profiler.stage('outer'):
+        with profiler.stage('inner'):
+            np.ones(1_000_000).sum()
+        np.ones(10).sum()
+    totals = profiler.totals()
+    assert totals['inner']['depth'] == 1
+    assert totals['outer']['peak_bytes'] >= totals['inner']['peak_bytes'] >= 8_000_000
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = StageProfiler(enabled=False)
+    with profiler.stage('load'):
+        pass
+    assert profiler.spans == [] and profiler.report()['total_seconds'] == 0
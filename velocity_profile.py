@@ -0,0 +1,258 @@
+import argparse
+import os
+import sys
+import warnings
+import numpy as np
+
+# Angle-binned velocity/acceleration profiles of runs, and fleet baselines built from them.
+#
+#   python velocity_profile.py [--log-dir encoder_logs] [--bins 360] [--plot] [query ...]
+#
+# A run's profile is the mean, std, min and max of the smoothed velocity and acceleration
+# of both encoders in each of `bins` wrapped-angle bins (np.bincount on the bin index),
+# accumulated chunk by chunk over chunked_analysis.ChunkedAnalysis, so it costs bounded
+# memory and has the same size however long the capture was. Profiles are cached next
+# to the log (analysis_cache, kind 'profile').
+#
+# A fleet baseline is the per-bin mean and spread of the units' mean profiles (every run
+# weighs the same), and each run is scored by how far its profile deviates from it.
+# The query picks the runs from the run catalog, e.g. 'CCW 3.8V' to compare like with like.
+
+DEFAULT_BINS = 360
+PROFILE_VERSION = 1
+
+# Profiled series: (wrapped angle it is binned on, value), names as in plot_csv.PLOT_SERIES
+PROFILE_SERIES = {
+    'coarse_velocity': ('y1_wrapped', 'filtered_dy1_dt'),
+    'fine_velocity': ('y2_wrapped', 'filtered_dy2_dt'),
+    'coarse_acceleration': ('y1_wrapped', 'filtered_d2y1_dt2'),
+    'fine_acceleration': ('y2_wrapped', 'filtered_d2y2_dt2'),
+}
+PROFILE_STATS = ('count', 'mean', 'std', 'min', 'max')
+
+
+def bin_edges(bins=DEFAULT_BINS):
+    return np.linspace(-180.0, 180.0, bins + 1)
+
+
+def bin_index(wrapped_angle, bins=DEFAULT_BINS):
+    """Bin of each angle in [-180, 180) (180 itself goes to the last bin)."""
+    index = ((np.asarray(wrapped_angle) + 180.0) * (bins / 360.0)).astype(np.intp)
+    return np.clip(index, 0, bins - 1)
+
+
+class BinnedStats:
+    """
+    Per-bin count, mean, variance, min and max, updated a chunk at a time.
+
+    Each chunk is reduced with np.bincount (mean and sum of squared deviations from the
+    chunk's own bin means), then merged into the running totals with Chan's parallel
+    update, so the variance stays accurate however many samples a bin collects.
+    Min and max come from one sort of the chunk by bin and np.minimum/maximum.reduceat.
+    """
+
+    def __init__(self, bins=DEFAULT_BINS):
+        self.bins = bins
+        self.count = np.zeros(bins, dtype=np.int64)
+        self.mean = np.zeros(bins)
+        self.m2 = np.zeros(bins)
+        self.minimum = np.full(bins, np.inf)
+        self.maximum = np.full(bins, -np.inf)
+
+    def add(self, wrapped_angle, values):
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return
+        index = bin_index(wrapped_angle, self.bins)
+
+        count = np.bincount(index, minlength=self.bins)
+        filled = count > 0
+        mean = np.zeros(self.bins)
+        mean[filled] = np.bincount(index, weights=values, minlength=self.bins)[filled] / count[filled]
+        m2 = np.bincount(index, weights=(values - mean[index]) ** 2, minlength=self.bins)
+
+        order = np.argsort(index, kind='stable')
+        starts = np.concatenate(([0], np.cumsum(count)[:-1]))[filled]
+        self.minimum[filled] = np.minimum(self.minimum[filled], np.minimum.reduceat(values[order], starts))
+        self.maximum[filled] = np.maximum(self.maximum[filled], np.maximum.reduceat(values[order], starts))
+
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = np.where(filled, self.mean + delta * (count / np.maximum(total, 1)), self.mean)
+        self.m2 = self.m2 + m2 + delta ** 2 * (self.count * count / np.maximum(total, 1))
+        self.count = total
+
+    def result(self):
+        """Dict of PROFILE_STATS arrays, empty bins are NaN."""
+        empty = self.count == 0
+        std = np.sqrt(self.m2 / np.maximum(self.count, 1))
+        stats = {'count': self.count, 'mean': self.mean.copy(), 'std': std,
+                 'min': self.minimum.copy(), 'max': self.maximum.copy()}
+        for name in ('mean', 'std', 'min', 'max'):
+            stats[name][empty] = np.nan
+        return stats
+
+
+def compute_profile(filepath, bins=DEFAULT_BINS):
+    """
+    Profiles one run.
+
+    Returns:
+        Dict with 'bins', 'log', 'samples' and '<series>_<stat>' arrays for every
+        PROFILE_SERIES and PROFILE_STATS.
+    """
+    from chunked_analysis import ChunkedAnalysis
+
+    accumulators = {name: BinnedStats(bins) for name in PROFILE_SERIES}
+    analysis = ChunkedAnalysis(filepath)
+    for chunk in analysis.chunks():
+        for name, (angle_name, value_name) in PROFILE_SERIES.items():
+            accumulators[name].add(chunk[angle_name], chunk[value_name])
+
+    profile = {'bins': bins, 'log': os.path.basename(filepath), 'samples': analysis.sample_count}
+    for name, accumulator in accumulators.items():
+        for stat, values in accumulator.result().items():
+            profile[f"{name}_{stat}"] = values
+    return profile
+
+
+def profile_params(bins):
+    """Cache key parameters of a profile (on top of the ones of the analysis it is built from)."""
+    from plot_csv import analysis_params
+
+    params = analysis_params(chunked=True)
+    params.update({'profile_version': PROFILE_VERSION, 'bins': bins})
+    return params
+
+
+def run_profile(filepath, bins=DEFAULT_BINS):
+    """Profile of a run, from the analysis cache when it is up to date."""
+    from analysis_cache import cached_analysis
+
+    return cached_analysis(filepath, profile_params(bins), lambda: compute_profile(filepath, bins), kind='profile')
+
+
+def fleet_baseline(profiles):
+    """
+    Baseline of many runs' profiles: per bin, the mean and std across runs of their mean
+    profile, and the lowest min / highest max seen. Runs without samples in a bin are left out there.
+
+    Returns:
+        Dict with 'bins', 'runs' and '<series>_<mean|std|min|max|runs>' arrays.
+    """
+    bins = profiles[0]['bins']
+    if any(profile['bins'] != bins for profile in profiles):
+        raise ValueError("All profiles must have the same number of bins.")
+
+    baseline = {'bins': bins, 'runs': len(profiles)}
+    for name in PROFILE_SERIES:
+        means = np.vstack([profile[f"{name}_mean"] for profile in profiles])
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning) # bins no run reached
+            baseline[f"{name}_mean"] = np.nanmean(means, axis=0)
+            baseline[f"{name}_std"] = np.nanstd(means, axis=0)
+            baseline[f"{name}_min"] = np.nanmin(np.vstack([profile[f"{name}_min"] for profile in profiles]), axis=0)
+            baseline[f"{name}_max"] = np.nanmax(np.vstack([profile[f"{name}_max"] for profile in profiles]), axis=0)
+        baseline[f"{name}_runs"] = np.sum(~np.isnan(means), axis=0)
+    return baseline
+
+
+def profile_deviation(profile, baseline):
+    """
+    How far one run's mean profile is from the baseline.
+
+    Returns:
+        Dict per series of 'deviation' (per-bin mean minus baseline mean), 'rms' and 'max_abs'
+        deviation, the 'worst_angle' (bin centre of max_abs) and 'max_z' (largest deviation
+        in units of the across-run std).
+    """
+    edges = bin_edges(profile['bins'])
+    centres = (edges[:-1] + edges[1:]) / 2
+    result = {}
+    for name in PROFILE_SERIES:
+        deviation = profile[f"{name}_mean"] - baseline[f"{name}_mean"]
+        valid = ~np.isnan(deviation)
+        if not valid.any():
+            result[name] = {'deviation': deviation, 'rms': np.nan, 'max_abs': np.nan, 'worst_angle': np.nan, 'max_z': np.nan}
+            continue
+        worst = np.flatnonzero(valid)[np.argmax(np.abs(deviation[valid]))]
+        spread = baseline[f"{name}_std"]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = np.abs(deviation) / spread
+        z = z[valid & (spread > 0)]
+        result[name] = {
+            'deviation': deviation,
+            'rms': float(np.sqrt(np.mean(deviation[valid] ** 2))),
+            'max_abs': float(abs(deviation[worst])),
+            'worst_angle': float(centres[worst]),
+            'max_z': float(z.max()) if len(z) else np.nan,
+        }
+    return result
+
+
+def plot_fleet(baseline, profiles, series, path):
+    """Saves the baseline band (mean ± std across runs, min-max envelope) with every run's mean profile."""
+    from matplotlib import pyplot as plt
+
+    edges = bin_edges(baseline['bins'])
+    centres = (edges[:-1] + edges[1:]) / 2
+    mean, std = baseline[f"{series}_mean"], baseline[f"{series}_std"]
+
+    fig, ax = plt.subplots(figsize=(14, 6))
+    ax.fill_between(centres, baseline[f"{series}_min"], baseline[f"{series}_max"], color='lightgray', label='Fleet min-max')
+    for profile in profiles:
+        ax.plot(centres, profile[f"{series}_mean"], linewidth=0.8, alpha=0.6)
+    ax.fill_between(centres, mean - std, mean + std, color='tab:blue', alpha=0.3, label='Fleet mean ± std')
+    ax.plot(centres, mean, color='tab:blue', linewidth=2, label='Fleet mean')
+    ax.set_xlabel("Angle (wrapped, °)")
+    ax.set_ylabel("Angular Acceleration (°/s^2)" if 'acceleration' in series else "Angular Velocity (°/s)")
+    ax.set_title(f"{series.replace('_', ' ').title()} profile, {baseline['runs']} runs")
+    ax.legend()
+    ax.grid(True)
+    fig.savefig(path, bbox_inches='tight')
+    plt.close(fig)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Angle-binned velocity profiles and fleet deviation of encoder runs.")
+    parser.add_argument("query", nargs="*", help="run catalog search, e.g. CCW 3.8V (default: every run)")
+    parser.add_argument("--log-dir", default="encoder_logs", help="folder with the CSV logs (default: encoder_logs)")
+    parser.add_argument("--bins", type=int, default=DEFAULT_BINS, help="angle bins per revolution (default: 360)")
+    parser.add_argument("--series", default='fine_velocity', choices=list(PROFILE_SERIES), help="series to rank runs by")
+    parser.add_argument("--plot", action="store_true", help="save the fleet profile figure to 'plot outputs'")
+    args = parser.parse_args()
+
+    import matplotlib
+    matplotlib.use("Agg")
+    from run_catalog import search_log_names, sync_catalog
+
+    sync_catalog(args.log_dir)
+    logs = search_log_names(args.log_dir, " ".join(args.query))
+    if not logs:
+        print("No runs match.")
+        sys.exit(1)
+
+    profiles = []
+    for log in logs:
+        try:
+            profiles.append(run_profile(os.path.join(args.log_dir, log), args.bins))
+        except Exception as e:
+            print(f"Could not profile {log}: {e}")
+    if not profiles:
+        sys.exit(1)
+
+    baseline = fleet_baseline(profiles)
+    scored = sorted(((profile_deviation(profile, baseline)[args.series], profile) for profile in profiles),
+                    key=lambda item: -np.nan_to_num(item[0]['rms'], nan=-1))
+    print(f"{args.series} deviation from the baseline of {len(profiles)} run(s), worst first:")
+    for deviation, profile in scored:
+        print(f"  {profile['log']}: rms {deviation['rms']:.4f}, max {deviation['max_abs']:.4f} at "
+              f"{deviation['worst_angle']:.1f}°, max z {deviation['max_z']:.2f}")
+
+    if args.plot:
+        from plot_csv import make_plot_dir_if_doesnt_exist, plot_output_directory
+
+        make_plot_dir_if_doesnt_exist()
+        path = os.path.join(plot_output_directory, f"fleet_{args.series}_profile.png")
+        plot_fleet(baseline, profiles, args.series, path)
+        print(f"Saved {path}")